@@ -0,0 +1,101 @@
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+# Benchmark: page views (database reads) per second while registrations are writing, per database engine profile
+# 'default' is Flask-SQLAlchemy's engine setup (new connection per request, rollback journal); 'tuned' is the
+# DATABASE_TUNING profile (connection pool, WAL journal and SQLITE_PRAGMAS). Each profile gets a fresh seeded database.
+# Usage: python benchmarks/bench_db_concurrency.py --readers 8 --writers 2 --seconds 10 [--dir /path/on/disk]
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # import flaskapp from repo root
+os.environ.setdefault('FLASK_SECRET_KEY', 'benchmark')
+os.environ['FLASK_SQL_DATABASE'] = 'sqlite://'  # replaced per profile
+os.environ['FLASK_OUTBOX_WORKERS'] = '0'  # registration emails stay queued
+os.environ['FLASK_USER_CACHE'] = '0'  # every page view loads the user from the database
+os.environ['FLASK_BCRYPT_ROUNDS'] = '4'  # keep hashing out of the measurement
+os.environ['FLASK_PASSWORD_HASH_QUEUE'] = '1000'
+os.environ['FLASK_RATELIMIT'] = '0'  # all clients share one IP address
+
+from flaskapp import create_app, db  # noqa: E402
+from flaskapp.migrations import upgrade  # noqa: E402
+from seed_users import PASSWORD, seed_users  # noqa: E402
+
+
+# Run readers (account page views) and writers (registrations) for 'seconds'; returns per-role counts and latencies
+def run(app, readers, writers, seconds):
+    lock = threading.Lock()
+    results = {'read': [], 'write': [], 'errors': 0}
+    ready = threading.Barrier(readers + writers)
+
+    def reader(i):
+        client = app.test_client()
+        client.post('/login', data={'email': f'seed{i}@example.com', 'password': PASSWORD})
+        ready.wait()
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            status = client.get('/account').status_code
+            record('read', time.perf_counter() - start, status == 200)
+
+    def writer(i):
+        client = app.test_client()
+        ready.wait()
+        deadline = time.perf_counter() + seconds
+        n = 0
+        while time.perf_counter() < deadline:
+            name = f'w{i}x{n}'
+            n += 1
+            start = time.perf_counter()
+            status = client.post('/register', data={'username': name, 'email': f'{name}@example.com',
+                                                     'password': 'password', 'confirmpassword': 'password'}).status_code
+            record('write', time.perf_counter() - start, status == 302)
+
+    def record(role, latency, ok):
+        with lock:
+            if ok:
+                results[role].append(latency)
+            else:
+                results['errors'] += 1
+
+    threads = [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+    threads += [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def p95(values):
+    return sorted(values)[int(0.95 * (len(values) - 1))] * 1000 if values else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Database read throughput under concurrent writes.')
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--seed', type=int, default=100000, help='users in the database')
+    parser.add_argument('--dir', help='directory for the databases (default: temporary directory)')
+    args = parser.parse_args()
+
+    print(f'{args.readers} readers, {args.writers} writers, {args.seed} users')
+    print(f"{'profile':>8} {'reads/s':>9} {'read p95 ms':>12} {'writes/s':>9} {'write p95 ms':>13} {'errors':>7}")
+    for profile in ('default', 'tuned'):
+        path = os.path.join(tempfile.mkdtemp(dir=args.dir), f'{profile}.db')
+        app = create_app()
+        app.config.update(WTF_CSRF_ENABLED=False, SQLALCHEMY_DATABASE_URI='sqlite:///' + path,
+                          DATABASE_TUNING=profile == 'tuned')
+        with app.app_context():
+            upgrade()
+            seed_users(db.engine, args.seed)
+        results = run(app, args.readers, args.writers, args.seconds)
+        print(f"{profile:>8} {len(results['read']) / args.seconds:>9.1f} {p95(results['read']):>12.1f} "
+              f"{len(results['write']) / args.seconds:>9.1f} {p95(results['write']):>13.1f} {results['errors']:>7}")
+
+
+if __name__ == "__main__":
+    main()
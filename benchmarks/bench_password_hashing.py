@@ -0,0 +1,68 @@
+import argparse
+import os
+import sys
+import threading
+import time
+from flask import Flask
+from flask_bcrypt import Bcrypt
+
+# Benchmark: password checks (logins) per second, per core, through the password hashing service
+# Usage: python benchmarks/bench_password_hashing.py --rounds 10 12 --clients 32
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # import flaskapp from repo root
+
+from flaskapp.hashing import PasswordHasher  # noqa: E402
+from werkzeug.exceptions import ServiceUnavailable  # noqa: E402
+
+
+# Run 'clients' threads checking passwords for 'seconds'; returns (checks done, checks rejected as busy)
+def run(hasher, pw_hash, clients, seconds):
+    done = [0]
+    busy = [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def client():
+        while time.perf_counter() < deadline:
+            try:
+                hasher.check(pw_hash, 'correct horse')
+                with lock:
+                    done[0] += 1
+            except ServiceUnavailable:
+                with lock:
+                    busy[0] += 1
+                time.sleep(0.001)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return done[0], busy[0]
+
+
+def main():
+    cores = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description='Password hashing throughput benchmark.')
+    parser.add_argument('--rounds', type=int, nargs='+', default=[10, 12])
+    parser.add_argument('--workers', type=int, nargs='+', default=sorted({1, cores}))
+    parser.add_argument('--clients', type=int, default=4 * cores, help='concurrent login requests')
+    parser.add_argument('--seconds', type=float, default=5)
+    args = parser.parse_args()
+
+    print(f'{cores} cores, {args.clients} concurrent clients')
+    print(f"{'rounds':>6} {'workers':>8} {'logins/s':>10} {'per core':>10} {'503s/s':>8}")
+    for rounds in args.rounds:
+        for workers in args.workers:
+            app = Flask(__name__)
+            app.config.update(BCRYPT_LOG_ROUNDS=rounds, PASSWORD_HASH_WORKERS=workers)
+            hasher = PasswordHasher(app, bcrypt=Bcrypt(app))
+            pw_hash = hasher.hash('correct horse')
+            done, busy = run(hasher, pw_hash, args.clients, args.seconds)
+            rate = done / args.seconds
+            print(f'{rounds:>6} {workers:>8} {rate:>10.1f} {rate / min(workers, cores):>10.1f} '
+                  f'{busy / args.seconds:>8.0f}')
+
+
+if __name__ == "__main__":
+    main()
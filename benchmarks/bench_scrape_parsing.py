@@ -0,0 +1,119 @@
+import argparse
+import os
+import re
+import sys
+import tempfile
+import time
+from bs4 import BeautifulSoup
+
+# Benchmark: scraper page extraction time
+# Compares the old extraction (BeautifulSoup html.parser, one findAll per field) with source/parsers.py (lxml, one pass
+# per page) on pages saved from tools/eurovision_fixture.py, and checks both give the same records.
+# Usage: python benchmarks/bench_scrape_parsing.py --participants 40 --repeat 20
+
+repo = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(repo, 'source'))
+sys.path.insert(0, os.path.join(repo, 'tools'))
+
+from eurovision_fixture import EurovisionFixture  # noqa: E402
+from parsers import parse_artist, parse_countries, parse_events, parse_participants  # noqa: E402
+
+
+# Old extraction (as data_scrape.py did it)
+def old_events(html):
+    page = BeautifulSoup(html, "html.parser")
+    links = [link.get('href') for link in page.findAll('a', attrs={'href': re.compile("^https://eurovision.tv/event/")})]
+    names = [link.get('alt') for link in page.findAll('img', attrs={'class': re.compile("h-full m-auto")})]
+    logos = [link.get('src') for link in page.findAll('img', attrs={'class': re.compile("h-full m-auto")})]
+    return list(zip(names, links, logos))
+
+
+def old_countries(html):
+    page = BeautifulSoup(html, "html.parser")
+    links = [link.get('href') for link in page.findAll('a', attrs={'href': re.compile(r"https://eurovision.tv/country/")})]
+    names = [link.text.strip() for link in page.findAll('h4', attrs={'class': re.compile("^font-bold")})]
+    logos = [link.get('src') for link in page.findAll(
+        'img', attrs={'src': re.compile(r"^https://static.eurovision.tv/hb-cgi/images/.*\.svg$")})]
+    return list(zip(names, links, logos))
+
+
+def old_participants(html):
+    page = BeautifulSoup(html, "html.parser")
+    countries = [link.text.strip() for link in page.findAll(
+        'a', attrs={'href': re.compile("^https://eurovision.tv/country/")})]
+    links = [link.a.get('href') if link.a.get('href').find("participant") != -1 else None
+             for link in page.findAll('div', attrs={'class': re.compile("w-full md:w-1/3 lg:w-1/4 flex")})]
+    names = [link.text.strip() for link in page.findAll('h4', attrs={'class': re.compile("^text-xl")})]
+    songs = [link.text.strip().split("\n")[-1]
+             for link in page.findAll('div', attrs={'class': re.compile("w-full md:w-1/3 lg:w-1/4 flex")})]
+    return list(zip(countries, names, links, songs))
+
+
+def old_artist(html):
+    page = BeautifulSoup(html, "html.parser")
+    song_link = image = None
+    for link in page.findAll('a', attrs={'href': re.compile(r"https://youtube.com/watch")}):
+        song_link = link.get('href')
+    for link in page.findAll('img', attrs={'src': re.compile(r"^https://static.eurovision.tv/hb-cgi/.*\.hero.jpeg$")}):
+        image = link.get('src')
+    return song_link, image
+
+
+# Save fixture pages to 'folder'; returns {page type: [file paths]}
+def save_pages(folder, events, participants, countries):
+    fixture = EurovisionFixture(('127.0.0.1', 0), events=events, countries=countries, participants=participants)
+    fixture.server_close()  # (pages only, no server)
+    paths = {'/events': 'events', '/countries': 'countries'}  # path -> page type
+    for slug, _, _ in fixture.events:
+        paths[f'/event/{slug}/participants/'] = 'participants'
+    for artist in fixture.artists:
+        paths[f'/participant/{artist}'] = 'artist'
+    files = {}
+    for number, (path, kind) in enumerate(paths.items()):
+        file = os.path.join(folder, f'{kind}-{number}.html')
+        with open(file, 'w', encoding='utf-8') as f:
+            f.write(fixture.page(path))
+        files.setdefault(kind, []).append(file)
+    return files
+
+
+# Average seconds per page
+def time_parse(parse, pages, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for page in pages:
+            parse(page)
+    return (time.perf_counter() - start) / (repeat * len(pages))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Scraper page extraction benchmark.')
+    parser.add_argument('--events', type=int, default=5)
+    parser.add_argument('--participants', type=int, default=40, help='participants per event')
+    parser.add_argument('--countries', type=int, default=52)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--pages', help='folder to save fixture pages in (default: temporary folder)')
+    args = parser.parse_args()
+
+    folder = args.pages or tempfile.mkdtemp()
+    os.makedirs(folder, exist_ok=True)
+    files = save_pages(folder, args.events, args.participants, args.countries)
+    parsers = {'events': (old_events, parse_events), 'countries': (old_countries, parse_countries),
+               'participants': (old_participants, parse_participants), 'artist': (old_artist, parse_artist)}
+
+    print(f"{'page':>14} {'pages':>6} {'old (ms)':>10} {'new (ms)':>10} {'speedup':>8}")
+    for kind, (old, new) in parsers.items():
+        pages = []
+        for file in files[kind]:
+            with open(file, encoding='utf-8') as f:
+                pages.append(f.read())
+        if [tuple(old(page)) for page in pages] != [tuple(new(page)) for page in pages]:
+            sys.exit(f'{kind}: old and new extraction give different records')
+        old_time = time_parse(old, pages, args.repeat)
+        new_time = time_parse(new, pages, args.repeat)
+        print(f'{kind:>14} {len(pages):>6} {old_time * 1000:>10.3f} {new_time * 1000:>10.3f} '
+              f'{old_time / new_time:>7.1f}x')
+
+
+if __name__ == "__main__":
+    main()
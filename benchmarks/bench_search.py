@@ -0,0 +1,95 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+# Benchmark: search index build time and query latency
+# Builds the /search trigram index (flaskapp/search.py) over a made-up contest history (every year since 1956), then
+# times prefix, substring and misspelt queries against it.
+# Usage: python benchmarks/bench_search.py --years 71 --entries 40 --queries 2000
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # import flaskapp from repo root
+
+from flaskapp.search import SearchIndex  # noqa: E402
+
+SYLLABLES = ['la', 'mo', 'ri', 'ka', 'ne', 'so', 'vi', 'da', 'lu', 'te', 'an', 'el', 'or', 'in', 'ma', 'ro', 'sa']
+
+
+def word(rand, syllables=(2, 4)):
+    return ''.join(rand.choice(SYLLABLES) for _ in range(rand.randint(*syllables))).capitalize()
+
+
+# Made-up history: (artist, song, country, event) per entry
+def history(rand, years, entries, countries):
+    names = [word(rand) + 'ia' for _ in range(countries)]
+    rows = []
+    for year in range(1956, 1956 + years):
+        event = f'{word(rand)} {year}'
+        for country in rand.sample(names, min(entries, countries)):
+            rows.append((f'{word(rand)} {word(rand)}', ' '.join(word(rand, (1, 3)) for _ in range(rand.randint(1, 4))),
+                         country, event))
+    return rows
+
+
+# Search queries: prefixes, words from inside names, and names with a typo
+def queries(rand, rows, count):
+    result = []
+    for _ in range(count):
+        name = rand.choice(rand.choice(rows)[:2])
+        kind = rand.randrange(3)
+        if kind == 0:
+            result.append(name[:rand.randint(2, len(name))])
+        elif kind == 1:
+            result.append(rand.choice(name.split()))
+        else:
+            i = rand.randrange(len(name))
+            result.append(name[:i] + rand.choice('aeioukrt') + name[i + 1:])
+    return result
+
+
+def percentile(values, share):
+    return sorted(values)[min(len(values) - 1, int(len(values) * share))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Search index benchmark.')
+    parser.add_argument('--years', type=int, default=71, help='contests (1956 onwards)')
+    parser.add_argument('--entries', type=int, default=40, help='entries per contest')
+    parser.add_argument('--countries', type=int, default=52)
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--limit', type=int, default=20, help='results per query')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rand = random.Random(args.seed)
+    rows = history(rand, args.years, args.entries, args.countries)
+
+    # Index build (as the catalog does it)
+    start = time.perf_counter()
+    index = SearchIndex()
+    for row, (artist, song, country, event) in enumerate(rows):
+        index.add(artist, 'artist', ('entry', row))
+        index.add(song, 'song', ('entry', row))
+    for country in {row[2] for row in rows}:
+        index.add(country, 'country', ('country', country))
+    for event in {row[3] for row in rows}:
+        index.add(event, 'event', ('event', event))
+    build = time.perf_counter() - start
+    print(f'{len(rows)} entries, {len(index)} names, {len(index.postings)} trigrams: built in {build * 1000:.0f} ms')
+
+    # Queries
+    latencies = []
+    found = 0
+    for query in queries(rand, rows, args.queries):
+        start = time.perf_counter()
+        results = index.search(query, args.limit)
+        latencies.append(time.perf_counter() - start)
+        found += bool(results)
+    print(f'{len(latencies)} queries ({found / len(latencies):.0%} with results): '
+          f'p50 {percentile(latencies, 0.5) * 1000:.2f} ms, p95 {percentile(latencies, 0.95) * 1000:.2f} ms, '
+          f'p99 {percentile(latencies, 0.99) * 1000:.2f} ms, max {max(latencies) * 1000:.2f} ms')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+# Benchmark: cold start and first request latency
+# Starts the production app (wsgi.py: create_app(ProductionConfig) + warmup) in fresh Python processes, as gunicorn's
+# master does before forking. Reports the wall time from process start until the app is warm, the startup profile
+# (flaskapp/startup.py: imports, init_app per extension, warmup steps, first request per WARMUP_PATHS) and import time
+# per top-level package (python -X importtime). Exits with an error if the median cold start is over
+# STARTUP_BUDGET_SECONDS or a first request is over FIRST_REQUEST_BUDGET_MS (FLASK_STARTUP_BUDGET,
+# FLASK_FIRST_REQUEST_BUDGET_MS).
+# Usage: python benchmarks/bench_startup.py --runs 5 [--db-path file] [--top 15]
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = '''
+import json, sys
+import wsgi
+print(json.dumps({'steps': wsgi.app.extensions['startup'].steps,
+                  'budget': wsgi.app.config['STARTUP_BUDGET_SECONDS'],
+                  'first_request_budget': wsgi.app.config['FIRST_REQUEST_BUDGET_MS']}))
+sys.stdout.flush()
+'''
+
+
+# Seconds per top-level package, from python -X importtime output (self time, so nothing is counted twice)
+def import_times(stderr):
+    packages = defaultdict(float)
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, _, name = line[len('import time:'):].split('|')
+        package = name.strip().split('.')[0]
+        if package != 'wsgi':  # (its own time is create_app and warmup, profiled above)
+            packages[package] += int(self_us) / 1e6
+    return packages
+
+
+def median(values):
+    return sorted(values)[len(values) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cold start and first request benchmark.')
+    parser.add_argument('--runs', type=int, default=5, help='processes started')
+    parser.add_argument('--db-path', help='SQLite file to use (default: a new one, with empty tables)')
+    parser.add_argument('--top', type=int, default=15, help='packages listed by import time')
+    args = parser.parse_args()
+
+    # Database (tables created by 'flask db upgrade', as warmup checks they exist)
+    db_path = os.path.abspath(args.db_path or os.path.join(tempfile.mkdtemp(), 'startup.db'))
+    env = dict(os.environ, FLASK_SECRET_KEY=os.environ.get('FLASK_SECRET_KEY', 'startup'),
+               FLASK_SQL_DATABASE='sqlite:///' + db_path, FLASK_APP='run.py')
+    subprocess.run([sys.executable, '-m', 'flask', 'db', 'upgrade'], cwd=ROOT, env=dict(env, FLASK_OUTBOX_WORKERS='0'),
+                   check=True, stdout=subprocess.DEVNULL)
+
+    # Cold starts
+    walls, runs, imports = [], [], defaultdict(list)
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        child = subprocess.run([sys.executable, '-X', 'importtime', '-c', CHILD], cwd=ROOT, env=env,
+                               capture_output=True, text=True)
+        walls.append(time.perf_counter() - start)  # (includes interpreter start and exit)
+        if child.returncode != 0:
+            sys.exit(child.stderr[-2000:])
+        runs.append(json.loads(child.stdout.strip().splitlines()[-1]))
+        for package, seconds in import_times(child.stderr).items():
+            imports[package].append(seconds)
+
+    # Startup profile (median per step)
+    steps = defaultdict(list)
+    for run in runs:
+        for name, seconds in run['steps']:
+            steps[name].append(seconds)
+    print(f'Startup profile (median of {args.runs} runs):')
+    for name, values in steps.items():
+        print(f'  {name:<28}{median(values) * 1000:9.1f} ms')
+
+    print(f'Import time by package (top {args.top}):')
+    ranked = sorted(((median(values), package) for package, values in imports.items()), reverse=True)
+    for seconds, package in ranked[:args.top]:
+        print(f'  {package:<28}{seconds * 1000:9.1f} ms')
+
+    # Budgets
+    budget, first_budget = runs[0]['budget'], runs[0]['first_request_budget']
+    cold = median(walls)
+    first = max((median(values) for name, values in steps.items() if name.startswith('GET ')), default=0)
+    print(f'Cold start: {cold:.2f}s (budget {budget:.2f}s), slowest first request: {first * 1000:.0f}ms '
+          f'(budget {first_budget}ms)')
+    if cold > budget or first * 1000 > first_budget:
+        sys.exit('Startup over budget')
+
+
+if __name__ == "__main__":
+    main()
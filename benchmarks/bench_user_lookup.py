@@ -0,0 +1,51 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+# Benchmark: login user lookup time vs number of users
+# Compares the old leading-wildcard ilike() lookup with the indexed equality lookup on User.email_key.
+# Usage: python benchmarks/bench_user_lookup.py --sizes 1000 10000 100000 1000000
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # import flaskapp from repo root
+tmp_dir = tempfile.mkdtemp()
+os.environ.setdefault('FLASK_SECRET_KEY', 'benchmark')
+os.environ['FLASK_SQL_DATABASE'] = 'sqlite:///' + os.path.join(tmp_dir, 'bench.db')
+os.environ['FLASK_OUTBOX_WORKERS'] = '0'
+
+from flaskapp import create_app, db  # noqa: E402
+from flaskapp.models import User, canonical  # noqa: E402
+from seed_users import seed_users  # noqa: E402
+
+
+# Average seconds per lookup
+def time_lookup(lookup, emails):
+    start = time.perf_counter()
+    for email in emails:
+        lookup(email).first()
+    return (time.perf_counter() - start) / len(emails)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Login user lookup benchmark.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000, 1000000])
+    parser.add_argument('--lookups', type=int, default=200)
+    parser.add_argument('--old-lookups', type=int, default=5, help='lookups for the (slow) ilike query')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        print(f"{'users':>10} {'ilike (ms)':>12} {'indexed (ms)':>14}")
+        for size in sorted(args.sizes):
+            seed_users(db.engine, size)
+            emails = [f'Seed{(i * 7919) % size}@Example.com' for i in range(args.lookups)]  # spread over table
+            old = time_lookup(lambda email: User.query.filter(User.email.ilike(f'%{email}%')),
+                              emails[:args.old_lookups])
+            new = time_lookup(lambda email: User.query.filter_by(email_key=canonical(email)), emails)
+            print(f'{size:>10} {old * 1000:>12.3f} {new * 1000:>14.3f}')
+
+
+if __name__ == "__main__":
+    main()
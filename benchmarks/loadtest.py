@@ -0,0 +1,202 @@
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+# End-to-end load test of the users blueprint
+# Boots create_app() in a threaded local server against a seeded SQLite database and a local stand-in SMTP server, then
+# runs concurrent virtual users through: register -> verify (link from email) -> login -> account -> account update ->
+# password reset request -> reset (link from email) -> login. Reports p50/p95/p99 latency and requests per second per
+# route. With --baseline, exits with an error if any route's p95 is slower than the baseline by more than --tolerance.
+# Usage: python benchmarks/loadtest.py --users 20 --iterations 3 --seed 100000 [--db file] [--output results.json]
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)  # import flaskapp from repo root
+sys.path.insert(0, os.path.join(ROOT, 'tools'))  # import smtp_sink
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='End-to-end load test of the users blueprint.')
+    parser.add_argument('--users', type=int, default=20, help='concurrent virtual users')
+    parser.add_argument('--iterations', type=int, default=3, help='flows run by each virtual user')
+    parser.add_argument('--seed', type=int, default=10000, help='users in the database before the test')
+    parser.add_argument('--db', choices=['memory', 'file'], default='memory',
+                        help="'memory': SQLite file on a RAM disk (/dev/shm) where available; 'file': on disk")
+    parser.add_argument('--db-path', help='SQLite file to use (kept, so seeding is only done once)')
+    parser.add_argument('--bcrypt-rounds', type=int, default=10)
+    parser.add_argument('--hash-queue', type=int, default=None, help='PASSWORD_HASH_QUEUE (default: config)')
+    parser.add_argument('--outbox-workers', type=int, default=2)
+    parser.add_argument('--output', help='write results as JSON')
+    parser.add_argument('--baseline', help='JSON results to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed p95 slowdown vs baseline (0.25 = 25%%)')
+    return parser.parse_args()
+
+
+# Latency samples per route
+class Recorder:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = defaultdict(list)  # route -> seconds
+        self.statuses = defaultdict(lambda: defaultdict(int))  # route -> status -> count
+        self.errors = defaultdict(int)  # route -> unexpected responses
+
+    def request(self, route, session, method, url, expect, **kwargs):
+        start = time.perf_counter()
+        response = session.request(method, url, allow_redirects=False, **kwargs)
+        seconds = time.perf_counter() - start
+        with self.lock:
+            self.samples[route].append(seconds)
+            self.statuses[route][response.status_code] += 1
+            if response.status_code != expect:
+                self.errors[route] += 1
+        return response.status_code == expect
+
+    def record(self, route, seconds):
+        with self.lock:
+            self.samples[route].append(seconds)
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))] if ordered else 0.0
+
+
+# One virtual user's flows
+def run_user(base, sink, recorder, user, iterations):
+
+    import requests
+
+    for iteration in range(iterations):
+        session = requests.Session()
+        name = f'lt{user}x{iteration}'
+        email = f'{name}@example.com'
+        password = 'loadtest'
+
+        sent = time.perf_counter()
+        if not recorder.request('register', session, 'POST', base + '/register', 302,
+                                data={'username': name, 'email': email, 'password': password,
+                                      'confirmpassword': password}):
+            continue
+        link = sink.wait_for_link(email, 'Account Registration')
+        if link is None:
+            recorder.errors['email delivery'] += 1
+            continue
+        recorder.record('email delivery', time.perf_counter() - sent)
+        recorder.request('verify', session, 'GET', link, 302)
+
+        if not recorder.request('login', session, 'POST', base + '/login', 302,
+                                data={'email': email, 'password': password}):
+            continue
+        recorder.request('account', session, 'GET', base + '/account', 200)
+        recorder.request('account update', session, 'POST', base + '/account', 302,
+                         data={'username': name + 'u', 'email': email})
+        session.get(base + '/logout', allow_redirects=False)
+
+        if not recorder.request('reset request', session, 'POST', base + '/resetpassword', 302,
+                                data={'email': email}):
+            continue
+        link = sink.wait_for_link(email, 'Password Reset Request')
+        if link is None:
+            recorder.errors['email delivery'] += 1
+            continue
+        password = 'loadtest2'
+        recorder.request('reset password', session, 'POST', link, 302,
+                         data={'password': password, 'confirmpassword': password})
+        recorder.request('login', session, 'POST', base + '/login', 302, data={'email': email, 'password': password})
+
+
+def main():
+
+    args = parse_args()
+
+    # Database
+    if args.db_path:
+        db_path = os.path.abspath(args.db_path)
+    else:
+        ram_disk = '/dev/shm' if args.db == 'memory' and os.path.isdir('/dev/shm') else None
+        db_path = os.path.join(tempfile.mkdtemp(dir=ram_disk), 'loadtest.db')
+
+    # Local SMTP server
+    from smtp_sink import SMTPSink
+    sink = SMTPSink(('127.0.0.1', 0)).start()
+
+    # App (configured through environment variables, read when flaskapp.config is imported)
+    os.environ.update({'FLASK_SECRET_KEY': 'loadtest', 'FLASK_SQL_DATABASE': 'sqlite:///' + db_path,
+                       'FLASK_EMAIL_SERVER': '127.0.0.1', 'FLASK_EMAIL_PORT': str(sink.server_address[1]),
+                       'FLASK_EMAIL_TLS': '0', 'FLASK_BCRYPT_ROUNDS': str(args.bcrypt_rounds),
+                       'FLASK_OUTBOX_WORKERS': '0',  # senders started below
+                       'FLASK_SLOW_REQUEST_MS': '60000', 'FLASK_RATELIMIT': '0'})  # (all users share one IP address)
+    if args.hash_queue is not None:
+        os.environ['FLASK_PASSWORD_HASH_QUEUE'] = str(args.hash_queue)
+    from flaskapp import create_app, db, outbox
+    from flaskapp.migrations import upgrade
+    from seed_users import seed_users
+    from werkzeug.serving import make_server
+
+    app = create_app()
+    app.config.update(WTF_CSRF_ENABLED=False, OUTBOX_WORKERS=args.outbox_workers, OUTBOX_POLL_SECONDS=0.2)
+    with app.app_context():
+        upgrade()
+        start = time.perf_counter()
+        added = seed_users(db.engine, args.seed)
+        print(f'Database: {db_path} ({added} users seeded in {time.perf_counter() - start:.1f}s)')
+    outbox.start(app)  # once the tables exist
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)  # no per-request log lines
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f'http://127.0.0.1:{server.server_port}'
+
+    # Run virtual users
+    recorder = Recorder()
+    threads = [threading.Thread(target=run_user, args=(base, sink, recorder, user, args.iterations))
+               for user in range(args.users)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    server.shutdown()
+
+    # Report
+    results = {}
+    print(f'{args.users} users x {args.iterations} flows in {elapsed:.1f}s')
+    print(f"{'route':<16} {'count':>6} {'errors':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'req/s':>7}  statuses")
+    for route in ['register', 'email delivery', 'verify', 'login', 'account', 'account update', 'reset request',
+                  'reset password']:
+        samples = recorder.samples.get(route, [])
+        result = {'count': len(samples), 'errors': recorder.errors.get(route, 0),
+                  'p50': percentile(samples, 50), 'p95': percentile(samples, 95), 'p99': percentile(samples, 99),
+                  'rps': len(samples) / elapsed, 'statuses': dict(recorder.statuses.get(route, {}))}
+        results[route] = result
+        statuses = ' '.join(f'{status}:{count}' for status, count in sorted(result['statuses'].items()))
+        print(f"{route:<16} {result['count']:>6} {result['errors']:>6} {result['p50'] * 1000:>8.1f} "
+              f"{result['p95'] * 1000:>8.1f} {result['p99'] * 1000:>8.1f} {result['rps']:>7.1f}  {statuses}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'args': vars(args), 'elapsed': elapsed, 'routes': results}, f, indent=2)
+
+    # Compare with baseline
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['routes']
+        slower = [route for route, result in results.items()
+                  if route in baseline and baseline[route]['count'] and result['count']
+                  and result['p95'] > baseline[route]['p95'] * (1 + args.tolerance)]
+        for route in slower:
+            print(f"REGRESSION {route}: p95 {results[route]['p95'] * 1000:.1f}ms "
+                  f"vs baseline {baseline[route]['p95'] * 1000:.1f}ms")
+        if slower:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import argparse
+import os
+import sqlite3
+import sys
+import time
+from datetime import datetime
+import bcrypt
+
+# Seed a database with many (verified) users, quickly
+# All users share one password hash, rows are generated in batches, and SQLite databases are written with raw sqlite3
+# executemany() and durability switched off for the load (other databases go through SQLAlchemy core).
+# Usage: python benchmarks/seed_users.py --database /tmp/bench.db --count 1000000
+# Seeded users: username 'seed<i>', email 'seed<i>@example.com', password PASSWORD.
+
+PASSWORD = 'benchmark'
+COLUMNS = ('username', 'username_key', 'email', 'email_key', 'image_file', 'password', 'confirm_account',
+           'date_register', 'date_verify')
+
+
+def rows(first, last, pw_hash, now):
+    for i in range(first, last):
+        name = f'seed{i}'
+        email = f'seed{i}@example.com'
+        yield name, name, email, email, 'default.jpg', pw_hash, True, now, now
+
+
+# Add users until the table holds 'count' seeded users; returns number of users added
+def seed_users(engine, count, rounds=4, batch_size=50000):
+
+    pw_hash = bcrypt.hashpw(PASSWORD.encode(), bcrypt.gensalt(rounds)).decode()
+    now = datetime.now()
+    with engine.connect() as conn:
+        first = conn.execute("SELECT count(*) FROM user WHERE username LIKE 'seed%'").scalar()
+    if first >= count:
+        return 0
+
+    insert = f"INSERT INTO user ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})"
+    if engine.dialect.name == 'sqlite':
+        raw = sqlite3.connect(engine.url.database)
+        raw.execute('PRAGMA synchronous = OFF')  # bulk load: skip fsync (safe to re-run if interrupted)
+        for start in range(first, count, batch_size):
+            with raw:  # one transaction per batch
+                raw.executemany(insert, rows(start, min(start + batch_size, count), pw_hash, now.isoformat(' ')))
+        raw.close()
+    else:
+        from flaskapp.models import User
+        with engine.begin() as conn:
+            for start in range(first, count, batch_size):
+                conn.execute(User.__table__.insert(), [dict(zip(COLUMNS, row)) for row in
+                                                       rows(start, min(start + batch_size, count), pw_hash, now)])
+    return count - first
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Seed users for benchmarks.')
+    parser.add_argument('--database', required=True, help='SQLite file path, or SQLAlchemy database URL')
+    parser.add_argument('--count', type=int, default=1000000, help='total seeded users wanted')
+    parser.add_argument('--rounds', type=int, default=4, help='bcrypt cost of the shared password hash')
+    args = parser.parse_args()
+
+    url = args.database if '://' in args.database else 'sqlite:///' + os.path.abspath(args.database)
+    os.environ.setdefault('FLASK_SECRET_KEY', 'benchmark')
+    os.environ['FLASK_SQL_DATABASE'] = url
+    os.environ['FLASK_OUTBOX_WORKERS'] = '0'
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # import flaskapp from repo root
+    from flaskapp import create_app, db
+    from flaskapp.migrations import upgrade
+
+    app = create_app()
+    with app.app_context():
+        upgrade()  # create/upgrade schema
+        start = time.perf_counter()
+        added = seed_users(db.engine, args.count, args.rounds)
+        seconds = time.perf_counter() - start
+    print(f'Added {added} users in {seconds:.1f}s ({added / max(seconds, 1e-9):,.0f} users/s).')
+
+
+if __name__ == "__main__":
+    main()
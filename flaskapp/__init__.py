@@ -1,15 +1,37 @@
+import time
+from flaskapp import startup  # (first, so it times the imports below)
+startup.timed_import('flask', 'sqlalchemy', 'flask_sqlalchemy', 'flask_bcrypt', 'flask_login', 'flask_mail')
 from flask import Flask
-from flask_sqlalchemy import SQLAlchemy
 from flask_bcrypt import Bcrypt
 from flask_login import LoginManager
 from flask_mail import Mail
+from werkzeug.middleware.proxy_fix import ProxyFix
 from flaskapp.config import Config
+from flaskapp.assets import Assets
+from flaskapp.catalog import Catalog
+from flaskapp.database import Database
+from flaskapp.hashing import PasswordHasher
+from flaskapp.metrics import metrics  # request metrics (shared instance, imported by the modules it times)
+from flaskapp.outbox import Outbox
+from flaskapp.ratelimit import RateLimiter
+from flaskapp.tokens import TokenService
+from flaskapp.usercache import UserCache
+
+# Time taken importing flaskapp's own modules (and the other packages they use), after the timed imports above
+IMPORT_SECONDS = time.perf_counter() - startup.IMPORT_STARTED - sum(seconds for _, seconds in startup.IMPORTS)
 
 # Configuration extensions
-db = SQLAlchemy()  # initialise database
+db = Database()  # initialise database (SQLAlchemy with tuned engine settings)
 bcrypt = Bcrypt()  # encrypt passwords
+hasher = PasswordHasher(bcrypt=bcrypt)  # run password hashing in a worker pool
 mail = Mail()  # enable emails from server
+outbox = Outbox(mail=mail, db=db)  # send emails in the background
 login_manager = LoginManager()  # handle login functionality
+user_cache = UserCache(db=db)  # cache users loaded for login sessions
+tokens = TokenService(user_cache=user_cache)  # signed email links (verification, email change, password reset)
+assets = Assets()  # fingerprint (and compress) static files
+limiter = RateLimiter()  # limit login/registration/reset attempts
+catalog = Catalog()  # scraped Eurovision data (loaded once, indexed)
 
 # Additional configuration parameters (for login)
 login_manager.login_view = 'users.login'  # for pages requiring login, re-routes to 'login' page if required
@@ -19,19 +41,56 @@ login_manager.login_message_category = 'info'  # to match bootstrap css class fo
 # Configuration setup
 def create_app(config_class=Config):
 
+    profiler = startup.StartupProfiler()  # time each step (see startup.py)
+    for package, seconds in startup.IMPORTS:
+        profiler.add(f'import {package}', seconds)
+    profiler.add('import flaskapp', IMPORT_SECONDS)
+
     app = Flask(__name__)  # create an app instance
-    app.config.from_object(Config)  # import Config class details
+    app.config.from_object(config_class)  # import Config class details
+    app.extensions['startup'] = profiler
+
+    # Read client IP address/scheme from the reverse proxies' X-Forwarded-For/-Proto headers (see ProductionConfig)
+    if app.config['PROXY_COUNT']:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['PROXY_COUNT'], x_proto=app.config['PROXY_COUNT'])
 
     # Link extensions to app
-    db.init_app(app)
-    bcrypt.init_app(app)
-    login_manager.init_app(app)
-    mail.init_app(app)
+    for name, extension in (('metrics', metrics), ('db', db), ('bcrypt', bcrypt), ('hasher', hasher),
+                            ('login_manager', login_manager), ('user_cache', user_cache), ('tokens', tokens),
+                            ('mail', mail), ('outbox', outbox), ('assets', assets), ('limiter', limiter),
+                            ('catalog', catalog)):
+        with profiler.step(f'init {name}'):
+            extension.init_app(app)
 
     # Import blueprints
-    from flaskapp.users.routes import users  # inserted here to prevent circular reference
-    from flaskapp.main.routes import main  # inserted here to prevent circular reference
-    app.register_blueprint(users)  # register user directory functionality
-    app.register_blueprint(main)  # register main directory functionality
+    with profiler.step('import blueprints'):
+        from flaskapp.users.routes import users  # inserted here to prevent circular reference
+        from flaskapp.main.routes import main  # inserted here to prevent circular reference
+        app.register_blueprint(users)  # register user directory functionality
+        app.register_blueprint(main)  # register main directory functionality
+
+    # Import command line tools
+    from flaskapp.migrations import db_cli  # inserted here to prevent circular reference
+    from flaskapp.users.reaper import users_cli  # inserted here to prevent circular reference
+    from flaskapp.users.storage import pictures_cli  # inserted here to prevent circular reference
+    app.cli.add_command(db_cli)  # 'flask db upgrade'
+    app.cli.add_command(users_cli)  # 'flask users reap'
+    app.cli.add_command(pictures_cli)  # 'flask pictures migrate' / 'flask pictures gc'
 
     return app
+
+
+# Start background jobs (picture resizing processes, email senders, account reaper)
+# Only called by the processes that serve requests: run.py, and each gunicorn worker after forking (threads don't
+# survive a fork). create_app doesn't start them, so 'flask' commands (e.g. 'flask db upgrade') and tests run without
+# them.
+def start_background_jobs(app):
+
+    from flaskapp.users import pictures  # inserted here to prevent circular reference
+    from flaskapp.users.reaper import start_reaper  # inserted here to prevent circular reference
+
+    pictures.start_pool(app.config['PICTURE_WORKERS'])  # first, so its processes are forked before any threads start
+    if app.config['OUTBOX_WORKERS'] > 0:
+        outbox.start(app)  # send queued emails
+    if app.config['REAPER_INTERVAL_SECONDS']:
+        start_reaper(app)  # periodically delete expired unverified accounts
@@ -0,0 +1,132 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import click
+from flask import request, send_file, current_app
+from flask.cli import with_appcontext
+from werkzeug.exceptions import NotFound
+from werkzeug.security import safe_join
+
+try:
+    import brotli  # optional: brotli variants are only generated/served when installed
+except ImportError:
+    brotli = None
+
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))  # preferred content encodings, and their file extensions
+AVATAR = re.compile(r'^profile_pics/[0-9a-f]{2}/[0-9a-f]{2}/')  # sharded pictures (named by content, never change)
+
+
+# Fingerprinted static files
+# At startup (or with 'flask assets build') every file under static/ is hashed, and url_for('static', ...) returns
+# fingerprinted names (e.g. 'main.3f2a9c1b7d4e.css'). As the URL changes whenever the file does, these are served with
+# far-future, immutable caching, so browsers never need to revalidate them. Text files also get precompressed .gz (and
+# .br, if brotli is installed) copies, served to browsers that accept them.
+class Assets:
+
+    def __init__(self, app=None):
+        self.manifest = {}  # filename -> fingerprinted filename
+        self.originals = {}  # fingerprinted filename -> filename
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+
+        # Default settings (overridden by app config)
+        app.config.setdefault('ASSETS_FINGERPRINT', True)  # False = plain static URLs (e.g. while editing css)
+        app.config.setdefault('ASSETS_MAX_AGE', 365 * 24 * 3600)  # cache lifetime of fingerprinted files (seconds)
+        app.config.setdefault('ASSETS_COMPRESS', ('.css', '.js', '.svg', '.json', '.txt', '.html'))  # precompressed
+        app.config.setdefault('ASSETS_COMPRESS_MIN_BYTES', 512)  # smaller files are not worth compressing
+
+        app.extensions['assets'] = self
+        app.cli.add_command(assets_cli)
+        if app.config['ASSETS_FINGERPRINT']:
+            self.build(app)
+            app.url_defaults(self.fingerprint)
+            app.view_functions['static'] = self.send_static
+
+    # Hash static files and create compressed copies
+    def build(self, app):
+
+        manifest = {}
+        for filename, path in self._walk(app.static_folder):
+            with open(path, 'rb') as f:
+                data = f.read()
+            stem, ext = os.path.splitext(filename)
+            manifest[filename] = f'{stem}.{hashlib.sha256(data).hexdigest()[:12]}{ext}'
+            if ext in app.config['ASSETS_COMPRESS'] and len(data) >= app.config['ASSETS_COMPRESS_MIN_BYTES']:
+                self._compress(path, data)
+
+        self.manifest = manifest
+        self.originals = {hashed: filename for filename, hashed in manifest.items()}
+        return manifest
+
+    # url_for('static', filename=...) -> fingerprinted filename
+    def fingerprint(self, endpoint, values):
+        if endpoint == 'static' and values.get('filename') in self.manifest:
+            values['filename'] = self.manifest[values['filename']]
+
+    # Static file view (replaces Flask's)
+    def send_static(self, filename):
+
+        original = self.originals.get(filename)
+        immutable = original is not None or AVATAR.match(filename)
+        filename = original or filename
+
+        path = safe_join(current_app.static_folder, filename)
+        if path is None or not os.path.isfile(path):
+            raise NotFound()
+
+        # Use precompressed copy, if browser accepts it
+        encoding = None
+        if os.path.splitext(filename)[1] in current_app.config['ASSETS_COMPRESS']:
+            for name, ext in ENCODINGS:
+                if request.accept_encodings[name] and os.path.isfile(path + ext):
+                    encoding = name
+                    break
+
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        response = send_file(path + dict(ENCODINGS)[encoding] if encoding else path, mimetype=mimetype,
+                             conditional=True)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+
+        if immutable:
+            response.cache_control.public = True
+            response.cache_control.max_age = current_app.config['ASSETS_MAX_AGE']
+            response.cache_control.immutable = True
+        return response
+
+    # Static files to fingerprint, as (filename relative to static/, full path)
+    @staticmethod
+    def _walk(static_folder):
+        for folder, subfolders, files in os.walk(static_folder):
+            relative = os.path.relpath(folder, static_folder).replace(os.sep, '/')
+            if relative == 'profile_pics':
+                subfolders[:] = []  # uploaded pictures are already named by content (only default.jpg is hashed)
+            for name in files:
+                if not name.startswith('.') and not name.endswith(('.gz', '.br')):
+                    filename = name if relative == '.' else f'{relative}/{name}'
+                    yield filename, os.path.join(folder, name)
+
+    # Write .gz/.br copies next to the file (skipped if already up to date)
+    @staticmethod
+    def _compress(path, data):
+        compressors = [('.gz', lambda raw: gzip.compress(raw, 9))]
+        if brotli is not None:
+            compressors.append(('.br', lambda raw: brotli.compress(raw, quality=11)))
+        for ext, compress in compressors:
+            if not os.path.exists(path + ext) or os.path.getmtime(path + ext) < os.path.getmtime(path):
+                with open(path + ext + '.tmp', 'wb') as f:
+                    f.write(compress(data))
+                os.replace(path + ext + '.tmp', path + ext)
+
+
+# Command line tools ('flask assets')
+@click.command('assets')
+@with_appcontext
+def assets_cli():
+    manifest = current_app.extensions['assets'].build(current_app)
+    click.echo(f'Fingerprinted {len(manifest)} static files.')
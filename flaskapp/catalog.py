@@ -0,0 +1,242 @@
+import functools
+import hashlib
+import json
+import os
+import threading
+from flask import request, session, make_response, current_app, url_for, send_from_directory
+from flaskapp.search import SearchIndex
+
+# Data columns -> record keys (JSON)
+FIELDS = {'Event': 'event', 'Event Link': 'event_link', 'Event Logo': 'event_logo', 'Country': 'country',
+          'Country Link': 'country_link', 'Country Logo': 'country_logo', 'Artist': 'artist',
+          'Artist Link': 'artist_link', 'Artist Image': 'artist_image', 'Song': 'song', 'Song Link': 'song_link',
+          'Flag': 'flag'}
+CATEGORY_COLUMNS = ['Event', 'Event Link', 'Event Logo', 'Country', 'Country Link', 'Country Logo']  # few values
+
+
+# Eurovision catalog
+# Loads the scraped dataset (source/data, written by source/data_scrape.py; see source/dataset.py) once at startup,
+# keeping repeated columns (events, countries) as categoricals, and builds indexes (row positions) by event, country
+# and artist, so browse requests are a dictionary lookup plus a slice, plus a trigram index of names for search
+# (search.py). Responses carry an ETag made from the dataset's manifest (catalog.cached), so repeat requests get
+# '304 Not Modified' without running the view. If no dataset has been scraped, the catalog is empty. catalog.load()
+# reloads it (e.g. after a new scrape). Logos and artist images mirrored by source/mirror.py are served from
+# CATALOG_IMAGES (named by content, so cached by browsers for CATALOG_IMAGES_MAX_AGE); others are linked as scraped.
+class Catalog:
+
+    def __init__(self, app=None):
+        self.path = None
+        self._state = CatalogState()  # replaced as a whole on reload (requests never see half-loaded data)
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+
+        # Default settings (overridden by app config)
+        app.config.setdefault('CATALOG_PATH', os.path.join(os.path.dirname(app.root_path), 'source', 'data'))
+        app.config.setdefault('CATALOG_ENABLED', True)  # False = empty catalog (nothing loaded)
+        app.config.setdefault('CATALOG_IMAGES', os.path.join(os.path.dirname(app.root_path), 'source', 'images'))
+        app.config.setdefault('CATALOG_IMAGES_MAX_AGE', 365 * 24 * 3600)  # cache lifetime of mirrored images (seconds)
+
+        app.extensions['catalog'] = self
+        app.jinja_env.globals['catalog_image'] = self.image_url
+        self.path = app.config['CATALOG_PATH']
+        if app.config['CATALOG_ENABLED']:
+            self.load()
+
+    # (Re)load dataset; returns number of entries loaded
+    def load(self):
+        with self._lock:
+            manifest_path = os.path.join(self.path, 'manifest.json')
+            try:
+                with open(manifest_path, 'rb') as f:
+                    raw = f.read()
+                manifest = json.loads(raw)
+            except (OSError, ValueError):
+                self._state = CatalogState()
+                return 0
+            self._state = CatalogState.from_dataset(self.path, manifest, hashlib.sha1(raw).hexdigest()[:16])
+            return len(self._state.entries)
+
+    @property
+    def version(self):
+        return self._state.version
+
+    # Events by year (newest first), as {year: [event records]}
+    def years(self):
+        return self._state.years
+
+    def countries(self):
+        return self._state.countries
+
+    def event(self, name):
+        return self._state.events.get(name)
+
+    def country(self, name):
+        return self._state.country_info.get(name)
+
+    # Entries of an event / country / artist (list of records)
+    def by_event(self, name):
+        return self._state.records('event', name)
+
+    def by_country(self, name):
+        return self._state.records('country', name)
+
+    def by_artist(self, name):
+        return self._state.records('artist', name.casefold())
+
+    def by_year(self, year):
+        state = self._state
+        return [entry for event in state.years.get(year, []) for entry in state.records('event', event['event'])]
+
+    # URL of an image ('size' px thumbnail of the local copy, if mirrored; else the scraped URL)
+    def image_url(self, url, size=64):
+        name = self._state.images.get(url, {}).get(size)
+        return url_for('main.eurovision_image', filename=name) if name else url
+
+    # Mirrored image file view (content-hashed names, so cached as immutable)
+    def send_image(self, filename):
+        response = send_from_directory(current_app.config['CATALOG_IMAGES'], filename,
+                                       cache_timeout=current_app.config['CATALOG_IMAGES_MAX_AGE'])
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
+
+    # Entries, countries and events matching 'query' (best first), as records with 'type', 'match' and 'score'
+    def search(self, query, limit=20):
+        state = self._state
+        hits = state.search.search(query, limit)
+        rows = [target[1] for _, _, target in hits if target[0] == 'entry']
+        entries = dict(zip(rows, state.entries.iloc[rows].to_dict('records'))) if rows else {}
+        results = []
+        for score, field, (kind, key) in hits:
+            if kind == 'entry':
+                record = to_record(entries[key])
+            else:
+                record = dict((state.events if kind == 'event' else state.country_info)[key])
+            record.update(type=kind, match=field, score=score)
+            results.append(record)
+        return results
+
+    # View decorator: ETag from the dataset version (plus the logged-in user for HTML pages, as the page header
+    # depends on them); a request with a matching If-None-Match gets a 304 without the view running. HTML pages
+    # rendered with flashed messages are not cached (the messages are shown once, then the ETag'd page is used again).
+    def cached(self, per_user=False):
+        def decorator(view):
+            @functools.wraps(view)
+            def wrapper(*args, **kwargs):
+                if per_user and session.get('_flashes'):
+                    response = make_response(view(*args, **kwargs))
+                    response.cache_control.no_store = True
+                    return response
+                etag = f'catalog-{self.version}-{request.full_path}'
+                if per_user:
+                    etag += f"-{session.get('_user_id', 'anon')}"
+                etag = hashlib.sha1(etag.encode()).hexdigest()[:20]
+                if request.if_none_match.contains(etag):
+                    response = current_app.response_class(status=304)
+                else:
+                    response = make_response(view(*args, **kwargs))
+                response.set_etag(etag)
+                response.cache_control.no_cache = True  # (may be stored, but revalidated on every use)
+                if per_user:
+                    response.cache_control.private = True
+                    response.vary.add('Cookie')
+                return response
+            return wrapper
+        return decorator
+
+
+# Loaded catalog data (immutable once built)
+class CatalogState:
+
+    def __init__(self):
+        self.version = 'empty'
+        self.entries = None  # DataFrame, one row per entry
+        self.indexes = {'event': {}, 'country': {}, 'artist': {}}  # key -> row positions
+        self.events = {}  # event name -> record
+        self.years = {}  # year -> [event records]
+        self.country_info = {}  # country name -> record
+        self.countries = []  # country records (by name)
+        self.search = SearchIndex()  # names of artists, songs, countries and events
+        self.images = {}  # scraped image URL -> {size: mirrored file name}
+
+    @classmethod
+    def from_dataset(cls, path, manifest, version):
+        import pandas as pd  # inserted here so the app starts without loading pandas/pyarrow when there is no data
+        import pyarrow.parquet as pq
+
+        state = cls()
+        state.version = version
+        tables = manifest.get('tables', {})
+
+        # Entries (partitions read straight from memory-mapped files, repeated columns as categoricals)
+        files = [file for part in tables.get('vision', {}).get('partitions', {}).values() for file in part['files']]
+        frames = [pq.read_table(os.path.join(path, file), memory_map=True).to_pandas() for file in files]
+        entries = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=list(FIELDS))
+        for column in CATEGORY_COLUMNS:
+            entries[column] = entries[column].astype('category')
+        state.entries = entries
+
+        # Indexes
+        state.indexes['event'] = entries.groupby('Event', observed=True, sort=False).indices
+        state.indexes['country'] = entries.groupby('Country', observed=True, sort=False).indices
+        state.indexes['artist'] = entries.groupby(entries['Artist'].str.casefold(), sort=False).indices
+
+        # Events (with year, from the manifest) and countries
+        years = {name: part.get('year') for name, part in tables.get('vision', {}).get('partitions', {}).items()}
+        for record in read_records(path, tables.get('events')):
+            record['year'] = years.get(record['event'])
+            record['entries'] = len(state.indexes['event'].get(record['event'], ()))
+            state.events[record['event']] = record
+            state.years.setdefault(record['year'], []).append(record)
+        state.years = dict(sorted(((year, events) for year, events in state.years.items() if year is not None),
+                                  reverse=True))
+        for record in read_records(path, tables.get('countries')):
+            record['entries'] = len(state.indexes['country'].get(record['country'], ()))
+            state.country_info[record['country']] = record
+        state.countries = sorted(state.country_info.values(), key=lambda record: record['country'])
+
+        # Mirrored images (source/mirror.py)
+        for record in read_records(path, tables.get('images')):
+            state.images[record['URL']] = {int(key.split()[1]): name for key, name in record.items()
+                                           if key.startswith('Thumbnail ') and name}
+
+        # Search index
+        for field, column in (('artist', 'Artist'), ('song', 'Song')):
+            for row, name in enumerate(entries[column]):
+                state.search.add(name, field, ('entry', row))
+        for name in state.country_info:
+            state.search.add(name, 'country', ('country', name))
+        for name in state.events:
+            state.search.add(name, 'event', ('event', name))
+        return state
+
+    def records(self, index, key):
+        positions = self.indexes[index].get(key)
+        if positions is None:
+            return []
+        rows = self.entries.iloc[positions]
+        return [to_record(row) for row in rows.to_dict('records')]
+
+
+# Small (unpartitioned) table as records
+def read_records(path, table):
+    if not table:
+        return []
+    import pandas as pd  # inserted here so the app starts without loading pandas/pyarrow when there is no data
+    frame = pd.concat([pd.read_parquet(os.path.join(path, file)) for file in table['files']], ignore_index=True)
+    return [to_record(row) for row in frame.to_dict('records')]
+
+
+# Data row -> JSON-friendly record (missing values as None)
+def to_record(row):
+    record = {}
+    for column, value in row.items():
+        if value != value:  # (NaN)
+            value = None
+        elif hasattr(value, 'item'):
+            value = value.item()  # (numpy number)
+        record[FIELDS.get(column, column)] = value
+    return record
@@ -1,4 +1,5 @@
 import os
+import tempfile
 
 
 class Config:
@@ -6,10 +7,90 @@ class Config:
     # General configuration
     SECRET_KEY = os.environ.get('FLASK_SECRET_KEY')  # key required for accounts
     SQLALCHEMY_DATABASE_URI = os.environ.get('FLASK_SQL_DATABASE')  # database location
+    SQLALCHEMY_TRACK_MODIFICATIONS = False  # no model change signals (unused, and they track every object changed)
+    AUTH_TOKEN_SECONDS = 900  # how long email verification links are valid (unverified accounts then expire)
+    RESET_TOKEN_SECONDS = 3600  # how long password reset links are valid
+    TOKEN_REJECTED_CACHE_SIZE = 10000  # invalid/used links remembered per process (answered without a query)
+    REAPER_INTERVAL_SECONDS = int(os.environ.get('FLASK_REAPER_INTERVAL', '0'))  # delete expired accounts (0 = off)
+    REAPER_BATCH_SIZE = 1000  # accounts deleted per transaction
+
+    # Startup configuration (wsgi.py; see startup.py)
+    STARTUP_BUDGET_SECONDS = float(os.environ.get('FLASK_STARTUP_BUDGET', '5'))  # imports, create_app and warmup
+    FIRST_REQUEST_BUDGET_MS = int(os.environ.get('FLASK_FIRST_REQUEST_BUDGET_MS', '250'))  # slowest warmup request
+    WARMUP_PATHS = ('/', '/login', '/register', '/eurovision', '/search?q=a')  # requested once before serving
+
+    # Database engine configuration
+    DATABASE_TUNING = os.environ.get('FLASK_DB_TUNING', '1') == '1'  # set to '0' for Flask-SQLAlchemy's defaults
+    DATABASE_POOL_SIZE = int(os.environ.get('FLASK_DB_POOL_SIZE', '5'))  # connections kept open per process
+    DATABASE_MAX_OVERFLOW = int(os.environ.get('FLASK_DB_MAX_OVERFLOW', '10'))  # extra connections under load
+    DATABASE_POOL_TIMEOUT = 10  # seconds a request waits for a free connection
+    DATABASE_POOL_RECYCLE = 1800  # seconds before a server database connection is replaced
+    DATABASE_POOL_PRE_PING = True  # test server database connections before use (survives server restarts)
+    SQLITE_PRAGMAS = {'journal_mode': 'wal',  # readers don't wait for the writer (and vice versa)
+                      'synchronous': 'normal',  # fsync at checkpoints only (WAL: may lose last commits, not corrupt)
+                      'busy_timeout': 5000,  # ms a writer waits for another writer instead of failing
+                      'mmap_size': 256 * 2 ** 20,  # read database through memory map (bytes)
+                      'cache_size': -64000}  # page cache per connection (negative = KiB)
+
+    # User cache configuration (users loaded for login sessions)
+    USER_CACHE_ENABLED = os.environ.get('FLASK_USER_CACHE', '1') == '1'  # set to '0' to disable
+    USER_CACHE_SIZE = 1024  # maximum users held per process
+    USER_CACHE_TTL = 60  # seconds before a cached user is reloaded
+
+    # Password hashing configuration
+    BCRYPT_LOG_ROUNDS = int(os.environ.get('FLASK_BCRYPT_ROUNDS', '12'))  # bcrypt cost (old hashes updated on login)
+    PASSWORD_HASH_WORKERS = os.cpu_count() or 1  # concurrent hashing operations per process
+    PASSWORD_HASH_QUEUE = int(os.environ.get('FLASK_PASSWORD_HASH_QUEUE', 2 * PASSWORD_HASH_WORKERS))  # before 503s
+
+    # Rate limit configuration (form submissions per IP address / per email address, as (requests, seconds))
+    RATELIMIT_ENABLED = os.environ.get('FLASK_RATELIMIT', '1') == '1'  # set to '0' to disable (e.g. load tests)
+    PROXY_COUNT = int(os.environ.get('FLASK_PROXY_COUNT', '0'))  # reverse proxies in front of the app (see below)
+    RATELIMIT_LIMITS = {'login': {'ip': (30, 60), 'account': (10, 300)},
+                        'register': {'ip': (10, 300), 'account': (3, 300)},
+                        'reset_request': {'ip': (10, 300), 'account': (3, 900)}}
+    RATELIMIT_STORAGE_SIZE = 100000  # keys tracked per process (least recently used dropped)
+
+    # Metrics configuration
+    METRICS_ENABLED = os.environ.get('FLASK_METRICS', '1') == '1'  # Prometheus metrics at /metrics
+    METRICS_SLOW_REQUEST_MS = int(os.environ.get('FLASK_SLOW_REQUEST_MS', '500'))  # log requests slower than this
+
+    # Static file configuration
+    ASSETS_FINGERPRINT = os.environ.get('FLASK_ASSETS_FINGERPRINT', '1') == '1'  # versioned URLs, cached by browsers
+    ASSETS_MAX_AGE = 365 * 24 * 3600  # cache lifetime (seconds) of fingerprinted files
+
+    # Eurovision catalog configuration (data written by source/data_scrape.py)
+    CATALOG_PATH = os.environ.get('FLASK_CATALOG_PATH', os.path.join(os.path.dirname(os.path.dirname(
+        os.path.abspath(__file__))), 'source', 'data'))  # dataset folder (with manifest.json)
+    CATALOG_ENABLED = os.environ.get('FLASK_CATALOG', '1') == '1'  # set to '0' to start without loading the data
+    CATALOG_IMAGES = os.environ.get('FLASK_CATALOG_IMAGES', os.path.join(os.path.dirname(os.path.dirname(
+        os.path.abspath(__file__))), 'source', 'images'))  # images mirrored by source/mirror.py
+
+    # Profile picture configuration
+    PICTURE_SIZES = (32, 64, 125, 256)  # sizes (px) each upload is resized to, as WebP and JPEG
+    PICTURE_WORKERS = max(1, (os.cpu_count() or 1) // 2)  # processes resizing uploads
+    PICTURE_UPLOAD_FOLDER = os.environ.get('FLASK_PICTURE_UPLOADS', os.path.join(
+        tempfile.gettempdir(), 'flaskapp-uploads'))  # uploads waiting to be resized (not served, unlike profile_pics)
 
     # Mail configuration
-    MAIL_SERVER = 'smtp.googlemail.com'  # using gmail
-    MAIL_PORT = '587'  # req port info
-    MAIL_USE_TLS = True
+    MAIL_SERVER = os.environ.get('FLASK_EMAIL_SERVER', 'smtp.googlemail.com')  # using gmail
+    MAIL_PORT = int(os.environ.get('FLASK_EMAIL_PORT', '587'))  # req port info
+    MAIL_USE_TLS = os.environ.get('FLASK_EMAIL_TLS', '1') == '1'
     MAIL_USERNAME = os.environ.get('FLASK_EMAIL_USER')  # gmail account (requires disabling gmail's secure app access)
     MAIL_PASSWORD = os.environ.get('FLASK_EMAIL_PASS')  # gmail password
+
+    # Outbox configuration (background email sending)
+    OUTBOX_WORKERS = int(os.environ.get('FLASK_OUTBOX_WORKERS', '2'))  # background senders per process
+    OUTBOX_BATCH_SIZE = 20  # emails sent per SMTP connection
+    OUTBOX_MAX_ATTEMPTS = 8  # attempts before giving up on an email
+
+
+# Production configuration (used by wsgi.py)
+# gunicorn (gunicorn.conf.py) creates and warms up the app once, then forks its workers; threads don't survive a fork,
+# so background jobs are started in each worker instead (post_fork).
+class ProductionConfig(Config):
+
+    # gunicorn only listens on 127.0.0.1 (gunicorn.conf.py), behind a reverse proxy (e.g. nginx) that sets
+    # X-Forwarded-For/X-Forwarded-Proto. The app trusts that many proxies' headers for the client's IP address (used by
+    # rate limits) and scheme; without it, every client would share the proxy's address. Set FLASK_PROXY_COUNT to the
+    # number of proxies in front of gunicorn (0 if it is reached directly, as headers could then be forged by clients).
+    PROXY_COUNT = int(os.environ.get('FLASK_PROXY_COUNT', '1'))
@@ -0,0 +1,68 @@
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+
+
+# Database with a tuned engine profile
+# Flask-SQLAlchemy's defaults open a new connection for every SQLite checkout (NullPool) and leave SQLite in rollback
+# journal mode, where a writer blocks every reader. With DATABASE_TUNING on, SQLite files get a connection pool and
+# SQLITE_PRAGMAS on each new connection (WAL journal: readers never wait for the writer), and server databases (e.g.
+# PostgreSQL/MySQL) get a sized pool that checks connections before use and recycles them before the server drops them.
+# Options set explicitly in SQLALCHEMY_ENGINE_OPTIONS still take priority.
+class Database(SQLAlchemy):
+
+    def __init__(self, *args, **kwargs):
+        self._pragmas = {}  # database URL -> pragmas applied to its SQLite connections
+        super().__init__(*args, **kwargs)
+
+    def init_app(self, app):
+
+        # Default settings (overridden by app config)
+        app.config.setdefault('DATABASE_TUNING', True)  # False = Flask-SQLAlchemy defaults
+        app.config.setdefault('DATABASE_POOL_SIZE', 5)  # connections kept open per process
+        app.config.setdefault('DATABASE_MAX_OVERFLOW', 10)  # extra connections opened under load (closed after use)
+        app.config.setdefault('DATABASE_POOL_TIMEOUT', 10)  # seconds to wait for a free connection
+        app.config.setdefault('DATABASE_POOL_RECYCLE', 1800)  # seconds before a server connection is replaced
+        app.config.setdefault('DATABASE_POOL_PRE_PING', True)  # test server connections on checkout
+        app.config.setdefault('SQLITE_PRAGMAS', {'journal_mode': 'wal', 'synchronous': 'normal', 'busy_timeout': 5000,
+                                                 'mmap_size': 256 * 2 ** 20, 'cache_size': -64000})
+
+        super().init_app(app)
+
+    # Engine options (called by Flask-SQLAlchemy before each engine is created)
+    def apply_driver_hacks(self, app, sa_url, options):
+
+        config = app.config
+        if not config['DATABASE_TUNING']:
+            return super().apply_driver_hacks(app, sa_url, options)
+
+        pool = {'pool_size': config['DATABASE_POOL_SIZE'], 'max_overflow': config['DATABASE_MAX_OVERFLOW'],
+                'pool_timeout': config['DATABASE_POOL_TIMEOUT']}
+        sqlite = sa_url.drivername.startswith('sqlite')
+        if not sqlite:
+            options.update(pool, pool_recycle=config['DATABASE_POOL_RECYCLE'],
+                           pool_pre_ping=config['DATABASE_POOL_PRE_PING'])
+        elif sa_url.database not in (None, '', ':memory:') and config['DATABASE_POOL_SIZE']:
+            options.update(pool, poolclass=QueuePool)  # (SQLite files default to NullPool)
+            options.setdefault('connect_args', {})['check_same_thread'] = False  # pooled connections change threads
+
+        sa_url, options = super().apply_driver_hacks(app, sa_url, options)
+        if sqlite:
+            self._pragmas[str(sa_url)] = config['SQLITE_PRAGMAS']
+        return sa_url, options
+
+    def create_engine(self, sa_url, engine_opts):
+
+        engine = super().create_engine(sa_url, engine_opts)
+        pragmas = self._pragmas.get(str(sa_url))
+        if pragmas:
+            event.listen(engine, 'connect', lambda dbapi_conn, _: set_pragmas(dbapi_conn, pragmas))
+        return engine
+
+
+# Apply pragmas to a new SQLite connection
+def set_pragmas(dbapi_conn, pragmas):
+    cursor = dbapi_conn.cursor()
+    for name, value in pragmas.items():
+        cursor.execute(f'PRAGMA {name} = {value}')
+    cursor.close()
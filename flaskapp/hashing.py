@@ -0,0 +1,62 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.exceptions import ServiceUnavailable
+from flaskapp.metrics import metrics
+
+
+# Password hashing service
+# bcrypt is deliberately slow, so hashing/checking runs in a bounded worker pool instead of on request threads (bcrypt
+# releases the GIL, so threads use every core). At most PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE operations can be
+# in flight; further requests are rejected straight away with a 503 instead of piling up behind a login burst.
+class PasswordHasher:
+
+    def __init__(self, app=None, bcrypt=None):
+        self.bcrypt = bcrypt  # Flask-Bcrypt instance doing the hashing
+        self._pool = None
+        self._slots = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+
+        # Default settings (overridden by app config)
+        app.config.setdefault('BCRYPT_LOG_ROUNDS', 12)  # bcrypt cost factor (each +1 doubles hashing time)
+        app.config.setdefault('PASSWORD_HASH_WORKERS', os.cpu_count() or 1)  # concurrent hashing operations
+        app.config.setdefault('PASSWORD_HASH_QUEUE', 2 * app.config['PASSWORD_HASH_WORKERS'])  # operations waiting
+
+        app.extensions['password_hasher'] = self
+        self.rounds = app.config['BCRYPT_LOG_ROUNDS']
+        workers = app.config['PASSWORD_HASH_WORKERS']
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hasher')
+        self._slots = threading.BoundedSemaphore(workers + app.config['PASSWORD_HASH_QUEUE'])
+
+    # Hash password with the configured cost
+    def hash(self, password):
+        return self._run(self.bcrypt.generate_password_hash, password, self.rounds).decode('utf-8')
+
+    # Check password against stored hash
+    def check(self, pw_hash, password):
+        return self._run(self.bcrypt.check_password_hash, pw_hash, password)
+
+    # Check whether stored hash uses a different cost than configured (hash format: $2b$<cost>$<salt+hash>)
+    def needs_rehash(self, pw_hash):
+        try:
+            return int(pw_hash.split('$')[2]) != self.rounds
+        except (IndexError, ValueError):
+            return True
+
+    # Run operation in the pool, or reject if the pool is saturated
+    def _run(self, func, *args):
+        if not self._slots.acquire(blocking=False):
+            raise ServiceUnavailable('Server busy, please try again shortly.', retry_after=1)
+        with metrics.timed('bcrypt'):  # includes time queued
+            try:
+                future = self._pool.submit(func, *args)
+            except BaseException:
+                self._slots.release()
+                raise
+            future.add_done_callback(lambda _: self._slots.release())
+            return future.result()
@@ -1,4 +1,5 @@
-from flask import Blueprint, render_template
+from flask import Blueprint, render_template, jsonify, abort, request
+from flaskapp import catalog
 
 main = Blueprint('main', __name__)  # setup blueprint for 'main' directory
 
@@ -7,3 +8,82 @@ main = Blueprint('main', __name__)  # setup blueprint for 'main' directory
 @main.route("/")
 def home():
     return render_template('home.html', title='Home')
+
+
+# Eurovision pages (browse by year or country)
+@main.route("/eurovision")
+@catalog.cached(per_user=True)
+def eurovision():
+    return render_template('eurovision.html', title='Eurovision', years=catalog.years(),
+                           countries=catalog.countries())
+
+
+@main.route("/eurovision/<int:year>")
+@catalog.cached(per_user=True)
+def eurovision_year(year):
+    if year not in catalog.years():
+        abort(404)
+    return render_template('eurovision_entries.html', title=f'Eurovision {year}', heading=f'Eurovision {year}',
+                           events=catalog.years()[year], entries=catalog.by_year(year), show='country')
+
+
+@main.route("/eurovision/country/<country>")
+@catalog.cached(per_user=True)
+def eurovision_country(country):
+    if catalog.country(country) is None:
+        abort(404)
+    return render_template('eurovision_entries.html', title=country, heading=country,
+                           country=catalog.country(country), entries=catalog.by_country(country), show='event')
+
+
+# Mirrored logos and artist images
+@main.route("/eurovision/images/<path:filename>")
+def eurovision_image(filename):
+    return catalog.send_image(filename)
+
+
+# Search (artists, songs, countries and events; typos allowed)
+@main.route("/search")
+@catalog.cached(per_user=True)
+def search():
+    query = request.args.get('q', '').strip()
+    results = catalog.search(query, limit=50) if query else []
+    return render_template('search.html', title='Search', query=query, results=results)
+
+
+@main.route("/api/search")
+@catalog.cached()
+def api_search():
+    query = request.args.get('q', '').strip()
+    limit = max(1, min(request.args.get('limit', 20, type=int), 100))  # (1 to 100 results)
+    return jsonify(version=catalog.version, query=query, results=catalog.search(query, limit) if query else [])
+
+
+# Eurovision data (JSON)
+@main.route("/api/eurovision/years")
+@catalog.cached()
+def api_years():
+    return jsonify(version=catalog.version,
+                   years=[{'year': year, 'events': events} for year, events in catalog.years().items()])
+
+
+@main.route("/api/eurovision/years/<int:year>")
+@catalog.cached()
+def api_year(year):
+    if year not in catalog.years():
+        abort(404)
+    return jsonify(version=catalog.version, year=year, events=catalog.years()[year], entries=catalog.by_year(year))
+
+
+@main.route("/api/eurovision/countries")
+@catalog.cached()
+def api_countries():
+    return jsonify(version=catalog.version, countries=catalog.countries())
+
+
+@main.route("/api/eurovision/countries/<country>")
+@catalog.cached()
+def api_country(country):
+    if catalog.country(country) is None:
+        abort(404)
+    return jsonify(version=catalog.version, country=catalog.country(country), entries=catalog.by_country(country))
@@ -0,0 +1,211 @@
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from flask import g, request, current_app, has_request_context, Response
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)  # seconds
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)  # SQL queries per request
+
+
+# Request performance metrics
+# Records, per endpoint: latency histogram, SQL query count/time (from SQLAlchemy engine events), and time spent in
+# bcrypt, Pillow and mail (via metrics.timed()). Work done in the background (emails, picture resizing) is recorded
+# with an empty endpoint. Requests slower than METRICS_SLOW_REQUEST_MS are logged with their breakdown. Everything is
+# served in Prometheus text format at METRICS_PATH. Metrics are per process.
+class Metrics:
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self._listening = False
+        self.reset()
+        if app is not None:
+            self.init_app(app)
+
+    # Forget everything recorded so far (e.g. warmup requests, see startup.py)
+    def reset(self):
+        with self._lock:
+            self._latency = defaultdict(lambda: [[0] * (len(LATENCY_BUCKETS) + 1), 0.0])  # (endpoint, method) -> hist
+            self._queries = defaultdict(lambda: [[0] * (len(QUERY_BUCKETS) + 1), 0])  # endpoint -> query count hist
+            self._requests = defaultdict(int)  # (endpoint, method, status) -> requests
+            self._sql_seconds = defaultdict(float)  # endpoint -> seconds in SQL
+            self._component_seconds = defaultdict(float)  # (component, endpoint) -> seconds
+            self._component_calls = defaultdict(int)  # (component, endpoint) -> calls
+            self._slow = defaultdict(int)  # endpoint -> slow requests
+
+    def init_app(self, app):
+
+        # Default settings (overridden by app config)
+        app.config.setdefault('METRICS_ENABLED', True)
+        app.config.setdefault('METRICS_PATH', '/metrics')  # Prometheus scrape URL
+        app.config.setdefault('METRICS_SLOW_REQUEST_MS', 500)  # log requests slower than this
+
+        app.extensions['metrics'] = self
+        if not app.config['METRICS_ENABLED']:
+            return
+
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        app.teardown_request(self._teardown)
+        app.add_url_rule(app.config['METRICS_PATH'], 'metrics', self.render)
+
+        if not self._listening:
+            event.listen(Engine, 'before_cursor_execute', self._before_query)
+            event.listen(Engine, 'after_cursor_execute', self._after_query)
+            event.listen(Engine, 'handle_error', self._query_failed)
+            self._listening = True
+
+    # Time a block of work as 'component' (e.g. with metrics.timed('bcrypt'): ...)
+    @contextmanager
+    def timed(self, component):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(component, time.perf_counter() - start)
+
+    # Record time spent in a component (attributed to the current request, if any)
+    def observe(self, component, seconds):
+        in_request = has_request_context() and hasattr(g, 'metrics_components')
+        endpoint = (request.endpoint or 'unmatched') if in_request else ''
+        if in_request:
+            g.metrics_components[component] = g.metrics_components.get(component, 0.0) + seconds
+        with self._lock:
+            self._component_seconds[component, endpoint] += seconds
+            self._component_calls[component, endpoint] += 1
+
+    # Request hooks
+    def _start(self):
+        g.metrics_start = time.perf_counter()
+        g.metrics_recorded = False  # (g outlives the request when an app context was already pushed, e.g. in tests)
+        g.metrics_queries = 0
+        g.metrics_sql_seconds = 0.0
+        g.metrics_components = {}
+
+    def _finish(self, response):
+        self._record(response.status_code)
+        return response
+
+    def _teardown(self, error):
+        if error is not None:
+            self._record(500)  # unhandled exception (after_request is skipped)
+
+    def _record(self, status):
+
+        if not hasattr(g, 'metrics_start') or getattr(g, 'metrics_recorded', False):
+            return
+        g.metrics_recorded = True
+        seconds = time.perf_counter() - g.metrics_start
+        endpoint = request.endpoint or 'unmatched'
+
+        with self._lock:
+            histogram = self._latency[endpoint, request.method]
+            histogram[0][_bucket(LATENCY_BUCKETS, seconds)] += 1
+            histogram[1] += seconds
+            histogram = self._queries[endpoint]
+            histogram[0][_bucket(QUERY_BUCKETS, g.metrics_queries)] += 1
+            histogram[1] += g.metrics_queries
+            self._requests[endpoint, request.method, status] += 1
+            self._sql_seconds[endpoint] += g.metrics_sql_seconds
+
+        # Log slow requests, with where the time went
+        if seconds * 1000 >= current_app.config['METRICS_SLOW_REQUEST_MS']:
+            with self._lock:
+                self._slow[endpoint] += 1
+            parts = ''.join(f', {name} {value * 1000:.0f}ms' for name, value in sorted(g.metrics_components.items()))
+            current_app.logger.warning('Slow request: %s %s (%s) %.0fms, %s queries %.0fms%s', request.method,
+                                       request.path, endpoint, seconds * 1000, g.metrics_queries,
+                                       g.metrics_sql_seconds * 1000, parts)
+
+    # SQL hooks (count/time queries made during requests, including failed ones)
+    # The start time is kept on the statement's execution context, so nothing is left behind when a query fails
+    @staticmethod
+    def _before_query(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:  # (None for SQLAlchemy's own checks when connecting)
+            context.metrics_query_start = time.perf_counter()
+
+    @staticmethod
+    def _after_query(conn, cursor, statement, parameters, context, executemany):
+        _count_query(context)
+
+    @staticmethod
+    def _query_failed(exception_context):
+        _count_query(exception_context.execution_context)
+
+    # Prometheus text format
+    def render(self):
+
+        lines = []
+
+        def header(name, kind, text):
+            lines.append(f'# HELP {name} {text}')
+            lines.append(f'# TYPE {name} {kind}')
+
+        def histogram(name, buckets, counts, total, labels):
+            cumulative = 0
+            for bound, count in zip(list(buckets) + ['+Inf'], counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_sum{{{labels}}} {total}')
+            lines.append(f'{name}_count{{{labels}}} {cumulative}')
+
+        with self._lock:
+            header('flaskapp_request_duration_seconds', 'histogram', 'Request latency.')
+            for (endpoint, method), (counts, total) in sorted(self._latency.items()):
+                histogram('flaskapp_request_duration_seconds', LATENCY_BUCKETS, counts, total,
+                          f'endpoint="{endpoint}",method="{method}"')
+            header('flaskapp_requests_total', 'counter', 'Requests by response status.')
+            for (endpoint, method, status), count in sorted(self._requests.items()):
+                lines.append(f'flaskapp_requests_total{{endpoint="{endpoint}",method="{method}",status="{status}"}} '
+                             f'{count}')
+            header('flaskapp_request_sql_queries', 'histogram', 'SQL queries per request.')
+            for endpoint, (counts, total) in sorted(self._queries.items()):
+                histogram('flaskapp_request_sql_queries', QUERY_BUCKETS, counts, total, f'endpoint="{endpoint}"')
+            header('flaskapp_request_sql_seconds_total', 'counter', 'Time spent in SQL queries during requests.')
+            for endpoint, seconds in sorted(self._sql_seconds.items()):
+                lines.append(f'flaskapp_request_sql_seconds_total{{endpoint="{endpoint}"}} {seconds}')
+            header('flaskapp_component_seconds_total', 'counter', 'Time spent in bcrypt, Pillow and mail.')
+            for (component, endpoint), seconds in sorted(self._component_seconds.items()):
+                lines.append(f'flaskapp_component_seconds_total{{component="{component}",endpoint="{endpoint}"}} '
+                             f'{seconds}')
+            header('flaskapp_component_calls_total', 'counter', 'Calls to bcrypt, Pillow and mail.')
+            for (component, endpoint), count in sorted(self._component_calls.items()):
+                lines.append(f'flaskapp_component_calls_total{{component="{component}",endpoint="{endpoint}"}} '
+                             f'{count}')
+            header('flaskapp_slow_requests_total', 'counter', 'Requests slower than METRICS_SLOW_REQUEST_MS.')
+            for endpoint, count in sorted(self._slow.items()):
+                lines.append(f'flaskapp_slow_requests_total{{endpoint="{endpoint}"}} {count}')
+
+        # Other extensions' counters
+        user_cache = current_app.extensions.get('user_cache')
+        if user_cache is not None:
+            stats = user_cache.stats()
+            header('flaskapp_user_cache_lookups_total', 'counter', 'Logged-in user lookups.')
+            lines.append(f'flaskapp_user_cache_lookups_total{{result="hit"}} {stats["hits"]}')
+            lines.append(f'flaskapp_user_cache_lookups_total{{result="miss"}} {stats["misses"]}')
+
+        return Response('\n'.join(lines) + '\n', mimetype='text/plain; version=0.0.4')
+
+
+# Add a query to the current request's count and SQL time (once per statement)
+def _count_query(context):
+    start = getattr(context, 'metrics_query_start', None)
+    if start is None:
+        return
+    context.metrics_query_start = None
+    if has_request_context() and hasattr(g, 'metrics_queries'):
+        g.metrics_queries += 1
+        g.metrics_sql_seconds += time.perf_counter() - start
+
+
+# Index of the histogram bucket a value falls in (last = +Inf)
+def _bucket(buckets, value):
+    for i, bound in enumerate(buckets):
+        if value <= bound:
+            return i
+    return len(buckets)
+
+
+metrics = Metrics()  # shared instance (imported by the modules it times)
@@ -0,0 +1,83 @@
+import click
+from flask import current_app
+from flask.cli import AppGroup, with_appcontext
+from sqlalchemy import inspect, text
+from flaskapp import db
+from flaskapp.models import User, canonical
+
+
+# Database migrations
+# Upgrades an existing database (e.g. site.db) in place. New tables are created by db.create_all(); each step below
+# alters existing tables, checks whether it has already been applied, and is therefore safe to re-run.
+
+
+# Add lowercase username/email lookup keys to 'user', backfill them, then index them
+def add_user_lookup_keys(engine):
+
+    columns = {column['name'] for column in inspect(engine).get_columns('user')}
+    with engine.begin() as conn:
+        if 'username_key' not in columns:
+            conn.execute(text('ALTER TABLE user ADD COLUMN username_key VARCHAR(12)'))
+        if 'email_key' not in columns:
+            conn.execute(text('ALTER TABLE user ADD COLUMN email_key VARCHAR(128)'))
+
+        # Backfill in Python (SQL lower() only folds ASCII in SQLite)
+        rows = conn.execute(text('SELECT id, username, email FROM user '
+                                 'WHERE username_key IS NULL OR email_key IS NULL')).fetchall()
+        keys = [{'id': row.id, 'username_key': canonical(row.username), 'email_key': canonical(row.email)}
+                for row in rows]
+        if keys:
+            conn.execute(text('UPDATE user SET username_key = :username_key, email_key = :email_key WHERE id = :id'),
+                         keys)
+
+        # Accounts that only differ by case cannot share a unique key, these need resolving by hand first
+        for column in ('username_key', 'email_key'):
+            clashes = conn.execute(text(f'SELECT {column} FROM user GROUP BY {column} HAVING count(*) > 1')).fetchall()
+            if clashes:
+                raise click.ClickException(f'Duplicate {column} values: ' + ', '.join(row[0] for row in clashes))
+
+    indexes = {index['name'] for index in inspect(engine).get_indexes('user')}
+    with engine.begin() as conn:
+        if 'ix_user_username_key' not in indexes:
+            conn.execute(text('CREATE UNIQUE INDEX ix_user_username_key ON user (username_key)'))
+        if 'ix_user_email_key' not in indexes:
+            conn.execute(text('CREATE UNIQUE INDEX ix_user_email_key ON user (email_key)'))
+
+
+# Index unverified accounts by registration date (used by 'flask users reap')
+def add_user_unverified_index(engine):
+
+    if 'ix_user_unverified' not in {index['name'] for index in inspect(engine).get_indexes('user')}:
+        with engine.begin() as conn:
+            conn.execute(text('CREATE INDEX ix_user_unverified ON user (confirm_account, date_register)'))
+
+
+# Index profile pictures (pictures are shared by content, so deleting one checks for other users)
+def add_user_image_file_index(engine):
+
+    if 'ix_user_image_file' not in {index['name'] for index in inspect(engine).get_indexes('user')}:
+        with engine.begin() as conn:
+            conn.execute(text('CREATE INDEX ix_user_image_file ON user (image_file)'))
+
+
+# Steps, in the order they are applied
+STEPS = [add_user_lookup_keys, add_user_unverified_index, add_user_image_file_index]
+
+
+def upgrade():
+    engine = db.get_engine(current_app)
+    db.create_all()  # create any missing tables (e.g. on a new database)
+    for step in STEPS:
+        step(engine)
+        click.echo(f'Applied {step.__name__}')
+
+
+# Command line tools ('flask db ...')
+db_cli = AppGroup('db', help='Manage the database.')
+
+
+@db_cli.command('upgrade')
+@with_appcontext
+def db_upgrade():
+    upgrade()
+    click.echo(f'Database up to date ({User.query.count()} users).')
@@ -1,57 +1,89 @@
+from datetime import datetime
 from flask import current_app
-from flaskapp import db, login_manager
+from flaskapp import db, login_manager, user_cache, tokens
 from flask_login import UserMixin
-from itsdangerous import TimedJSONWebSignatureSerializer as Serializer
+from sqlalchemy.orm import validates
+
+
+# Canonical form of usernames/emails (used for case-insensitive, indexed lookups)
+def canonical(value):
+    return value.strip().lower()
 
 
 # Handle login for active user sessions
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    return user_cache.get(User, int(user_id))  # cached, to avoid a query on every page view
 
 
 # Setup user database
-# noinspection PyBroadException
 class User(db.Model, UserMixin):
 
     id = db.Column(db.Integer, primary_key=True)  # unique id
     username = db.Column(db.String(12), unique=True, nullable=False)  # unique username
     email = db.Column(db.String(128), unique=True, nullable=False)  # unique email
-    image_file = db.Column(db.String(128), nullable=False, default='default.jpg')  # profile pic
+    username_key = db.Column(db.String(12), unique=True, index=True, nullable=False)  # lowercase username (lookups)
+    email_key = db.Column(db.String(128), unique=True, index=True, nullable=False)  # lowercase email (lookups)
+    image_file = db.Column(db.String(128), nullable=False, default='default.jpg', index=True)  # profile pic
     password = db.Column(db.String(60), nullable=False)  # password (hashed)
     confirm_account = db.Column(db.Boolean, nullable=False, default=False)  # has account been verified?
     date_register = db.Column(db.DateTime, nullable=False)  # date/time when initial registry
     date_verify = db.Column(db.DateTime, nullable=True)  # date/time when account verified
     temp_email = db.Column(db.String(128), unique=True, nullable=True)  # to store new email until verified (if changed)
 
-    # Email authentication
-    def get_auth_token_email(self, expires_seconds=900):  # create token, valid for 15 mins
-        s = Serializer(current_app.config['SECRET_KEY'], expires_seconds)
-        return s.dumps({'user_id': self.id}).decode('utf-8')  # link key to user
+    __table_args__ = (db.Index('ix_user_unverified', 'confirm_account', 'date_register'),)  # find expired accounts
+
+    # Keep lookup keys in step with username/email
+    @validates('username')
+    def validate_username(self, key, username):
+        self.username_key = canonical(username)
+        return username
+
+    @validates('email')
+    def validate_email(self, key, email):
+        self.email_key = canonical(email)
+        return email
+
+    # Email authentication (token stops working once the account is verified or its email changes)
+    def get_auth_token_email(self, expires_seconds=None):  # create token, valid for 15 mins (AUTH_TOKEN_SECONDS)
+        return tokens.create('email', self, expires_seconds or current_app.config['AUTH_TOKEN_SECONDS'])
 
     @staticmethod
-    def verify_auth_token_email(token):  # verify token, if valid
-        s = Serializer(current_app.config['SECRET_KEY'])
-        try:
-            user_id = s.loads(token)['user_id']  # check if token is valid
-        except:
-            return None
-        return User.query.get(user_id)
-
-    # Password reset
-    def get_reset_token_pw(self, expires_seconds=3600):  # create token, valid for 60 mins
-        s = Serializer(current_app.config['SECRET_KEY'], expires_seconds)
-        return s.dumps({'user_id': self.id}).decode('utf-8')  # link key to user
+    def verify_auth_token_email(token, fresh=False):  # verify token, if valid (fresh: check against the database)
+        return tokens.verify('email', token, fresh)
+
+    # Password reset (token stops working once the password changes)
+    def get_reset_token_pw(self, expires_seconds=None):  # create token, valid for 60 mins (RESET_TOKEN_SECONDS)
+        return tokens.create('reset', self, expires_seconds or current_app.config['RESET_TOKEN_SECONDS'])
 
     @staticmethod
-    def verify_reset_token_pw(token):
-        s = Serializer(current_app.config['SECRET_KEY'])
-        try:
-            user_id = s.loads(token)['user_id']  # check if token is valid
-        except:
-            return None
-        return User.query.get(user_id)
+    def verify_reset_token_pw(token, fresh=False):  # verify token, if valid (fresh: check against the database)
+        return tokens.verify('reset', token, fresh)
 
     # return values usable elsewhere
     def __repr__(self):
         return f"User('{self.username}', '{self.email}', '{self.image_file}')"
+
+
+# Setup outbox database (emails queued for background sending)
+class OutboxMessage(db.Model):
+
+    id = db.Column(db.Integer, primary_key=True)  # unique id
+    subject = db.Column(db.String(128), nullable=False)  # email subject
+    sender = db.Column(db.String(128), nullable=False)  # email sender (from)
+    recipients = db.Column(db.Text, nullable=False)  # email recipients (to), comma separated
+    body = db.Column(db.Text, nullable=False)  # email body (plain text)
+    status = db.Column(db.String(8), nullable=False, default='pending')  # 'pending', 'sent' or 'failed'
+    attempts = db.Column(db.Integer, nullable=False, default=0)  # number of failed send attempts
+    next_attempt = db.Column(db.DateTime, nullable=False, default=datetime.now)  # earliest time to (re)try sending
+    claimed_by = db.Column(db.String(32), nullable=True)  # sender currently holding the message
+    claimed_until = db.Column(db.DateTime, nullable=True)  # claim expiry (released if sender dies mid-batch)
+    date_queued = db.Column(db.DateTime, nullable=False, default=datetime.now)  # date/time when queued
+    date_sent = db.Column(db.DateTime, nullable=True)  # date/time when sent
+    last_error = db.Column(db.String(256), nullable=True)  # reason for last failed attempt
+
+    __table_args__ = (db.Index('ix_outbox_message_due', 'status', 'next_attempt'),)  # find due messages quickly
+
+    # return values usable elsewhere
+    def __repr__(self):
+        return f"OutboxMessage('{self.subject}', '{self.recipients}', '{self.status}')"
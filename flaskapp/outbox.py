@@ -0,0 +1,211 @@
+import secrets
+import smtplib
+import threading
+from datetime import datetime, timedelta
+import click
+from flask import current_app
+from flask.cli import AppGroup, with_appcontext
+from flask_mail import Message
+from flaskapp.metrics import metrics
+
+
+# Background email queue
+# Emails are stored in the 'outbox_message' table and sent by a pool of background senders, so requests never wait on
+# the mail server. Each sender claims a batch of due messages, sends them over one (reused) SMTP connection, and
+# reschedules any failures with exponential backoff.
+class Outbox:
+
+    def __init__(self, app=None, mail=None, db=None):
+        self.mail = mail  # Flask-Mail instance used to open SMTP connections
+        self.db = db  # Flask-SQLAlchemy instance storing the queue
+        self._wakeup = threading.Event()  # set when a message is queued, so idle senders start straight away
+        self._stop = threading.Event()  # set to shut senders down
+        self._threads = []  # running sender threads
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+
+        # Default settings (overridden by app config)
+        app.config.setdefault('OUTBOX_WORKERS', 2)  # background senders per process (0 = only 'flask outbox')
+        app.config.setdefault('OUTBOX_BATCH_SIZE', 20)  # emails sent per SMTP connection
+        app.config.setdefault('OUTBOX_POLL_SECONDS', 5)  # how often idle senders check for due/retried emails
+        app.config.setdefault('OUTBOX_CLAIM_SECONDS', 300)  # how long a batch is held before others may take it
+        app.config.setdefault('OUTBOX_MAX_ATTEMPTS', 8)  # attempts before an email is marked as failed
+        app.config.setdefault('OUTBOX_BACKOFF_SECONDS', 30)  # first retry delay (doubles per attempt)
+        app.config.setdefault('OUTBOX_BACKOFF_MAX_SECONDS', 3600)  # longest retry delay
+
+        app.extensions['outbox'] = self
+        app.cli.add_command(outbox_cli)
+
+    # Queue email (replaces mail.send)
+    def put(self, msg):
+
+        from flaskapp.models import OutboxMessage  # inserted here to prevent circular reference
+
+        row = OutboxMessage(subject=msg.subject, sender=msg.sender, recipients=','.join(msg.recipients), body=msg.body)
+        self.db.session.add(row)  # add row entry
+        self.db.session.commit()  # save changes (email is now persistent)
+        self._wakeup.set()  # wake an idle sender
+        return row
+
+    # Start background senders
+    def start(self, app):
+
+        self._stop.clear()
+        self._threads = [t for t in self._threads if t.is_alive()]  # keep senders that are still running
+        for _ in range(app.config['OUTBOX_WORKERS'] - len(self._threads)):
+            thread = threading.Thread(target=self._run, args=(app,), name='outbox-sender', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    # Stop background senders (waits for in-flight batches)
+    def stop(self, timeout=None):
+
+        self._stop.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    # Send all due emails in the calling thread (used by 'flask outbox send' and when no senders are running)
+    def drain(self):
+
+        sent = failed = 0
+        while True:
+            batch = self._claim(secrets.token_hex(8))
+            if not batch:
+                return sent, failed
+            batch_sent, batch_failed = self._send_batch(batch)
+            sent += batch_sent
+            failed += batch_failed
+
+    # Sender loop
+    def _run(self, app):
+
+        worker_id = secrets.token_hex(8)  # identifies this sender's claims
+        while not self._stop.is_set():
+            try:
+                with app.app_context():
+                    batch = self._claim(worker_id)
+                    if batch:
+                        self._send_batch(batch)
+                        continue  # more may be due, check again straight away
+            except Exception:
+                app.logger.exception('Outbox sender error')
+            self._wakeup.wait(app.config['OUTBOX_POLL_SECONDS'])  # sleep until new email or next poll
+            self._wakeup.clear()
+
+    # Claim a batch of due emails
+    def _claim(self, worker_id):
+
+        from flaskapp.models import OutboxMessage  # inserted here to prevent circular reference
+
+        config = current_app.config
+        now = datetime.now()
+        claimable = (OutboxMessage.status == 'pending',
+                     OutboxMessage.next_attempt <= now,
+                     self.db.or_(OutboxMessage.claimed_until.is_(None), OutboxMessage.claimed_until < now))
+
+        ids = [row.id for row in OutboxMessage.query.with_entities(OutboxMessage.id)
+               .filter(*claimable).order_by(OutboxMessage.next_attempt).limit(config['OUTBOX_BATCH_SIZE'])]
+        if not ids:
+            self.db.session.rollback()  # end read transaction
+            return []
+
+        # Conditional update, so two senders can never claim the same email
+        OutboxMessage.query.filter(OutboxMessage.id.in_(ids), *claimable).update(
+            {'claimed_by': worker_id,
+             'claimed_until': now + timedelta(seconds=config['OUTBOX_CLAIM_SECONDS'])},
+            synchronize_session=False)
+        self.db.session.commit()  # save changes
+
+        return OutboxMessage.query.filter_by(claimed_by=worker_id, status='pending').order_by(OutboxMessage.id).all()
+
+    # Send a batch of emails over one SMTP connection
+    def _send_batch(self, batch):
+
+        sent = failed = 0
+        conn = None
+        try:
+            for i, row in enumerate(batch):
+
+                # Open SMTP connection (reused for the rest of the batch)
+                if conn is None:
+                    try:
+                        conn = self.mail.connect()
+                        with metrics.timed('mail'):
+                            conn.__enter__()
+                    except (smtplib.SMTPException, OSError) as error:  # mail server unavailable, retry whole batch
+                        conn = None
+                        for pending in batch[i:]:
+                            self._retry(pending, error)
+                        self.db.session.commit()  # save changes
+                        return sent, failed + len(batch) - i
+
+                try:
+                    msg = Message(row.subject, sender=row.sender, recipients=row.recipients.split(','), body=row.body)
+                    with metrics.timed('mail'):
+                        conn.send(msg)  # send email
+                except Exception as error:  # (not only SMTP errors, e.g. an address smtplib can't encode)
+                    if not isinstance(error, (smtplib.SMTPException, OSError)):
+                        current_app.logger.exception('Outbox email %s could not be sent', row.id)
+                    self._retry(row, error)
+                    failed += 1
+                    conn = self._close(conn)  # connection may be broken (or mid-message), reconnect for next email
+                else:
+                    row.status = 'sent'
+                    row.date_sent = datetime.now()
+                    row.claimed_by = row.claimed_until = None
+                    sent += 1
+                self.db.session.commit()  # save changes (per email, so a crash never resends a batch)
+        finally:
+            self._close(conn)
+
+        return sent, failed
+
+    # Reschedule a failed email
+    def _retry(self, row, error):
+
+        config = current_app.config
+        row.attempts += 1
+        row.last_error = str(error)[:256]
+        row.claimed_by = row.claimed_until = None
+        if row.attempts >= config['OUTBOX_MAX_ATTEMPTS']:
+            row.status = 'failed'  # give up
+            current_app.logger.error('Outbox email %s failed after %s attempts: %s', row.id, row.attempts, error)
+        else:
+            delay = min(config['OUTBOX_BACKOFF_SECONDS'] * 2 ** (row.attempts - 1),
+                        config['OUTBOX_BACKOFF_MAX_SECONDS'])
+            row.next_attempt = datetime.now() + timedelta(seconds=delay)
+
+    # Close SMTP connection, ignoring errors from a broken connection
+    @staticmethod
+    def _close(conn):
+
+        if conn is not None:
+            try:
+                conn.__exit__(None, None, None)
+            except (smtplib.SMTPException, OSError):
+                pass
+        return None
+
+
+# Command line tools ('flask outbox ...')
+outbox_cli = AppGroup('outbox', help='Manage the background email queue.')
+
+
+@outbox_cli.command('send')
+@with_appcontext
+def outbox_send():
+    sent, failed = current_app.extensions['outbox'].drain()
+    click.echo(f'{sent} sent, {failed} failed.')
+
+
+@outbox_cli.command('status')
+@with_appcontext
+def outbox_status():
+    from flaskapp.models import OutboxMessage  # inserted here to prevent circular reference
+    db = current_app.extensions['outbox'].db
+    for status, count in db.session.query(OutboxMessage.status, db.func.count()).group_by(OutboxMessage.status):
+        click.echo(f'{status}: {count}')
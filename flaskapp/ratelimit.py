@@ -0,0 +1,107 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, request
+from werkzeug.exceptions import TooManyRequests
+
+
+# Rate limiter (sliding window)
+# Limits how often one IP address (request.remote_addr; set PROXY_COUNT behind a reverse proxy, see config.py), and one
+# account (e.g. the email address typed into a form), can hit an expensive endpoint. Each key keeps one counter per
+# fixed window; the sliding window count is the current window's count plus the previous window's count weighted by how
+# much of it still overlaps the sliding window. Requests over the limit get a 429 response with a Retry-After header.
+# Counters live in a storage backend: MemoryStorage (per process) by default, or any object with the same incr()
+# method (e.g. backed by a shared store, for several worker processes).
+class RateLimiter:
+
+    def __init__(self, app=None, storage=None):
+        self.storage = storage  # counter storage (None = MemoryStorage sized by RATELIMIT_STORAGE_SIZE)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+
+        # Default settings (overridden by app config)
+        app.config.setdefault('RATELIMIT_ENABLED', True)  # False = no limits
+        app.config.setdefault('RATELIMIT_LIMITS', {})  # name -> {'ip': (requests, seconds), 'account': (...)}
+        app.config.setdefault('RATELIMIT_STORAGE_SIZE', 100000)  # keys held in memory (least recently used dropped)
+
+        app.extensions['ratelimiter'] = self
+        if self.storage is None:
+            self.storage = MemoryStorage(app.config['RATELIMIT_STORAGE_SIZE'])
+
+    # Decorator limiting a view's requests by IP address and (if 'account' names a form field) by account
+    def limit(self, name, account=None, methods=('POST',)):
+
+        def decorator(view):
+
+            @wraps(view)
+            def limited_view(*args, **kwargs):
+                if request.method in methods and current_app.config['RATELIMIT_ENABLED']:
+                    self.check(name, ip=request.remote_addr,
+                               account=request.form.get(account, '').strip().lower() if account else None)
+                return view(*args, **kwargs)
+
+            return limited_view
+
+        return decorator
+
+    # Count a hit against each limit of 'name', or raise TooManyRequests (hits over a limit are not counted)
+    def check(self, name, **keys):
+
+        limits = current_app.config['RATELIMIT_LIMITS'].get(name, {})
+        now = time.time()
+        counted = []  # (key, window) hits to refund if a later limit rejects the request
+        for scope, (max_requests, seconds) in limits.items():
+            if not keys.get(scope):
+                continue
+            key = f'{name}:{scope}:{seconds}:{keys[scope]}'
+            window = int(now // seconds)  # current fixed window number
+            elapsed = now - window * seconds  # seconds into the current window
+            previous, current = self.storage.incr(key, window)
+            if previous * (1 - elapsed / seconds) + current > max_requests:
+                for counted_key, counted_window in counted + [(key, window)]:
+                    self.storage.incr(counted_key, counted_window, amount=-1)  # refund
+                raise TooManyRequests('Too many attempts, please try again later.',
+                                      retry_after=retry_after(max_requests, seconds, elapsed, previous, current - 1))
+            counted.append((key, window))
+
+
+# Seconds until a sliding window holding 'previous' and 'current' hits can take one more
+def retry_after(max_requests, seconds, elapsed, previous, current):
+    if current >= max_requests:  # wait for this window's hits to age out (part way into the next window)
+        wait = seconds - elapsed + seconds * (1 - (max_requests - 1) / current)
+    else:  # wait for enough of the previous window's hits to age out
+        wait = seconds * (1 - (max_requests - current - 1) / previous) - elapsed
+    return max(1, math.ceil(wait))
+
+
+# Counters held in this process
+# One entry per key: [window number, previous window's hits, current window's hits]. Memory is bounded by dropping the
+# least recently used keys (a dropped key just starts counting again).
+class MemoryStorage:
+
+    def __init__(self, size=100000):
+        self.size = size  # maximum keys held
+        self._counters = OrderedDict()  # key -> [window, previous, current], least recently used first
+        self._lock = threading.Lock()
+
+    # Add 'amount' hits to a key in 'window'; returns (previous window's hits, current window's hits)
+    def incr(self, key, window, amount=1):
+        with self._lock:
+            entry = self._counters.get(key)
+            if entry is None or entry[0] < window - 1:  # new key, or no hits in the last two windows
+                entry = [window, 0, 0]
+                self._counters[key] = entry
+            elif entry[0] == window - 1:  # first hit in a new window
+                entry[:] = [window, entry[2], 0]
+            if entry[0] == window:
+                entry[2] = max(0, entry[2] + amount)
+            else:  # refund for a window that has since ended
+                entry[1] = max(0, entry[1] + amount)
+            self._counters.move_to_end(key)
+            while len(self._counters) > self.size:
+                self._counters.popitem(last=False)  # drop least recently used
+            return entry[1], entry[2]
@@ -0,0 +1,92 @@
+import re
+import unicodedata
+from collections import defaultdict
+
+FIELD_WEIGHTS = {'artist': 0.1, 'song': 0.1, 'country': 0.05, 'event': 0.05}  # tie-breaks between fields
+MIN_MATCH = 0.5  # share of the query's trigrams a name must contain (lower finds more typos, and more noise)
+
+
+# Fuzzy name search
+# Trigram inverted index over names (artists, songs, countries, events): each distinct name is split into three
+# letter sequences, and each sequence maps to the names containing it. A query is split the same way, and names are
+# ranked by the share of the query's trigrams they contain, so prefixes ('abb'), substrings ('shine') and typos
+# ('lordy') all match without comparing the query with every name. Exact prefix and substring matches rank first.
+class SearchIndex:
+
+    def __init__(self):
+        self.names = []  # name id -> (normalised name, field)
+        self.targets = []  # name id -> things with that name (e.g. ('entry', row), ('country', name))
+        self.postings = defaultdict(list)  # trigram -> name ids
+        self._ids = {}  # (normalised name, field) -> name id
+
+    def add(self, name, field, target):
+        text = normalise(name)
+        if not text:
+            return
+        key = (text, field)
+        name_id = self._ids.get(key)
+        if name_id is None:
+            name_id = self._ids[key] = len(self.names)
+            self.names.append(key)
+            self.targets.append([])
+            for gram in name_grams(text):
+                self.postings[gram].append(name_id)
+        self.targets[name_id].append(target)
+
+    # Best matches, as [(score, field, target)], highest score first
+    def search(self, query, limit=20):
+        text = normalise(query)
+        if not text:
+            return []
+        grams = query_grams(text)
+
+        # Count query trigrams per name
+        counts = defaultdict(int)
+        for gram in grams:
+            for name_id in self.postings.get(gram, ()):
+                counts[name_id] += 1
+
+        # Score names, keeping each target's best
+        best = {}
+        for name_id, count in counts.items():
+            match = count / len(grams)
+            if match < MIN_MATCH:
+                continue
+            name, field = self.names[name_id]
+            score = match + FIELD_WEIGHTS.get(field, 0) - len(name) / 1000  # (shorter names first)
+            if name.startswith(text) or f' {text}' in name:
+                score += 1  # prefix of name, or of a word in it
+            elif text in name:
+                score += 0.5  # substring
+            for target in self.targets[name_id]:
+                if target not in best or best[target][0] < score:
+                    best[target] = (score, field)
+
+        ranked = sorted(best.items(), key=lambda item: -item[1][0])[:limit]
+        return [(round(score, 3), field, target) for target, (score, field) in ranked]
+
+    def __len__(self):
+        return len(self.names)
+
+
+# Lower case, no accents or punctuation ('Måneskin!' -> 'maneskin')
+def normalise(text):
+    if not isinstance(text, str):
+        return ''
+    text = unicodedata.normalize('NFKD', text.casefold())
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return ' '.join(re.split(r'[\W_]+', text)).strip()
+
+
+# Name trigrams (padded, so word starts are trigrams too: 'abba' -> '  a', ' ab', 'abb', 'bba', 'ba ')
+def name_grams(text):
+    padded = f'  {text} '
+    grams = {padded[i:i + 3] for i in range(len(padded) - 2)}
+    grams.update(f'  {word[0]}' for word in text.split())  # (each word can start a prefix query)
+    return grams
+
+
+# Query trigrams (not padded at the end, as the query may be an unfinished word)
+def query_grams(text):
+    padded = f'  {text}'
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
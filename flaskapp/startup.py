@@ -0,0 +1,103 @@
+import importlib
+import time
+from contextlib import contextmanager
+
+IMPORT_STARTED = time.perf_counter()  # (imported first by flaskapp, so this is when its imports began)
+IMPORTS = []  # (package, seconds) for each package imported by timed_import
+
+
+# Import packages one at a time, recording how long each takes (flaskapp imports the packages its extensions need this
+# way first, so each shows as its own startup step; its later 'import' statements then find them already loaded)
+def timed_import(*packages):
+    for package in packages:
+        start = time.perf_counter()
+        importlib.import_module(package)
+        IMPORTS.append((package, time.perf_counter() - start))
+
+
+# Startup profiler
+# Records how long each step of starting the app takes: importing each package flaskapp's extensions need (see
+# timed_import; packages they import count towards them), importing flaskapp's own modules, each extension's init_app,
+# registering blueprints, and the warmup steps below. create_app() keeps one per app (as app.extensions['startup']);
+# its report is logged by gunicorn.conf.py, and printed by benchmarks/bench_startup.py.
+class StartupProfiler:
+
+    def __init__(self):
+        self.steps = []  # (step, seconds), in order
+
+    # Time a step (e.g. with profiler.step('init db'): ...)
+    @contextmanager
+    def step(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.steps.append((name, time.perf_counter() - start))
+
+    def add(self, name, seconds):
+        self.steps.append((name, seconds))
+
+    @property
+    def total(self):
+        return sum(seconds for _, seconds in self.steps)
+
+    def report(self):
+        lines = [f'{name:<28}{seconds * 1000:9.1f} ms' for name, seconds in self.steps]
+        lines.append(f'{"total":<28}{self.total * 1000:9.1f} ms')
+        return '\n'.join(lines)
+
+
+# Warm up app before serving (and before gunicorn forks workers, so they start with it done)
+# Compiles every template, opens the database and checks its tables exist, makes sure the catalog has loaded, then
+# sends each of WARMUP_PATHS once (building the URL map, Jinja environment and request machinery), then clears the
+# request metrics those requests recorded (so /metrics, in every forked worker, only counts real traffic); returns the
+# profiler. Startup time (imports to the end of warmup) over STARTUP_BUDGET_SECONDS, or a first request slower than
+# FIRST_REQUEST_BUDGET_MS, is logged as a warning.
+def warmup(app):
+
+    from sqlalchemy import inspect, text  # inserted here so IMPORT_STARTED is taken before any other import
+    from flaskapp import db, catalog, metrics  # inserted here to prevent circular reference
+
+    profiler = app.extensions['startup']
+
+    # Templates (compiled once, then cached by Jinja)
+    with profiler.step('compile templates'):
+        for name in app.jinja_env.list_templates():
+            app.jinja_env.get_template(name)
+
+    # Database (raises if it can't be reached, or tables are missing)
+    with profiler.step('open database'), app.app_context():
+        engine = db.get_engine(app)
+        with engine.connect() as conn:
+            conn.execute(text('SELECT 1'))
+        existing = set(inspect(engine).get_table_names())
+        missing = [table for table in db.metadata.tables if table not in existing]
+        if missing:
+            raise RuntimeError(f'Database tables missing: {", ".join(missing)} (run "flask db upgrade")')
+
+    # Scraped data (loaded by catalog.init_app, unless turned off)
+    with profiler.step('load catalog'):
+        if app.config['CATALOG_ENABLED'] and catalog.version == 'empty':
+            catalog.load()
+
+    # First requests
+    client = app.test_client()
+    slowest = 0
+    for path in app.config['WARMUP_PATHS']:
+        start = time.perf_counter()
+        status = client.get(path).status_code
+        seconds = time.perf_counter() - start
+        profiler.add(f'GET {path} ({status})', seconds)
+        slowest = max(slowest, seconds)
+    metrics.reset()
+
+    # Connections opened above are closed, so forked workers don't share them
+    with app.app_context():
+        db.get_engine(app).dispose()
+
+    if profiler.total > app.config['STARTUP_BUDGET_SECONDS']:
+        app.logger.warning('Startup took %.2fs (budget %.2fs)', profiler.total, app.config['STARTUP_BUDGET_SECONDS'])
+    if slowest * 1000 > app.config['FIRST_REQUEST_BUDGET_MS']:
+        app.logger.warning('Slowest first request took %.0fms (budget %sms)', slowest * 1000,
+                           app.config['FIRST_REQUEST_BUDGET_MS'])
+    return profiler
@@ -0,0 +1,113 @@
+import hashlib
+import hmac
+import threading
+from collections import OrderedDict
+from itsdangerous import BadData, TimedJSONWebSignatureSerializer as Serializer
+
+
+# Signed links (email verification, email change, password reset)
+# Tokens carry the user id, their purpose, and a fingerprint of the account fields the link acts on (e.g. the password
+# hash for reset links). A token stops working as soon as those fields change, so a used reset link cannot be replayed.
+# Serializers are built once per purpose and lifetime, users are loaded through the user cache (or from the database,
+# before a token is acted on), and tokens that were rejected or used are remembered (bounded, least recently seen
+# dropped first) so repeat clicks and link floods are answered without touching the database.
+class TokenService:
+
+    # Account fields each purpose's tokens are tied to
+    FINGERPRINTS = {'email': ('email', 'temp_email', 'confirm_account'),  # registration and email change links
+                    'reset': ('password',)}  # password reset links
+
+    def __init__(self, app=None, user_cache=None):
+        self.user_cache = user_cache  # UserCache used to load users
+        self._serializers = {}  # (purpose, expires_seconds) -> serializer
+        self._rejected = OrderedDict()  # digests of rejected/used tokens, least recently seen first
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+
+        # Default settings (overridden by app config)
+        app.config.setdefault('AUTH_TOKEN_SECONDS', 900)  # email verification/change link lifetime
+        app.config.setdefault('RESET_TOKEN_SECONDS', 3600)  # password reset link lifetime
+        app.config.setdefault('TOKEN_REJECTED_CACHE_SIZE', 10000)  # rejected/used tokens remembered per process
+
+        app.extensions['tokens'] = self
+        self.secret = app.config['SECRET_KEY']
+        self.size = app.config['TOKEN_REJECTED_CACHE_SIZE']
+        with self._lock:
+            self._serializers.clear()
+            self._rejected.clear()
+
+    # Create token for 'user' (valid for 'expires_seconds')
+    def create(self, purpose, user, expires_seconds):
+        claims = {'user_id': user.id, 'purpose': purpose, 'fp': self._fingerprint(purpose, user)}
+        return self._serializer(purpose, expires_seconds).dumps(claims).decode('utf-8')
+
+    # Return the user a token was created for, or None if it is invalid, expired, used or no longer matches the account
+    # fresh=True loads the user from the database rather than the user cache: use it before acting on a token, as
+    # another process may have used it within the cache's TTL (its used token list is per process too). A token that
+    # doesn't match the cached user is checked against the database before it is rejected (and remembered).
+    def verify(self, purpose, token, fresh=False):
+
+        from flaskapp.models import User  # inserted here to prevent circular reference
+
+        digest = self._digest(purpose, token)
+        with self._lock:
+            if digest in self._rejected:
+                self._rejected.move_to_end(digest)
+                return None
+
+        try:
+            claims = self._serializer(purpose).loads(token)  # check signature and expiry (no database access)
+        except BadData:
+            claims = None
+        user = None
+        if isinstance(claims, dict) and claims.get('purpose') == purpose and isinstance(claims.get('user_id'), int):
+            if fresh:
+                user = User.query.populate_existing().get(claims['user_id'])  # (refreshes a copy already in session)
+            else:
+                user = self.user_cache.get(User, claims['user_id'])
+                if user is not None and not self._matches(purpose, claims, user):
+                    # Cached copy may be older than the token (e.g. changed in another process): check the database
+                    self.user_cache.invalidate(claims['user_id'])
+                    user = User.query.populate_existing().get(claims['user_id'])
+            if user is not None and not self._matches(purpose, claims, user):
+                user = None  # account changed since the token was created (e.g. link already used)
+
+        if user is None:
+            self._remember(digest)
+        return user
+
+    # Stop a token from working again (call once the action it allowed is saved)
+    def spend(self, purpose, token):
+        self._remember(self._digest(purpose, token))
+
+    # Compact key for the rejected token cache
+    @staticmethod
+    def _digest(purpose, token):
+        return hashlib.sha1(f'{purpose}:{token}'.encode()).digest()
+
+    def _remember(self, digest):
+        with self._lock:
+            self._rejected[digest] = True
+            self._rejected.move_to_end(digest)
+            while len(self._rejected) > self.size:
+                self._rejected.popitem(last=False)  # drop least recently seen
+
+    # Check a token's fingerprint against the user's current account fields
+    def _matches(self, purpose, claims, user):
+        return hmac.compare_digest(str(claims.get('fp')), self._fingerprint(purpose, user))
+
+    # Short keyed hash of the account fields a purpose is tied to
+    def _fingerprint(self, purpose, user):
+        values = '\x00'.join(str(getattr(user, field)) for field in self.FINGERPRINTS[purpose])
+        return hmac.new(self.secret.encode(), values.encode(), hashlib.sha256).hexdigest()[:16]
+
+    # Serializer for a purpose (the purpose is also the salt, so tokens cannot be used for another purpose)
+    def _serializer(self, purpose, expires_seconds=None):
+        key = (purpose, expires_seconds)
+        serializer = self._serializers.get(key)
+        if serializer is None:
+            serializer = self._serializers[key] = Serializer(self.secret, expires_seconds, salt=purpose)
+        return serializer
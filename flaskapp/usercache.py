@@ -0,0 +1,122 @@
+import threading
+import time
+from collections import OrderedDict
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+
+# Per-process cache of logged-in users
+# Sits in front of login_manager.user_loader so authenticated page views skip the User query. Entries are column
+# snapshots (not shared objects): each hit builds a fresh User attached to the request's session without touching the
+# database, so routes can still modify and commit current_user. Entries expire after USER_CACHE_TTL seconds (bounding
+# staleness between processes) and are dropped as soon as a change to that user is committed in this process (all
+# entries, for bulk updates/deletes of users, e.g. by the reaper).
+class UserCache:
+
+    def __init__(self, app=None, db=None):
+        self.db = db  # Flask-SQLAlchemy instance
+        self.hits = 0  # lookups answered from the cache
+        self.misses = 0  # lookups that queried the database
+        self._entries = OrderedDict()  # user id -> (expiry time, column snapshot), least recently used first
+        self._version = 0  # bumped on every invalidation (stops in-flight loads caching stale rows)
+        self._lock = threading.Lock()
+        self._listening = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+
+        # Default settings (overridden by app config)
+        app.config.setdefault('USER_CACHE_ENABLED', True)  # False = always query the database
+        app.config.setdefault('USER_CACHE_SIZE', 1024)  # maximum users held
+        app.config.setdefault('USER_CACHE_TTL', 60)  # seconds before an entry is reloaded
+
+        app.extensions['user_cache'] = self
+        self.enabled = app.config['USER_CACHE_ENABLED']
+        self.size = app.config['USER_CACHE_SIZE']
+        self.ttl = app.config['USER_CACHE_TTL']
+
+        # Drop users from the cache once changes to them are committed (any session)
+        if not self._listening:
+            event.listen(Session, 'after_flush', self._record_changes)
+            event.listen(Session, 'after_commit', self._commit_changes)
+            event.listen(Session, 'after_rollback', self._discard_changes)
+            event.listen(Session, 'after_bulk_update', self._record_bulk_changes)
+            event.listen(Session, 'after_bulk_delete', self._record_bulk_changes)
+            self._listening = True
+
+    # Load user by id, from the cache where possible
+    def get(self, model, user_id):
+
+        if not self.enabled:
+            return model.query.get(user_id)
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(user_id)  # mark as recently used
+                self.hits += 1
+                snapshot = entry[1]
+            else:
+                self.misses += 1
+                snapshot = None
+            version = self._version
+
+        # Cache hit: attach a copy to the session (load=False means no query is made)
+        if snapshot is not None:
+            user = model(**snapshot)
+            make_transient_to_detached(user)
+            return self.db.session.merge(user, load=False)
+
+        # Cache miss: query database and store a snapshot
+        user = model.query.get(user_id)
+        if user is not None:
+            snapshot = {attr.key: getattr(user, attr.key) for attr in inspect(model).column_attrs}
+            with self._lock:
+                if version == self._version:  # skip if a commit invalidated users while loading
+                    self._entries[user_id] = (now + self.ttl, snapshot)
+                    self._entries.move_to_end(user_id)
+                    while len(self._entries) > self.size:
+                        self._entries.popitem(last=False)  # evict least recently used
+        return user
+
+    # Remove users from the cache
+    def invalidate(self, *user_ids):
+        with self._lock:
+            self._version += 1
+            for user_id in user_ids:
+                self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._version += 1
+            self._entries.clear()
+
+    # Counters (e.g. for monitoring)
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries)}
+
+    # Session events
+    def _record_changes(self, session, flush_context):
+        from flaskapp.models import User  # inserted here to prevent circular reference
+        changed = session.info.setdefault('user_cache_changed', set())
+        changed.update(obj.id for obj in session.dirty | session.deleted if isinstance(obj, User))
+
+    # Bulk query.update()/delete() don't say which rows they changed, so the whole cache is dropped on commit
+    def _record_bulk_changes(self, context):
+        from flaskapp.models import User  # inserted here to prevent circular reference
+        if context.mapper.class_ is User:
+            context.session.info['user_cache_clear'] = True
+
+    def _commit_changes(self, session):
+        changed = session.info.pop('user_cache_changed', None)
+        if session.info.pop('user_cache_clear', False):
+            self.clear()
+        elif changed:
+            self.invalidate(*changed)
+
+    def _discard_changes(self, session):
+        session.info.pop('user_cache_changed', None)
+        session.info.pop('user_cache_clear', None)
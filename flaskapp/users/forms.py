@@ -1,10 +1,9 @@
-from datetime import datetime
 from flask_wtf import FlaskForm
 from flask_wtf.file import FileField, FileAllowed
 from wtforms import StringField, PasswordField, SubmitField, BooleanField
 from wtforms.validators import DataRequired, Length, Email, EqualTo, ValidationError
-from flask_login import current_user
-from flaskapp.models import User
+from flaskapp.models import User, canonical
+from flaskapp.users.pictures import is_image
 
 
 # Registration
@@ -18,23 +17,7 @@ class RegistrationForm(FlaskForm):
                              validators=[DataRequired()])
     confirmpassword = PasswordField('Confirm Password',
                                     validators=[DataRequired(), EqualTo('password')])
-    submit = SubmitField('Sign Up')
-
-    # To validate username is unique
-    def validate_username(self, username):
-        olduser = User.query.filter(User.username.ilike(username.data)).first()  # search db for existing username
-        if olduser:  # if username found in existing database
-            timediff = datetime.now() - olduser.date_register  # time since username registered/created
-            if olduser.confirm_account or timediff.seconds < 900:  # check if user verified, or token still valid
-                raise ValidationError('Username already taken.')
-
-    # To validate username is unique
-    def validate_email(self, email):
-        oldemail = User.query.filter(User.email.ilike(email.data)).first()  # search db for existing email
-        if oldemail:  # if email found in existing database
-            timediff = datetime.now() - oldemail.date_register  # time since email registered
-            if oldemail.confirm_account or timediff.seconds < 900:  # check if email verified, or token still valid
-                raise ValidationError('Email already taken.')
+    submit = SubmitField('Sign Up')  # username/email availability is checked on submit (see users/identity.py)
 
 
 # Login
@@ -56,23 +39,12 @@ class UpdateAccountForm(FlaskForm):
     email = StringField('Email',
                         validators=[DataRequired(), Email()])
     picture = FileField('Update Profile Picture', validators=[FileAllowed(['jpg', 'png'])])  # only allowed extensions
-    submit = SubmitField('Update')
+    submit = SubmitField('Update')  # username/email availability is checked on submit (see users/identity.py)
 
-    def validate_username(self, username):
-        if username.data != current_user.username:  # check username isn't the same as current username
-            olduser = User.query.filter(User.username.ilike(username.data)).first()  # search db for existing username
-            if olduser:  # if username found in existing database
-                timediff = datetime.now() - olduser.date_register  # time since username registered/created
-                if olduser.confirm_account or timediff.seconds < 900:  # check if user verified, or token still valid
-                    raise ValidationError('Username already taken.')
-
-    def validate_email(self, email):
-        if email.data != current_user.email:  # check email isn't the same as current email
-            oldemail = User.query.filter(User.email.ilike(email.data)).first()  # search db for existing email
-            if oldemail:  # if email found in existing database
-                timediff = datetime.now() - oldemail.date_register  # time since email registered
-                if oldemail.confirm_account or timediff.seconds < 900:  # check if email verified, or token still valid
-                    raise ValidationError('Email already taken.')
+    # To validate the upload is an image (resized in the background, where errors can't be shown)
+    def validate_picture(self, picture):
+        if picture.data and not is_image(picture.data.stream):
+            raise ValidationError('File is not a valid image.')
 
 
 # Email reset confirmation
@@ -90,7 +62,7 @@ class RequestPWResetForm(FlaskForm):
 
     # To validate email exists in database
     def validate_email(self, email):
-        user = User.query.filter_by(email=email.data).first()  # search for email in database
+        user = User.query.filter_by(email_key=canonical(email.data)).first()  # search for email in database
         if user is None:  # does user exist
             raise ValidationError('No account found with this email.')
 
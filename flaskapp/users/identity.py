@@ -0,0 +1,84 @@
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+from flaskapp import db
+from flaskapp.models import User, canonical
+
+
+# Raised when a username/email is held by a verified account (or one whose verification link is still valid)
+class IdentityTaken(Exception):
+
+    def __init__(self, fields):
+        super().__init__(', '.join(sorted(fields)) + ' already taken')
+        self.fields = fields  # {'username', 'email'}
+
+
+# Find which of the requested username/email are held by other accounts
+# Returns (taken fields, ids of expired unverified holders). One query, answered from the lookup key indexes. Pending
+# changes are not flushed first (a clash with them is raised by claim_identity's commit, not by this query).
+def find_holders(username_key, email_key, user=None):
+
+    cutoff = datetime.now() - timedelta(seconds=current_app.config['AUTH_TOKEN_SECONDS'])  # older = link has expired
+    taken = set()
+    stale = []
+    with db.session.no_autoflush:
+        holders = User.query.filter(db.or_(User.username_key == username_key, User.email_key == email_key)).all()
+    for holder in holders:
+        if user is not None and holder.id == user.id:  # ignore the account being updated
+            continue
+        if holder.confirm_account or holder.date_register > cutoff:
+            if holder.username_key == username_key:
+                taken.add('username')
+            if holder.email_key == email_key:
+                taken.add('email')
+        else:
+            stale.append(holder.id)
+    return taken, stale
+
+
+# Claim username/email for a new account ('user' is None) or an existing one, in one transaction
+# Expired unverified holders are removed, then the user is inserted/updated and everything is committed together.
+# The unique lookup key indexes make this race-safe: if a concurrent request claims the same name first, the commit
+# fails and IdentityTaken is raised.
+def claim_identity(username, email, user=None, **fields):
+
+    username_key, email_key = canonical(username), canonical(email)
+    taken, stale = find_holders(username_key, email_key, user)
+    if taken:
+        db.session.rollback()  # discard any pending changes (e.g. new picture)
+        raise IdentityTaken(taken)
+
+    # Bulk delete expired claimants (re-checked in the DELETE, in case one was verified in the meantime)
+    if stale:
+        cutoff = datetime.now() - timedelta(seconds=current_app.config['AUTH_TOKEN_SECONDS'])
+        User.query.filter(User.id.in_(stale), User.confirm_account.is_(False),
+                          User.date_register <= cutoff).delete(synchronize_session=False)
+
+    # Insert or update user
+    if user is None:
+        user = User(username=username, email=email, date_register=datetime.now(), **fields)
+        db.session.add(user)  # add row entry
+    else:
+        user.username = username
+        for key, value in fields.items():
+            setattr(user, key, value)
+
+    try:
+        db.session.commit()  # save changes
+    except IntegrityError:  # lost a race for the same username/email (or new email, see pending_change)
+        db.session.rollback()
+        taken, _ = find_holders(username_key, email_key, user if user.id else None)
+        if not taken and fields.get('temp_email') and pending_change(fields['temp_email'], user):
+            taken = {'email'}
+        raise IdentityTaken(taken or {'username', 'email'})
+
+    return user
+
+
+# Check whether another account is already waiting to change to 'email' (User.temp_email is unique)
+def pending_change(email, user=None):
+    query = User.query.filter(User.temp_email == email)
+    if user is not None and user.id:
+        query = query.filter(User.id != user.id)
+    with db.session.no_autoflush:
+        return db.session.query(query.exists()).scalar()
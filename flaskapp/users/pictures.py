@@ -0,0 +1,89 @@
+import hashlib
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image, ImageOps
+
+
+# Profile picture pipeline
+# Uploads are checked to be images (users/forms.py), streamed to a temporary file outside the served folder (hashing as
+# they go) and resized in a process pool into every size in PICTURE_SIZES, as WebP (keeping transparency) and JPEG.
+# Files are named by content hash ('<sha256>_<size>.<ext>'), so identical uploads are stored once and can be cached
+# forever. The request does not wait for resizing; until the variants exist the default picture is shown.
+
+FORMATS = {'webp': ('WEBP', {'quality': 80, 'method': 4}),  # extension: (Pillow format, save options)
+           'jpg': ('JPEG', {'quality': 85, 'optimize': True, 'progressive': True})}
+CHUNK_SIZE = 64 * 1024  # bytes read from the upload at a time
+
+_pool = None  # process pool (created by start_pool)
+
+
+def variant_name(digest, size, ext):
+    return f'{digest}_{size}.{ext}'
+
+
+# Stream upload to a temporary file in 'directory'; returns (temporary path, sha256 hex digest)
+def stream_upload(stream, directory):
+
+    sha = hashlib.sha256()
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.upload-')
+    with os.fdopen(fd, 'wb') as tmp:
+        for chunk in iter(lambda: stream.read(CHUNK_SIZE), b''):
+            sha.update(chunk)
+            tmp.write(chunk)
+    return tmp_path, sha.hexdigest()
+
+
+# Check that an upload is an image Pillow can read (on the request path; its pixels are only decoded in the pool)
+def is_image(stream):
+
+    try:
+        with Image.open(stream) as img:
+            img.verify()  # check headers (and checksums, e.g. for PNG) without decoding
+    except Exception:  # (Pillow raises many exception types for broken or unknown files)
+        return False
+    finally:
+        stream.seek(0)  # (read again when saved)
+    return True
+
+
+# Resize uploaded image into every size/format (runs in a worker process); returns seconds taken
+def render_variants(src_path, dest_dir, digest, sizes):
+
+    start = time.perf_counter()
+    try:
+        with Image.open(src_path) as img:
+            alpha = img.mode in ('RGBA', 'LA', 'PA') or 'transparency' in img.info
+            img = ImageOps.exif_transpose(img).convert('RGBA' if alpha else 'RGB')  # apply camera rotation
+            for size in sorted(sizes, reverse=True):  # shrink step by step, largest first
+                img.thumbnail((size, size))  # resize image (keeps aspect ratio)
+                for ext, (fmt, options) in FORMATS.items():
+                    path = os.path.join(dest_dir, variant_name(digest, size, ext))
+                    variant = img.convert('RGB') if fmt == 'JPEG' and alpha else img  # (JPEG has no alpha)
+                    variant.save(path + '.tmp', fmt, **options)
+                    os.replace(path + '.tmp', path)  # appear complete, or not at all
+    finally:
+        os.remove(src_path)  # delete temporary upload
+    return time.perf_counter() - start
+
+
+# Start the process pool, forking its workers straight away
+# Called by start_background_jobs before any other background thread starts: forking a process with running threads
+# can leave the child stuck on a lock one of them held (e.g. in logging or SQLAlchemy).
+def start_pool(workers):
+
+    global _pool
+    if _pool is None:
+        # Fork where possible: spawned workers would re-import the app's main module (e.g. run.py)
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+        _pool = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+        _pool.submit(int).result()  # (workers are only forked on first use)
+    return _pool
+
+
+# Queue resizing; returns a Future
+def submit(src_path, dest_dir, digest, sizes, workers):
+    return start_pool(workers).submit(render_variants, src_path, dest_dir, digest, tuple(sizes))
@@ -0,0 +1,57 @@
+import threading
+from datetime import datetime, timedelta
+import click
+from flask import current_app
+from flask.cli import AppGroup, with_appcontext
+from flaskapp import db
+from flaskapp.models import User
+
+
+# Delete unverified accounts whose verification link has expired, in batches
+# Uses the (confirm_account, date_register) index; returns the number of accounts deleted.
+def reap_unverified(batch_size=None):
+
+    batch_size = batch_size or current_app.config['REAPER_BATCH_SIZE']
+    cutoff = datetime.now() - timedelta(seconds=current_app.config['AUTH_TOKEN_SECONDS'])
+    expired = (User.confirm_account == False, User.date_register < cutoff)  # noqa: E712 (SQL '=' uses the index)
+
+    total = 0
+    while True:
+        ids = [row.id for row in User.query.with_entities(User.id).filter(*expired).limit(batch_size)]
+        if not ids:
+            break
+        total += User.query.filter(User.id.in_(ids), *expired).delete(synchronize_session=False)  # bulk delete
+        db.session.commit()  # save changes (per batch, to keep write locks short)
+        if len(ids) < batch_size:
+            break
+    db.session.rollback()  # end read transaction
+    return total
+
+
+# Run reap_unverified() every REAPER_INTERVAL_SECONDS in a background thread
+def start_reaper(app):
+
+    def run():
+        while not stop.wait(app.config['REAPER_INTERVAL_SECONDS']):
+            try:
+                with app.app_context():
+                    deleted = reap_unverified()
+                if deleted:
+                    app.logger.info('Reaper deleted %s expired unverified accounts', deleted)
+            except Exception:
+                app.logger.exception('Reaper error')
+
+    stop = threading.Event()  # set to stop the reaper
+    threading.Thread(target=run, name='user-reaper', daemon=True).start()
+    return stop
+
+
+# Command line tools ('flask users ...')
+users_cli = AppGroup('users', help='Manage user accounts.')
+
+
+@users_cli.command('reap')
+@click.option('--batch-size', type=int, default=None, help='Accounts deleted per transaction.')
+@with_appcontext
+def users_reap(batch_size):
+    click.echo(f'Deleted {reap_unverified(batch_size)} expired unverified accounts.')
@@ -1,20 +1,29 @@
 from datetime import datetime
 from flask import Blueprint, render_template, url_for, flash, redirect, request
 from flask_login import login_user, logout_user, current_user, login_required
-from flaskapp import db, bcrypt
-from flaskapp.models import User
+from werkzeug.exceptions import ServiceUnavailable
+from flaskapp import db, hasher, limiter, tokens
+from flaskapp.models import User, canonical
 from flaskapp.users.forms import (RegistrationForm, LoginForm, UpdateAccountForm,
                                   RequestPWResetForm, ResetPasswordForm,
                                   ResetEmailForm)
-from flaskapp.users.utils import (save_picture, delete_picture,
+from flaskapp.users.identity import claim_identity, IdentityTaken
+from flaskapp.users.utils import (save_picture, delete_picture, picture_url,
                                   sendemail_auth, sendemail_pwreset, sendemail_emailreset)
 
 
 users = Blueprint('users', __name__)  # setup blueprint for 'user' directory
 
 
+# Show 'already taken' errors on the username/email form fields
+def add_taken_errors(form, taken):
+    for field in sorted(taken.fields):
+        getattr(form, field).errors.append(f'{field.capitalize()} already taken.')
+
+
 # Registration page
 @users.route("/register", methods=['GET', 'POST'])
+@limiter.limit('register', account='email')  # limits POSTs per IP address and per email address
 def register():
 
     # If user is already logged in, return to home page
@@ -27,26 +36,18 @@ def register():
     # Only run following code if form response passes checks (in users/forms.py)
     if form.validate_on_submit():
 
-        # Remove old user info if exists (and unvalidated)
-        olduser = User.query.filter(User.username.ilike(f'%{form.username.data}%')).first()  # check if username exists
-        if olduser and olduser.confirm_account is False:  # remove username
-            db.session.delete(olduser)  # delete row entry
-            db.session.commit()  # save changes
-        oldemail = User.query.filter(User.email.ilike(f'%{form.email.data}%')).first()  # check for email in db
-        if oldemail and oldemail.confirm_account is False:  # remove email
-            db.session.delete(oldemail)  # delete row entry
-            db.session.commit()  # save changes
-
-        # Add user to db
-        hashed_pw = bcrypt.generate_password_hash(form.password.data).decode('utf-8')  # encrypt password
-        newuser = User(username=form.username.data, email=form.email.data, password=hashed_pw, date_register=datetime.now()) # noqa
-        db.session.add(newuser)  # add row entry
-        db.session.commit()  # save changes
-        sendemail_auth(newuser)  # send authentication email
+        # Add user to db (removes expired unverified accounts holding the username/email, in the same transaction)
+        hashed_pw = hasher.hash(form.password.data)  # encrypt password (before the transaction, as it is slow)
+        try:
+            newuser = claim_identity(form.username.data, form.email.data, password=hashed_pw)
+        except IdentityTaken as taken:
+            add_taken_errors(form, taken)
+        else:
+            sendemail_auth(newuser)  # send authentication email
 
-        # Inform user that email authentication is required
-        flash(f'Email verification request sent to {form.email.data}!', 'success')
-        return redirect(url_for('users.login'))
+            # Inform user that email authentication is required
+            flash(f'Email verification request sent to {form.email.data}!', 'success')
+            return redirect(url_for('users.login'))
 
     return render_template('register.html', title='Register', form=form)  # key variables for .html
 
@@ -59,8 +60,8 @@ def auth_token(token):
     if current_user.is_authenticated:
         return redirect(url_for('main.home'))
 
-    # Verify if URL includes valid token
-    user = User.verify_auth_token_email(token)
+    # Verify if URL includes valid token (against the database, as opening the link verifies the account)
+    user = User.verify_auth_token_email(token, fresh=True)
 
     # Handle if URL is (not) valid
     if user is None:  # if not valid
@@ -70,6 +71,7 @@ def auth_token(token):
         user.confirm_account = True  # record that email/account is verified
         user.date_verify = datetime.now()  # record verified date/time
         db.session.commit()  # save changes
+        tokens.spend('email', token)  # link no longer valid
         # Inform user that email has been verified has been reset
         flash(f'Email verified!', 'success')
         return redirect(url_for('users.login'))
@@ -77,6 +79,7 @@ def auth_token(token):
 
 # Login page
 @users.route("/login", methods=['GET', 'POST'])
+@limiter.limit('login', account='email')  # limits POSTs per IP address and per email address
 def login():
 
     # If user is already logged in, return to home page
@@ -89,11 +92,17 @@ def login():
     # Only run following code if form response passes checks (in users/forms.py)
     if form.validate_on_submit():
 
-        user = User.query.filter(User.email.ilike(f'%{form.email.data}%')).first()  # check for email in db
+        user = User.query.filter_by(email_key=canonical(form.email.data)).first()  # check for email in db
 
         # Check that account info is correct, and email is verified
-        if user and bcrypt.check_password_hash(user.password, form.password.data):  # check password
+        if user and hasher.check(user.password, form.password.data):  # check password
             if user.confirm_account:  # check email verification
+                if hasher.needs_rehash(user.password):  # update hash if bcrypt cost has changed
+                    try:
+                        user.password = hasher.hash(form.password.data)
+                        db.session.commit()  # save changes
+                    except ServiceUnavailable:
+                        pass  # hashing pool busy, update on a later login instead
                 login_user(user, remember=form.remember.data)  # login user
                 prev_page = request.args.get('next')
                 return redirect(prev_page) if prev_page else redirect(url_for('main.home'))  # return user to home page
@@ -123,50 +132,51 @@ def account():
     # Only run following code if form response passes checks (in users/forms.py)
     if form.validate_on_submit():
 
-        # Only run following code if new picture uploaded
-        if form.picture.data:
-            delete_picture()  # delete old picture
-            picture_file = save_picture(form.picture.data)  # upload new picture
-            current_user.image_file = picture_file  # update user display
-            flash('Profile picture updated!', 'success')
-
-        # Remove old user info if exists (and unvalidated)
-        olduser = User.query.filter(User.username.ilike(f'%{form.username.data}%')).first()  # check for username in db
-        if olduser and olduser.confirm_account is False:  # remove username
-            db.session.delete(olduser)  # delete row entry
-            db.session.commit()  # save changes
-        oldemail = User.query.filter(User.email.ilike(f'%{form.email.data}%')).first()  # check for email in db
-        if oldemail and oldemail.confirm_account is False:  # remove email
-            db.session.delete(oldemail)  # delete row entry
-            db.session.commit()  # save changes
-
-        # Update username
-        if form.username.data != current_user.username:
-            current_user.username = form.username.data
-            db.session.commit()
-            flash('Username updated!', 'success')
-
-        # Send email to verify change
-        if form.email.data != current_user.email:
-            current_user.temp_email = form.email.data  # update temp email
-            db.session.commit()
-            newemail = User.query.filter_by(temp_email=form.email.data).first()
-            sendemail_emailreset(newemail)  # send email to new change
-            flash('Email reset request sent!', 'success')
-
-        # Save changes
-        db.session.commit()  # save changes
+        old_picture = current_user.image_file
+        username_changed = form.username.data != current_user.username
+        email_changed = form.email.data != current_user.email
 
-        return redirect(url_for('users.account'))
+        # Only run following code if new picture uploaded
+        new_picture = save_picture(form.picture.data) if form.picture.data else None  # upload new picture
+        if new_picture:
+            current_user.image_file = new_picture  # update user display
+
+        # Save changes (username/email claimed in the same transaction, if changed)
+        try:
+            if username_changed or email_changed:
+                changes = {'temp_email': form.email.data} if email_changed else {}  # new email kept until verified
+                claim_identity(form.username.data, form.email.data, user=current_user, **changes)
+            else:
+                db.session.commit()  # save changes
+        except IdentityTaken as taken:
+            if new_picture:
+                delete_picture(new_picture)  # changes not saved, remove uploaded picture
+            add_taken_errors(form, taken)
+        else:
+            if new_picture:
+                delete_picture(old_picture)  # delete old picture
+                flash('Profile picture updated!', 'success')
+            if username_changed:
+                flash('Username updated!', 'success')
+            if email_changed:
+                sendemail_emailreset(current_user)  # send email to new change
+                flash('Email reset request sent!', 'success')
+            return redirect(url_for('users.account'))
 
     # Return original account page, if no form/changes submitted (i.e. before update)
     elif request.method == 'GET':
         form.username.data = current_user.username  # display current username
         form.email.data = current_user.email  # display current email
 
-    image_file = url_for('static', filename='profile_pics/' + current_user.image_file)  # display user profile pic
+    # Display user profile pic (WebP where ready and supported, 2x size for high resolution screens)
+    image_file = picture_url(current_user.image_file)
+    image_file_2x = picture_url(current_user.image_file, size=256)
+    image_webp = picture_url(current_user.image_file, ext='webp')
+    image_webp_2x = picture_url(current_user.image_file, size=256, ext='webp')
 
-    return render_template('account.html', title='Account', image_file=image_file, form=form)  # key variables for .html
+    return render_template('account.html', title='Account', form=form,
+                           image_file=image_file, image_file_2x=image_file_2x,
+                           image_webp=image_webp, image_webp_2x=image_webp_2x)  # key variables for .html
 
 
 # Reset password function
@@ -174,21 +184,26 @@ def account():
 @login_required  # ensure user is logged in before changing associated email
 def reset_token_email(token):
 
-    # Verify if URL includes valid token
-    user = User.verify_auth_token_email(token)
+    # Verify if URL includes valid token (against the database when the change is submitted)
+    user = User.verify_auth_token_email(token, fresh=request.method == 'POST')
 
-    # Handle if URL is (not) valid
-    if user is None:
+    # Handle if URL is (not) valid (or was sent to another account, or no email change is pending)
+    if user is None or user.id != current_user.id or not current_user.temp_email:
         flash('Token invalid or expired.', 'warning')  # display message
         return redirect(url_for('users.login'))
 
     form = ResetEmailForm()
 
     if form.validate_on_submit():
-        # Replace email with updated email
+        # Replace email with updated email (claimed again, in case another account has taken it since)
         current_user.email = current_user.temp_email  # set new email
         current_user.temp_email = None  # reset temp_email field
-        db.session.commit()  # save changes
+        try:
+            claim_identity(current_user.username, current_user.email, user=current_user)  # save changes
+        except IdentityTaken:
+            flash('Email already taken.', 'danger')
+            return redirect(url_for('users.account'))
+        tokens.spend('email', token)  # link no longer valid
 
         # Inform user that email has been changed
         flash(f'Email changed!', 'success')
@@ -199,6 +214,7 @@ def reset_token_email(token):
 
 # Reset password request
 @users.route("/resetpassword", methods=['GET', 'POST'])
+@limiter.limit('reset_request', account='email')  # limits POSTs per IP address and per email address
 def reset_request_pw():
 
     # If user is already logged in, return to home page
@@ -211,7 +227,7 @@ def reset_request_pw():
     # Only run following code if form response passes checks (in users/forms.py)
     if form.validate_on_submit():
 
-        user = User.query.filter_by(email=form.email.data).first()  # search for email in database
+        user = User.query.filter_by(email_key=canonical(form.email.data)).first()  # search for email in database
         sendemail_pwreset(user)  # send password reset email, if email found
         flash('Password reset email sent! Please check junk email folder.', 'success')
         return redirect(url_for('users.login'))
@@ -227,8 +243,8 @@ def reset_token_pw(token):
     if current_user.is_authenticated:
         return redirect(url_for('main.home'))
 
-    # Verify if URL includes valid token
-    user = User.verify_reset_token_pw(token)
+    # Verify if URL includes valid token (against the database when the new password is submitted)
+    user = User.verify_reset_token_pw(token, fresh=request.method == 'POST')
 
     # Handle if URL is not valid
     if user is None:
@@ -242,12 +258,13 @@ def reset_token_pw(token):
     if form.validate_on_submit():
 
         # Add user to db
-        hashed_pw = bcrypt.generate_password_hash(form.password.data).decode('utf-8')  # encrypt password
+        hashed_pw = hasher.hash(form.password.data)  # encrypt password
         user.password = hashed_pw  # set new password
         db.session.commit()  # save changes
+        tokens.spend('reset', token)  # link no longer valid
 
         # Inform user that password has been reset
-        flash(f'Password reset for {form.username.data}!', 'success')
+        flash(f'Password reset for {user.username}!', 'success')
         return redirect(url_for('users.login'))
 
     return render_template('reset_token_pw.html', title='Reset Password', form=form)  # key variables for .html
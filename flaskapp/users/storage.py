@@ -0,0 +1,158 @@
+import os
+import time
+import click
+from flask import current_app, url_for
+from flask.cli import AppGroup, with_appcontext
+from flaskapp import db
+from flaskapp.models import User
+from flaskapp.users import pictures
+
+DEFAULT = 'default.jpg'  # default picture (kept at the top of profile_pics, not sharded)
+
+
+# Profile picture storage
+# Pictures are stored in hash-prefix subdirectories (e.g. 'ab12...ef_125.jpg' in 'profile_pics/ab/12/'), so no single
+# directory grows with the number of users. Picture names start with their content hash (or random hex for pictures
+# uploaded before resized variants), so the prefix spreads files evenly.
+
+
+def root():
+    return os.path.join(current_app.root_path, 'static', 'profile_pics')
+
+
+# Folder for uploads waiting to be resized (outside static/, so unfinished uploads are never served)
+def uploads():
+    folder = current_app.config['PICTURE_UPLOAD_FOLDER']
+    os.makedirs(folder, exist_ok=True)
+    return folder
+
+
+# Subdirectory for a file name (relative to profile_pics)
+def shard(name):
+    return '' if name == DEFAULT else os.path.join(name[:2], name[2:4])
+
+
+def path(name):
+    return os.path.join(root(), shard(name), name)
+
+
+def exists(name):
+    return os.path.exists(path(name))
+
+
+def url(name):
+    relative = '/'.join([name[:2], name[2:4], name]) if shard(name) else name
+    return url_for('static', filename='profile_pics/' + relative)
+
+
+# Directory to write a picture's files into (created if needed)
+def directory(name):
+    folder = os.path.join(root(), shard(name))
+    os.makedirs(folder, exist_ok=True)
+    return folder
+
+
+# Files stored for a User.image_file value
+def files(image_file):
+    if '.' in image_file:  # single file (uploaded before resized variants)
+        return [image_file]
+    return [pictures.variant_name(image_file, size, ext)
+            for size in current_app.config['PICTURE_SIZES'] for ext in pictures.FORMATS]
+
+
+# Delete files (missing files are ignored)
+def delete(names):
+    for name in names:
+        try:
+            os.remove(path(name))
+        except FileNotFoundError:
+            pass
+
+
+# User.image_file value a stored file belongs to ('<hash>_<size>.<ext>' -> '<hash>')
+def owner(name):
+    stem, _ = os.path.splitext(name)
+    return stem.split('_')[0] if '_' in stem else name
+
+
+# All stored files, as (name, full path), in name order
+def walk():
+    top = root()
+    for first in sorted(entry.name for entry in os.scandir(top) if entry.is_dir()):
+        for second in sorted(entry.name for entry in os.scandir(os.path.join(top, first)) if entry.is_dir()):
+            folder = os.path.join(top, first, second)
+            for name in sorted(entry.name for entry in os.scandir(folder) if entry.is_file()):
+                yield name, os.path.join(folder, name)
+
+
+# Move pictures from the flat profile_pics folder into shards; returns number of files moved
+def migrate_flat():
+    top = root()
+    moved = 0
+    for entry in list(os.scandir(top)):
+        if entry.is_file() and entry.name != DEFAULT and not entry.name.startswith('.'):
+            os.replace(entry.path, os.path.join(directory(entry.name), entry.name))
+            moved += 1
+    return moved
+
+
+# Delete stored files no user refers to; returns (files kept, files deleted)
+# References are streamed in order from the image_file index and merged with the (sorted) files on disk, so memory use
+# does not grow with the number of users. Files younger than 'grace_seconds' are kept, as their user may not be saved
+# yet (or resizing may still be running).
+def collect_garbage(grace_seconds=3600, dry_run=False, batch_size=1000):
+
+    refs = (row.image_file for row in db.session.query(User.image_file).filter(User.image_file != DEFAULT)
+            .distinct().order_by(User.image_file).yield_per(batch_size))
+    ref = next(refs, None)
+    cutoff = time.time() - grace_seconds
+
+    # Unfinished uploads (left behind if the server stopped while saving; older versions kept them in profile_pics)
+    orphans = [entry.path for folder in (uploads(), root()) for entry in os.scandir(folder)
+               if entry.name.startswith('.upload-') and entry.stat().st_mtime < cutoff]
+    deleted = _remove(orphans, dry_run)
+
+    kept = 0
+    for name, full_path in walk():
+        key = owner(name)
+        while ref is not None and ref < key:  # advance references to this file's owner
+            ref = next(refs, None)
+        if key == ref or os.path.getmtime(full_path) > cutoff:
+            kept += 1
+            continue
+        orphans.append(full_path)
+        if len(orphans) >= batch_size:
+            deleted += _remove(orphans, dry_run)
+    deleted += _remove(orphans, dry_run)
+    return kept, deleted
+
+
+def _remove(paths, dry_run):
+    count = len(paths)
+    if not dry_run:
+        for full_path in paths:
+            try:
+                os.remove(full_path)
+            except FileNotFoundError:
+                count -= 1
+    paths.clear()
+    return count
+
+
+# Command line tools ('flask pictures ...')
+pictures_cli = AppGroup('pictures', help='Manage stored profile pictures.')
+
+
+@pictures_cli.command('migrate')
+@with_appcontext
+def pictures_migrate():
+    click.echo(f'Moved {migrate_flat()} pictures into subdirectories.')
+
+
+@pictures_cli.command('gc')
+@click.option('--grace-seconds', type=int, default=3600, help='Keep files younger than this.')
+@click.option('--dry-run', is_flag=True, help='Only count files that would be deleted.')
+@with_appcontext
+def pictures_gc(grace_seconds, dry_run):
+    kept, deleted = collect_garbage(grace_seconds, dry_run)
+    click.echo(f"{deleted} unreferenced files {'found' if dry_run else 'deleted'}, {kept} kept.")
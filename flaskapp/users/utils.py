@@ -1,36 +1,51 @@
-import secrets
 import os
-from PIL import Image
 from flask import url_for, current_app
-from flask_login import current_user
 from flask_mail import Message
-from flaskapp import mail
+from flaskapp import outbox
+from flaskapp.metrics import metrics
+from flaskapp.models import User
+from flaskapp.users import pictures, storage
 
 
-# Save picture function
+# Save picture function (returns the picture's content hash, stored as User.image_file)
 def save_picture(form_picture):
 
-    random_hex = secrets.token_hex(8)  # generate random file name
-    _, f_ext = os.path.splitext(form_picture.filename)  # identify current picture extension
-    picture_fn = random_hex + f_ext  # combine random file name and extension
-    picture_path = os.path.join(current_app.root_path, 'static/profile_pics', picture_fn)  # full path to directory
+    tmp_path, digest = pictures.stream_upload(form_picture.stream, storage.uploads())  # save upload, hash content
 
-    output_size = (125, 125)  # resize image constraints (creates uniformity and saves space)
-    img = Image.open(form_picture)  # access image
-    img.thumbnail(output_size)  # resize image
-    img.save(picture_path)  # save picture to directory
+    if all(storage.exists(name) for name in storage.files(digest)):  # identical picture already stored
+        os.remove(tmp_path)
+        return digest
 
-    return picture_fn
+    # Resize in the background (creates each size as WebP and JPEG)
+    future = pictures.submit(tmp_path, storage.directory(digest), digest, current_app.config['PICTURE_SIZES'],
+                             current_app.config['PICTURE_WORKERS'])
+    logger = current_app.logger
 
+    def resized(f):
+        if f.exception():
+            logger.error('Resizing picture %s failed: %s', digest, f.exception())
+        else:
+            metrics.observe('pillow', f.result())  # background time (no endpoint)
+    future.add_done_callback(resized)
 
-# Delete picture function
-def delete_picture():
+    return digest
 
-    old_picture = current_user.image_file  # identify current picture
 
-    if old_picture != 'default.jpg':
-        delete_picture_path = os.path.join(current_app.root_path, 'static/profile_pics', old_picture)  # identify path
-        os.remove(delete_picture_path)  # delete picture from directory
+# Delete picture function (skipped if another user has the same picture)
+def delete_picture(old_picture):
+
+    if old_picture == storage.DEFAULT or User.query.filter_by(image_file=old_picture).first():
+        return
+    storage.delete(storage.files(old_picture))  # delete picture from directory
+
+
+# Picture URL for display (default picture until resized variants are ready)
+def picture_url(image_file, size=125, ext='jpg'):
+
+    name = image_file if '.' in image_file else pictures.variant_name(image_file, size, ext)
+    if storage.exists(name):
+        return storage.url(name)
+    return None if ext == 'webp' else storage.url(storage.DEFAULT)
 
 
 # Send registration email
@@ -45,7 +60,7 @@ def sendemail_auth(newuser):
 
 If you did not make this request, then ignore this email and no actions will be taken.
 '''
-    mail.send(msg)  # send email
+    outbox.put(msg)  # queue email (sent in the background)
 
 
 # Send registration email
@@ -60,7 +75,7 @@ def sendemail_emailreset(new_email):
 
 If you did not make this request, then ignore this email and no changes will be taken.
 '''
-    mail.send(msg)  # send email
+    outbox.put(msg)  # queue email (sent in the background)
 
 
 # Send password reset email
@@ -75,4 +90,4 @@ def sendemail_pwreset(user):
 
 If you did not make this request, then ignore this email and no changes will be made.
 '''
-    mail.send(msg)  # send email
+    outbox.put(msg)  # queue email (sent in the background)
@@ -0,0 +1,28 @@
+import multiprocessing
+import os
+
+# gunicorn configuration (gunicorn -c gunicorn.conf.py wsgi:app)
+# The app is loaded (and warmed up, see wsgi.py) once in the master, then workers are forked from it. Background threads
+# (email senders, account reaper) don't survive a fork, so each worker starts its own.
+
+bind = os.environ.get('GUNICORN_BIND', '127.0.0.1:8000')  # behind a reverse proxy (see PROXY_COUNT in config.py)
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', '4'))  # requests per worker (password hashing runs in a pool)
+preload_app = True  # load app before forking (workers share its memory, and start warm)
+timeout = 30
+graceful_timeout = 30
+accesslog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+
+# Report startup profile once the app is loaded
+def when_ready(server):
+    from wsgi import app  # inserted here as the app is only loaded once gunicorn is ready
+    server.log.info('Startup profile:\n%s', app.extensions['startup'].report())
+
+
+# Start background jobs in each worker (before gunicorn starts the worker's request threads)
+def post_fork(server, worker):
+    from flaskapp import start_background_jobs  # inserted here as the app is only loaded once gunicorn is ready
+    from wsgi import app
+    start_background_jobs(app)
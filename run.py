@@ -1,7 +1,10 @@
-from flaskapp import create_app
+import os
+from flaskapp import create_app, start_background_jobs
 
 app = create_app()  # create app instance
 
 # Run app only from within module (i.e. run.py)
 if __name__ == "__main__":
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':  # only in the reloader's child, which serves the requests
+        start_background_jobs(app)
     app.run(debug=True)
@@ -0,0 +1,47 @@
+import pandas as pd
+
+# Output columns (in file order)
+COLUMNS = ['Country', 'Event', 'Event Link', 'Event Logo', 'Country Link', 'Country Logo',
+           'Artist', 'Artist Link', 'Artist Image', 'Song', 'Song Link', 'Flag']
+ARTIST_COLUMNS = ['Country', 'Event', 'Artist', 'Artist Link', 'Song', 'Song Link']
+
+
+# Column buffers
+# Records are added as one value per column list (cheap appends), and turned into a DataFrame once per event, instead of
+# growing a DataFrame row by row (which copies it every time).
+class ColumnBuffer:
+
+    def __init__(self, columns):
+        self.columns = {name: [] for name in columns}
+
+    def append(self, record):
+        for name, values in self.columns.items():
+            values.append(record.get(name))
+
+    def __len__(self):
+        return len(next(iter(self.columns.values()), []))
+
+    def frame(self):
+        return pd.DataFrame(self.columns)
+
+
+# Add event and country links/logos (left joins against the event and country tables, indexed by name)
+def add_details(frame, df_event, df_country):
+    frame = frame.drop(columns=[*df_event.columns, *df_country.columns], errors='ignore')
+    frame = frame.join(df_event[~df_event.index.duplicated()], on='Event')
+    frame = frame.join(df_country[~df_country.index.duplicated()], on='Country')
+    return frame
+
+
+# CSV file written in parts
+# Each write() appends rows (the header only comes with the first), so the full table is never held in memory.
+class CSVWriter:
+
+    def __init__(self, path, columns):
+        self.path = path
+        self.columns = columns
+        self.rows = 0  # rows written
+
+    def write(self, frame):
+        frame[self.columns].to_csv(self.path, mode='a' if self.rows else 'w', header=not self.rows, index=False)
+        self.rows += len(frame)
@@ -0,0 +1,65 @@
+import json
+import os
+import sqlite3
+
+from parsers import Participant
+
+
+# Scrape checkpoint
+# Saves each unit of finished work as soon as it is done (an event's participant list, each artist's song link/image,
+# and each completed event's rows) in a SQLite file, so a scrape that crashes or is killed can be resumed where it
+# stopped (--resume) instead of starting again. A new run (without --resume) starts with an empty checkpoint; the file
+# is removed once a run completes.
+class Checkpoint:
+
+    def __init__(self, path, resume=False):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        with self.connection:
+            self.connection.execute('CREATE TABLE IF NOT EXISTS events '
+                                    '(event TEXT PRIMARY KEY, participants TEXT, rows TEXT)')
+            self.connection.execute('CREATE TABLE IF NOT EXISTS artists (event TEXT, song INTEGER, song_link TEXT, '
+                                    'image TEXT, flag INTEGER, PRIMARY KEY (event, song))')
+            if not resume:
+                self.connection.execute('DELETE FROM events')
+                self.connection.execute('DELETE FROM artists')
+
+    # Saved participants of 'event' (list of Participant, or None)
+    def participants(self, event):
+        row = self.connection.execute('SELECT participants FROM events WHERE event = ?', (event,)).fetchone()
+        if row is None or row[0] is None:
+            return None
+        return [Participant(*fields) for fields in json.loads(row[0])]
+
+    def save_participants(self, event, participants):
+        with self.connection:
+            self.connection.execute('INSERT OR REPLACE INTO events (event, participants) VALUES (?, ?)',
+                                    (event, json.dumps(participants)))
+
+    # Saved song link, image and flag per song of 'event' ({song: (song_link, image, flag)})
+    def artists(self, event):
+        rows = self.connection.execute('SELECT song, song_link, image, flag FROM artists WHERE event = ?', (event,))
+        return {song: (song_link, image, flag) for song, song_link, image, flag in rows}
+
+    def save_artist(self, event, song, song_link, image, flag):
+        with self.connection:
+            self.connection.execute('INSERT OR REPLACE INTO artists VALUES (?, ?, ?, ?, ?)',
+                                    (event, song, song_link, image, flag))
+
+    # Saved rows of a completed event ({column: values}, or None)
+    def rows(self, event):
+        row = self.connection.execute('SELECT rows FROM events WHERE event = ?', (event,)).fetchone()
+        return json.loads(row[0]) if row and row[0] is not None else None
+
+    def save_rows(self, event, frame):
+        rows = json.dumps(frame.to_dict('list'), default=lambda value: value.item())  # (numpy values to Python)
+        with self.connection:
+            self.connection.execute('UPDATE events SET rows = ? WHERE event = ?', (rows, event))
+
+    # Close; 'finished' removes the checkpoint (nothing left to resume)
+    def close(self, finished=False):
+        self.connection.close()
+        if finished:
+            os.remove(self.path)
@@ -1,214 +1,203 @@
-import requests
-import re
-from bs4 import BeautifulSoup
+import argparse
+import os
 import pandas as pd
 import numpy
 import time
-import youtubesearchpython as ysp
+from datetime import datetime
+from assemble import COLUMNS, ARTIST_COLUMNS, ColumnBuffer, CSVWriter, add_details
+from dataset import COMPRESSIONS, Dataset, event_year
+from fetch import Fetcher
+from httpcache import HTTPCache
+from youtube import FakeSearch, SearchCache, YouTubeLookup, youtube_search
+from checkpoint import Checkpoint
+from parsers import parse_artist, parse_countries, parse_events, parse_participants
+
+# Command line options
+# Output goes to --output: a parquet dataset (one folder per event, listed in manifest.json, see dataset.py) plus CSV
+# copies of each table.
+# Pages are fetched concurrently (--workers) while eurovision.tv still gets at most --rate requests per second.
+# --base-url fetches eurovision.tv pages from another server instead (e.g. tools/eurovision_fixture.py).
+# Pages are cached in --cache and only downloaded again if they have changed; with --skip-past, pages of past years'
+# events are not requested at all once cached (they never change), so a refresh only fetches the current event.
+# Songs without a link on their Eurovision page are searched for on Youtube (--youtube-workers at a time); results are
+# cached for --youtube-ttl days (in the cache folder), so later runs only search for new songs.
+# Finished work is saved to --checkpoint as the scrape goes; if a run stops part way, --resume continues it from there.
+parser = argparse.ArgumentParser(description='Scrape Eurovision events, participants and song links.')
+parser.add_argument('--output', default='data', help='output folder')
+parser.add_argument('--compression', choices=COMPRESSIONS, default='snappy', help='parquet compression')
+parser.add_argument('--workers', type=int, default=8, help='concurrent requests')
+parser.add_argument('--rate', type=float, default=1.0, help='requests per second per site')
+parser.add_argument('--base-url', help='server to fetch eurovision.tv pages from (for testing)')
+parser.add_argument('--cache', default=os.path.join('data', 'cache'), help="page cache folder ('' = no cache)")
+parser.add_argument('--skip-past', action='store_true', help="use cached pages of past years' events as they are")
+parser.add_argument('--youtube-workers', type=int, default=4, help='concurrent Youtube searches')
+parser.add_argument('--youtube-ttl', type=float, default=30, help='days Youtube search results are cached for')
+parser.add_argument('--checkpoint', default=os.path.join('data', 'checkpoint.sqlite'), help='checkpoint file')
+parser.add_argument('--resume', action='store_true', help='continue the last (unfinished) run from its checkpoint')
+parser.add_argument('--fake-youtube', action='store_true', help='make up Youtube search results (for testing)')
+args = parser.parse_args()
 
 time_start = time.time()  # start time
 
-# Arguments required to validate scrape requests (i.e. create virtual web browser)
-user_agents = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"
-                             "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/70.0.3538.77 Safari/537.36"}
-session = requests.Session()  # to set up a session for virtual web browser
-
-# Empty lists required for scrape loops
-event_links = []
-event_names = []
-event_logos = []
-country_links = []
-country_names = []
-country_logos = []
-
-# Empty central dataframe
-df_central = pd.DataFrame(columns=['Event', 'Event Link', 'Event Logo',
-                                   'Country', 'Country Link', 'Country Logo',
-                                   'Artist', 'Artist Link', 'Artist Image', 'Song', 'Song Link',
-                                   'Flag'])
+# Fetcher (thread pool, one pooled session, rate limit per site, retries)
+fetcher = Fetcher(workers=args.workers, rate=args.rate,
+                  rewrite={'https://eurovision.tv': args.base_url.rstrip('/')} if args.base_url else None,
+                  cache=HTTPCache(args.cache) if args.cache else None)
+youtube = YouTubeLookup(search=FakeSearch() if args.fake_youtube else youtube_search,
+                        cache=SearchCache(os.path.join(args.cache, 'youtube.sqlite'), ttl=args.youtube_ttl * 24 * 3600)
+                        if args.cache else None,
+                        workers=args.youtube_workers)
+checkpoint = Checkpoint(args.checkpoint, resume=args.resume)
+this_year = datetime.now().year
+past_pages = set()  # pages of past events (used from the cache as they are, with --skip-past)
+
+
+# Whether a page should be revalidated with the site (rather than used from the cache as it is)
+def revalidate(url):
+    return not (args.skip_past and url in past_pages)
+
 
 # Search for all high level event info (i.e. non-event specific)
-event_response = session.get("https://eurovision.tv/events", headers=user_agents)
-event_page = BeautifulSoup(event_response.text, "html.parser")
+events = parse_events(fetcher.get("https://eurovision.tv/events").text)
 # Search for all countries and respective flags/logos
-country_response = session.get("https://eurovision.tv/countries", headers=user_agents)
-country_page = BeautifulSoup(country_response.text, "html.parser")
-
-# Extract all event links that are for Eurovision events
-for link in event_page.findAll('a',
-                               attrs={'href': re.compile("^https://eurovision.tv/event/")}):
-    event_links.append(link.get('href'))
-# Extract all location names that are for Eurovision events
-for link in event_page.findAll('img',
-                               attrs={'class': re.compile("h-full m-auto")}):
-    event_names.append(link.get('alt'))
-# Extract all logo links that are for Eurovision events
-for link in event_page.findAll('img',
-                               attrs={'class': re.compile("h-full m-auto")}):
-    event_logos.append(link.get('src'))
-
-# Extract all country links
-for link in country_page.findAll('a',
-                                 attrs={'href': re.compile(r"https://eurovision.tv/country/")}):
-    country_links.append(link.get('href'))
-# Extract all country names
-for link in country_page.findAll('h4',
-                                 attrs={'class': re.compile("^font-bold")}):
-    country_names.append(link.text.strip())
-# Extract all country logos
-for link in country_page.findAll('img',
-                                 attrs={'src': re.compile(r"^https://static.eurovision.tv/hb-cgi/images/.*\.svg$")}):
-    country_logos.append(link.get('src'))
+countries = parse_countries(fetcher.get("https://eurovision.tv/countries").text)
+
+event_links = [event.link for event in events]
+event_names = [event.name for event in events]
 
 # Create dataframes
-df_event = pd.DataFrame(list(zip(event_names, event_links, event_logos)),
-                        columns=['Event', 'Event Link', 'Event Logo'])
-df_country = pd.DataFrame(list(zip(country_names, country_links, country_logos)),
-                          columns=['Country', 'Country Link', 'Country Logo'])
+df_event = pd.DataFrame(events, columns=['Event', 'Event Link', 'Event Logo'])
+df_country = pd.DataFrame(countries, columns=['Country', 'Country Link', 'Country Logo'])
 
 df_event = df_event.set_index('Event')
 df_country = df_country.set_index('Country')
 
-# Loop through each event to find required information information
-for year in range(len(event_links)):
+# Output tables (written one event at a time, so memory use stays flat however many events there are)
+os.makedirs(args.output, exist_ok=True)
+dataset = Dataset(args.output, compression=args.compression)
+vision_writer = CSVWriter(os.path.join(args.output, 'vision.csv'), COLUMNS)
+artist_writer = CSVWriter(os.path.join(args.output, 'artist.csv'), ARTIST_COLUMNS)
+
+# Loop through each event to find required information (pages fetched concurrently, handled in order)
+past_pages.update(link+"/participants/" for link, name in zip(event_links, event_names)
+                  if (event_year(name) or this_year) < this_year)
+saved_participants = [checkpoint.participants(name) for name in event_names]  # (from an unfinished run, --resume)
+participant_pages = fetcher.map((link+"/participants/" for link, saved in zip(event_links, saved_participants)
+                                 if saved is None), revalidate)
+for year, activeEvent in enumerate(event_names):
+
+    # Use event's rows if saved (completed by an unfinished run)
+    rows = checkpoint.rows(activeEvent)
+    if rows is not None:
+        df_year = pd.DataFrame(rows, columns=COLUMNS)
+        dataset.write_partition('vision', activeEvent, df_year[COLUMNS])
+        dataset.write_partition('artist', activeEvent, df_year[ARTIST_COLUMNS])
+        vision_writer.write(df_year)
+        artist_writer.write(df_year)
+        print("Event "+str(year+1)+" of "+str(len(event_links))+" completed (checkpoint): "+activeEvent)
+        continue
 
-    # Generate empty lists
-    year_country_names = []
-    year_artist_links = []
-    year_artist_names = []
-    year_song_names = []
+    participants = saved_participants[year]
+    if participants is None:
+        url, sheet = next(participant_pages)
 
-    # Identify which event is active
-    activeEvent = event_names[year]
+        # Skip URL if not a typical URL structure (or site unreachable)
+        if sheet is None:
+            print("Event "+str(year+1)+" of "+str(len(event_links))+" skipped. URL: "+"not found")
+            continue
 
-    time.sleep(1)  # wait one second to avoid site timeouts
+        # Skip URL if not successful response from site
+        if sheet.status_code != 200:
+            print("Event "+str(year+1)+" of "+str(len(event_links))+" skipped. URL: "+url)
+            continue
 
-    # Try statement to check whether string argument is a typical URL structure
-    try:
-        sheet = session.get(event_links[year]+"/participants/", headers=user_agents)
-    except requests.exceptions.MissingSchema:
-        print("Event "+str(year+1)+" of "+str(len(event_links))+" skipped. URL: "+"not found")
-        continue
+        participants = parse_participants(sheet.text)
+        checkpoint.save_participants(activeEvent, participants)
+
+    # Collect event's participants in column buffers, then add event/country links and logos (joins, not row updates)
+    buffer = ColumnBuffer(COLUMNS)
+    for participant in participants:
+        buffer.append({'Country': participant.country, 'Event': activeEvent, 'Artist': participant.artist,
+                       'Artist Link': participant.artist_link, 'Song': participant.song})
+    df_year = add_details(buffer.frame(), df_event, df_country)
+
+    # Loop through artist pages to find song links (where possible; pages fetched concurrently, handled in order)
+    song_links = [None] * len(df_year)
+    artist_images = [None] * len(df_year)
+    flags = [1] * len(df_year)  # flag if song link is 'best guess' rather than Eurovision provided link
+    searches = {}  # song -> Youtube search string (songs whose Eurovision page has no link)
+    saved_artists = checkpoint.artists(activeEvent)  # (saved by an unfinished run)
+    for song, (song_link, artist_image, flag) in saved_artists.items():
+        song_links[song], artist_images[song], flags[song] = song_link, artist_image, flag
+    todo = [song for song in range(len(df_year)) if song not in saved_artists]
+    if (event_year(activeEvent) or this_year) < this_year:
+        past_pages.update(link for link in df_year['Artist Link'] if isinstance(link, str))
+    artist_pages = fetcher.map((df_year['Artist Link'][song] for song in todo), revalidate)
+    for song, (url, artist) in zip(todo, artist_pages):
+
+        # Skip URL if not a typical URL structure (or site unreachable)
+        if artist is None:
+            print("Song "+str(song+1)+" of "+str(len(df_year))+" skipped. URL: "+"not found")
+            continue
 
-    # Skip URL if not successful response from site
-    if sheet.status_code != 200:
-        print("Event "+str(year+1)+" of "+str(len(event_links))+" skipped. URL: "+event_links[year]+"/participants/")
-        continue
+        # Skip URL if not successful response from site
+        if artist.status_code != 200:
+            print("Song "+str(song+1)+" of "+str(len(df_year))+" skipped. URL: "+url)
+            continue
 
-    activeSheet = BeautifulSoup(sheet.text, "html.parser")
+        # Extract Youtube song link (if exists) and artist image (from banner) from Eurovision page
+        song_links[song], artist_images[song] = parse_artist(artist.text)
 
-    # Extract country info
-    for link in activeSheet.findAll('a',
-                                    attrs={'href': re.compile("^https://eurovision.tv/country/")}):
-        year_country_names.append(link.text.strip())
+        if song_links[song] is None:
+            searches[song] = ("Eurovision"+" "+activeEvent+" "+df_year['Country'][song]+" "
+                              + df_year['Artist'][song]+" "+df_year['Song'][song])
+            continue
 
-    # Extract all participant artist info
-    for link in activeSheet.findAll('div',
-                                    attrs={'class': re.compile("w-full md:w-1/3 lg:w-1/4 flex")}):
-        if link.a.get('href').find("participant") == -1:
-            year_artist_links.append(numpy.nan)
+        flags[song] = 0
+        checkpoint.save_artist(activeEvent, song, song_links[song], artist_images[song], flags[song])
+        print("Song "+str(song+1)+" of "+str(len(df_year))+" complete: "+df_year['Song'][song])
+
+    # Extract Youtube song links from Youtube search results where Eurovision pages do not include them
+    results = youtube.resolve(searches.values())
+    for song, ytString in searches.items():
+        song_links[song] = results[ytString]
+        checkpoint.save_artist(activeEvent, song, song_links[song], artist_images[song], flags[song])
+        if song_links[song] is None:
+            print("Song "+str(song+1)+" of "+str(len(df_year))+" skipped. URL: "+"not found")
         else:
-            year_artist_links.append(link.a.get('href'))
+            print("Song "+str(song+1)+" of "+str(len(df_year))+" complete: "+df_year['Song'][song])
 
-    for link in activeSheet.findAll('h4',
-                                    attrs={'class': re.compile("^text-xl")}):
-        year_artist_names.append(link.text.strip())
-    for link in activeSheet.findAll('div',
-                                    attrs={'class': re.compile("w-full md:w-1/3 lg:w-1/4 flex")}):
-        year_song_names.append(link.text.strip().split("\n")[-1])
+    df_year['Song Link'] = song_links
+    df_year['Artist Image'] = artist_images
+    df_year['Flag'] = flags
 
-    # Convert into dataframe, indexed by active event
-    df_year = pd.DataFrame(list(zip(year_country_names,
-                                    year_artist_names, year_artist_links, year_song_names)),
-                           columns=['Country',
-                                    'Artist', 'Artist Link', 'Song'])
-    df_year['Event'] = activeEvent
+    # Clean obviously incorrect entries
+    df_year.loc[(df_year.Song == 'No song yet'), 'Song Link'] = numpy.nan
 
-    # Append dataframe to central dataframe
-    df_central = df_central.append(df_year, ignore_index=True)
+    # Save event (replacing its partition of the dataset)
+    dataset.write_partition('vision', activeEvent, df_year[COLUMNS])
+    dataset.write_partition('artist', activeEvent, df_year[ARTIST_COLUMNS])
+    vision_writer.write(df_year)
+    artist_writer.write(df_year)
+    checkpoint.save_rows(activeEvent, df_year[COLUMNS])
 
     print("Event "+str(year+1)+" of "+str(len(event_links))+" completed: "+activeEvent)
 
-# Fill in blanks (i.e. 'nan' values), where possible, in central dataframe
-df_central = df_central.set_index('Event')
-df_central.update(df_event)
-df_central.reset_index(inplace=True)
-df_central = df_central.set_index('Country')
-df_central.update(df_country)
-df_central.reset_index(inplace=True)
-
-# Loop through artist pages to find song links (where possible)
-for song in range(1, len(df_central)):
-
-    time.sleep(1)  # wait one second to avoid site timeouts
-
-    # Try statement to check whether string argument is a typical URL structure
-    try:
-        artist = session.get(df_central['Artist Link'][song], headers=user_agents)
-    except requests.exceptions.MissingSchema:
-        print("Song "+str(song+1)+" of "+str(len(df_central))+" skipped. URL: "+"not found")
-        continue
-
-    # Skip URL if not successful response from site
-    if artist.status_code != 200:
-        print("Song "+str(song+1)+" of "+str(len(df_central))+" skipped. URL: "+df_central['Artist Link'][song])
-        continue
-
-    activeArtist = BeautifulSoup(artist.text, "html.parser")
-
-    # Extract Youtube song link from Eurovision page (if exists)
-    for link in activeArtist.findAll('a',
-                                     attrs={'href': re.compile(r"https://youtube.com/watch")}):
-        df_central.at[song, 'Song Link'] = link.get('href')
-
-    # Extract artist image from banner of Eurovision page
-    for link in activeArtist.findAll('img',
-                                     attrs={
-                                         'src': re.compile(r"^https://static.eurovision.tv/hb-cgi/.*\.hero.jpeg$")}):
-        df_central.at[song, 'Artist Image'] = link.get('src')
-
-    # Extract Youtube song link from Youtube search results if Eurovision page does not include it
-    if df_central.isnull()['Song Link'][song]:
-
-        df_central.at[song, 'Flag'] = 1  # flag if song link is 'best guess' rather than Eurovision provided link
-
-        ytString = ("Eurovision"+" "+df_central['Event'][song]+" "+df_central['Country'][song]+" "
-                    + df_central['Artist'][song]+" "+df_central['Song'][song])
-
-        ytQuery = ysp.VideosSearch(ytString, limit=1)  # only take first result
-
-        # Try statement to check whether the Youtube search brings up any results
-        try:
-            ytLink = ytQuery.result()['result'][0]['link']  # extract link from nested dictionary
-        except IndexError:
-            print("Song "+str(song+1)+" of "+str(len(df_central))+" skipped. URL: "+"not found")
-            continue
-
-        df_central.at[song, 'Song Link'] = ytLink
-    else:
-        df_central.at[song, 'Flag'] = 0
-
-    print("Song "+str(song+1)+" of "+str(len(df_central))+" complete: "+df_central['Song'][song])
-
-# Clean obviously incorrect entries
-df_central.loc[(df_central.Song == 'No song yet'), 'Song Link'] = numpy.nan
-df_central['Flag'] = df_central['Flag'].fillna(1)
-
-# Create artist dataframe
-df_artist = df_central[['Country', 'Event', 'Artist', 'Artist Link', 'Song', 'Song Link']]
+# Save event and country tables (names are their index)
+dataset.write_table('events', df_event.reset_index())
+dataset.write_table('countries', df_country.reset_index())
+df_event.to_csv(os.path.join(args.output, 'events.csv'))
+df_country.to_csv(os.path.join(args.output, 'countries.csv'))
 
-# Save data
-folder = "data\\"
-df_central.to_csv(folder+'vision.csv', index=False)
-df_central.to_parquet(folder+'vision.parquet', index=False)
-df_event.to_csv(folder+'events.csv', index=False)
-df_event.to_parquet(folder+'events.parquet', index=False)
-df_country.to_csv(folder+'countries.csv', index=False)
-df_country.to_parquet(folder+'countries.parquet', index=False)
-df_artist.to_csv(folder+'artist.csv', index=False)
-df_artist.to_parquet(folder+'parquet.csv', index=False)
+fetcher.close()
+checkpoint.close(finished=True)
+if youtube.cache:
+    youtube.cache.close()
 
 time_end = time.time()  # end time
 time_taken = (time_end-time_start)/60  # convert to minutes
 
-print("Script complete. Time elapsed: %.0f mins." % time_taken)
+print("Script complete. Time elapsed: %.0f mins (%d requests, %d retries, %d unchanged, %d from cache; "
+      "%d Youtube searches, %d cached)."
+      % (time_taken, fetcher.requests, fetcher.retried, fetcher.not_modified, fetcher.from_cache,
+         youtube.searches, youtube.cached))
@@ -0,0 +1,117 @@
+import json
+import os
+import re
+import time
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from httpcache import write_atomic
+
+# Columns with few distinct values (dictionary encoded in parquet files; other columns are mostly unique)
+DICTIONARY_COLUMNS = ['Event', 'Event Link', 'Event Logo', 'Country', 'Country Link', 'Country Logo', 'Flag']
+COMPRESSIONS = ['snappy', 'zstd', 'gzip', 'brotli', 'none']
+
+
+# Parquet dataset
+# Each table is stored in 'directory' as parquet files, one folder per event for tables that are partitioned (e.g.
+# vision/rotterdam-2021/part-0.parquet), so a single event can be replaced (e.g. this year's, on a refresh) or appended
+# to without rewriting the rest, and readers only load the events/years they need. manifest.json lists every table's
+# columns and files, and per partition its event year and row count; its 'version' goes up with every write (so
+# readers can tell when the data has changed).
+class Dataset:
+
+    def __init__(self, directory, compression='snappy'):
+        self.directory = directory
+        self.compression = None if compression == 'none' else compression
+        self.manifest = read_manifest(directory) or {'version': 0, 'tables': {}}
+
+    # Write a whole (small, unpartitioned) table
+    def write_table(self, table, frame):
+        path = table + '.parquet'
+        self._write_file(path, frame)
+        self.manifest['tables'][table] = {'columns': list(frame.columns), 'files': [path], 'rows': len(frame)}
+        self._save_manifest()
+
+    # Write one partition of a table, replacing its rows or adding to them (mode 'replace' or 'append')
+    def write_partition(self, table, partition, frame, mode='replace', partition_by='Event'):
+        entry = self.manifest['tables'].setdefault(table, {'columns': list(frame.columns), 'partition_by': partition_by,
+                                                           'partitions': {}, 'rows': 0})
+        old = entry['partitions'].get(partition, {'files': [], 'rows': 0})
+        folder = self._folder(entry, table, partition)
+        path = f'{folder}/part-{len(old["files"]) if mode == "append" else 0}.parquet'
+        self._write_file(path, frame)  # (replaces part-0 in one step)
+        if mode == 'replace':
+            for file in old['files']:
+                if file != path:
+                    os.remove(os.path.join(self.directory, file))
+            old = {'files': [], 'rows': 0}
+        entry['partitions'][partition] = {'year': event_year(partition), 'files': old['files'] + [path],
+                                          'rows': old['rows'] + len(frame)}
+        entry['rows'] = sum(part['rows'] for part in entry['partitions'].values())
+        self._save_manifest()
+
+    # Partition's folder (named after it, unless that name is taken by another partition)
+    @staticmethod
+    def _folder(entry, table, partition):
+        if partition in entry['partitions']:
+            return entry['partitions'][partition]['files'][0].rsplit('/', 1)[0]
+        taken = {part['files'][0].rsplit('/', 1)[0] for part in entry['partitions'].values()}
+        folder = base = table + '/' + slugify(partition)
+        number = 1
+        while folder in taken:
+            number += 1
+            folder = f'{base}-{number}'
+        return folder
+
+    def _write_file(self, path, frame):
+        path = os.path.join(self.directory, path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = pa.Table.from_pandas(frame, schema=schema(frame.columns), preserve_index=False)
+        pq.write_table(data, path + '.tmp', compression=self.compression,
+                       use_dictionary=[name for name in frame.columns if name in DICTIONARY_COLUMNS])
+        os.replace(path + '.tmp', path)
+
+    def _save_manifest(self):
+        self.manifest['version'] += 1
+        self.manifest['updated'] = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+        self.manifest['compression'] = self.compression or 'none'
+        write_atomic(os.path.join(self.directory, 'manifest.json'), json.dumps(self.manifest, indent=1).encode())
+
+
+# Read a table (only the given events/years, for partitioned tables)
+def read(directory, table, events=None, years=None):
+    entry = (read_manifest(directory) or {'tables': {}})['tables'].get(table)
+    if entry is None:
+        raise FileNotFoundError(f'{table} not in dataset {directory}')
+    files = entry.get('files', [])
+    for partition, part in entry.get('partitions', {}).items():
+        if (events is None or partition in events) and (years is None or part['year'] in years):
+            files = files + part['files']
+    if not files:
+        return pd.DataFrame(columns=entry['columns'])
+    return pd.concat([pd.read_parquet(os.path.join(directory, file)) for file in files], ignore_index=True)
+
+
+def read_manifest(directory):
+    try:
+        with open(os.path.join(directory, 'manifest.json')) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+# Arrow schema (all text, except the 0/1 'Flag')
+def schema(columns):
+    return pa.schema([(name, pa.int8() if name == 'Flag' else pa.string()) for name in columns])
+
+
+# Event year (from event name, e.g. 'Rotterdam 2021'; None if not found)
+def event_year(name):
+    match = re.search(r'\d{4}', str(name))
+    return int(match.group(0)) if match else None
+
+
+# Folder name for a partition (e.g. 'Rotterdam 2021' -> 'rotterdam-2021')
+def slugify(name):
+    return re.sub(r'[^a-z0-9]+', '-', str(name).lower()).strip('-') or 'none'
@@ -0,0 +1,139 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+
+# Arguments required to validate scrape requests (i.e. create virtual web browser)
+USER_AGENTS = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"
+                             "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/70.0.3538.77 Safari/537.36"}
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}  # responses worth retrying
+
+
+# Token bucket (limits request rate to one host)
+# Holds up to 'burst' tokens, refilled at 'rate' tokens per second. Callers that find it empty reserve the next token
+# and sleep until it is due, so waiting callers are served in order and the long-run rate never exceeds 'rate'.
+class TokenBucket:
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate  # tokens per second
+        self.burst = burst  # maximum tokens saved up
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1  # take (or reserve) a token
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
+
+
+# Concurrent page fetcher
+# Fetches pages in a thread pool over one pooled requests.Session (connections are reused), with a token bucket per
+# host, so pages are downloaded and parsed in parallel while each site still sees at most 'rate' requests per second.
+# Failed requests (connection errors, timeouts, 429/5xx) are retried with exponential backoff (and Retry-After).
+# 'rewrite' maps URL prefixes to other servers (e.g. {'https://eurovision.tv': 'http://localhost:8000'} to run against
+# tools/eurovision_fixture.py); rate limits still apply per original host. With a 'cache' (HTTPCache), pages are
+# revalidated with conditional GETs, or served straight from the cache when revalidate is False.
+class Fetcher:
+
+    def __init__(self, workers=8, rate=1.0, burst=1, retries=3, backoff=1.0, timeout=30, rewrite=None, cache=None):
+        self.workers = workers  # concurrent requests
+        self.rate = rate  # requests per second per host
+        self.burst = burst  # requests allowed back-to-back per host
+        self.retries = retries  # retries per request
+        self.backoff = backoff  # first retry delay, seconds (doubles per retry)
+        self.timeout = timeout  # seconds per request
+        self.rewrite = rewrite or {}
+        self.cache = cache  # HTTPCache (None = no caching)
+        self.requests = 0  # requests sent (including retries)
+        self.retried = 0  # retries
+        self.not_modified = 0  # pages revalidated by the site ('304 Not Modified', no body transferred)
+        self.from_cache = 0  # pages used from the cache without a request
+        self._buckets = {}  # host -> TokenBucket
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='fetch')
+        self.session = requests.Session()  # to set up a session for virtual web browser
+        self.session.headers.update(USER_AGENTS)
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=workers)  # keep a connection per worker open
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    # Fetch one page; returns the response (any status), or None if the URL is not valid (e.g. missing link) or the
+    # server could not be reached. revalidate=False uses a cached copy (if any) without asking the site.
+    def get(self, url, revalidate=True):
+
+        if not isinstance(url, str) or not url.startswith(('http://', 'https://')):
+            return None
+
+        cached = self.cache.load(url) if self.cache else None
+        if cached is not None and not revalidate:
+            with self._lock:
+                self.from_cache += 1
+            return cached
+        headers = self.cache.conditional_headers(cached) if cached is not None else {}
+
+        bucket = self._bucket(urlsplit(url).netloc)
+        target = self._rewrite(url)
+        for attempt in range(self.retries + 1):
+            bucket.acquire()
+            with self._lock:
+                self.requests += 1
+            try:
+                response = self.session.get(target, headers=headers, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.retries:
+                    return cached  # (site unreachable: last known copy, if any)
+                delay = None
+            else:
+                if response.status_code == 304 and cached is not None:  # unchanged since cached
+                    with self._lock:
+                        self.not_modified += 1
+                    return cached
+                if response.status_code not in RETRY_STATUSES or attempt == self.retries:
+                    if self.cache and response.status_code == 200:
+                        self.cache.store(url, response)
+                    return response
+                delay = retry_after(response)
+            with self._lock:
+                self.retried += 1
+            time.sleep(delay if delay is not None else self.backoff * 2 ** attempt * random.uniform(0.5, 1.5))
+
+    # Fetch pages concurrently; yields (url, response) in the order given. 'revalidate' is passed to get(), either as
+    # a value or as a function of the URL.
+    def map(self, urls, revalidate=True):
+        urls = list(urls)
+        check = revalidate if callable(revalidate) else lambda url: revalidate
+        return zip(urls, self._pool.map(lambda url: self.get(url, check(url)), urls))
+
+    def close(self):
+        self._pool.shutdown()
+        self.session.close()
+
+    def _bucket(self, host):
+        with self._lock:
+            if host not in self._buckets:
+                self._buckets[host] = TokenBucket(self.rate, self.burst)
+            return self._buckets[host]
+
+    def _rewrite(self, url):
+        for prefix, replacement in self.rewrite.items():
+            if url.startswith(prefix):
+                return replacement + url[len(prefix):]
+        return url
+
+
+# Seconds to wait from a Retry-After header (None if missing or a date; at most a minute)
+def retry_after(response):
+    try:
+        return min(float(response.headers.get('Retry-After')), 60)
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,74 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import requests
+
+
+# On-disk HTTP response cache
+# Stores each page's body and validators (ETag / Last-Modified) under a hash of its URL. The fetcher sends the
+# validators with the next request for the page (a conditional GET), and the site answers '304 Not Modified' without a
+# body if the page has not changed, so re-scrapes only transfer pages that did change. Entries can also be used without
+# asking the site at all (e.g. pages of past events, which never change).
+class HTTPCache:
+
+    def __init__(self, directory):
+        self.directory = directory  # cache folder (created when needed)
+
+    # Cached response for 'url', or None
+    def load(self, url):
+        path = self._path(url)
+        try:
+            with open(path + '.json') as f:
+                meta = json.load(f)
+            with open(path + '.body', 'rb') as f:
+                body = f.read()
+        except (OSError, ValueError):
+            return None
+        if meta.get('url') != url:  # (hash collision)
+            return None
+        return to_response(url, meta, body)
+
+    # Headers asking the site to only send 'cached' if it has changed
+    @staticmethod
+    def conditional_headers(cached):
+        headers = {}
+        if cached.headers.get('ETag'):
+            headers['If-None-Match'] = cached.headers['ETag']
+        if cached.headers.get('Last-Modified'):
+            headers['If-Modified-Since'] = cached.headers['Last-Modified']
+        return headers
+
+    # Store a successful response
+    def store(self, url, response):
+        path = self._path(url)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        meta = {'url': url, 'status': response.status_code, 'stored': time.time(), 'encoding': response.encoding,
+                'headers': {name: response.headers[name] for name in ('Content-Type', 'ETag', 'Last-Modified')
+                            if name in response.headers}}
+        write_atomic(path + '.body', response.content)  # body before meta, so meta never points at a missing body
+        write_atomic(path + '.json', json.dumps(meta).encode())
+
+    def _path(self, url):
+        digest = hashlib.sha256(url.encode()).hexdigest()
+        return os.path.join(self.directory, digest[:2], digest)
+
+
+# Rebuild a requests.Response from a cache entry
+def to_response(url, meta, body):
+    response = requests.Response()
+    response.url = url
+    response.status_code = meta['status']
+    response.headers.update(meta['headers'])
+    response.encoding = meta.get('encoding')
+    response._content = body
+    return response
+
+
+# Write file so readers never see it half written
+def write_atomic(path, data):
+    tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
@@ -0,0 +1,157 @@
+import argparse
+import hashlib
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+
+from dataset import Dataset, read, read_manifest
+from fetch import Fetcher
+from httpcache import write_atomic
+
+# Image mirror
+# Downloads the logos and artist images the scraper found (Event Logo, Country Logo, Artist Image) into an image
+# folder, so pages can serve small local copies (with long cache lifetimes) instead of hotlinking static.eurovision.tv.
+# Files are named by content hash ('ab/ab12...ef.jpg'), so an image used under several URLs is stored once. Thumbnails
+# (THUMBNAIL_SIZES, as WebP) are made in a process pool; SVG logos are kept as they are (they scale).
+# The URL -> file mapping is written to the dataset as the 'images' table. Images mirrored by an earlier run are not
+# downloaded again.
+# Usage (after data_scrape.py, from the source folder): python mirror.py
+
+IMAGE_COLUMNS = {'events': 'Event Logo', 'countries': 'Country Logo', 'vision': 'Artist Image'}  # table: URL column
+THUMBNAIL_SIZES = (64, 256)  # px (longest side)
+EXTENSIONS = {'image/jpeg': 'jpg', 'image/png': 'png', 'image/svg+xml': 'svg', 'image/webp': 'webp',
+              'image/gif': 'gif'}
+
+
+# Thumbnail file names for an image ({size: name}; SVGs are their own thumbnail)
+def thumbnail_names(name, sizes):
+    base, ext = os.path.splitext(name)
+    if ext == '.svg':
+        return {size: name for size in sizes}
+    return {size: f'{base}_{size}.webp' for size in sizes}
+
+
+# Make thumbnails of an image (runs in a worker process); returns seconds taken
+def make_thumbnails(directory, name, sizes):
+    from PIL import Image  # inserted here so only the worker processes load Pillow
+
+    start = time.perf_counter()
+    thumbnails = thumbnail_names(name, sizes)
+    with Image.open(os.path.join(directory, name)) as img:
+        img = img.convert('RGBA' if img.mode in ('RGBA', 'LA', 'P') else 'RGB')  # (WebP keeps transparency)
+        for size in sorted(sizes, reverse=True):  # shrink step by step, largest first
+            img.thumbnail((size, size))  # (keeps aspect ratio; never enlarges)
+            path = os.path.join(directory, thumbnails[size])
+            img.save(path + '.tmp', 'WEBP', quality=80, method=4)
+            os.replace(path + '.tmp', path)  # appear complete, or not at all
+    return time.perf_counter() - start
+
+
+class Mirror:
+
+    def __init__(self, fetcher, directory, sizes=THUMBNAIL_SIZES, workers=2, known=None):
+        self.fetcher = fetcher  # Fetcher (concurrent, rate limited)
+        self.directory = directory  # image folder
+        self.sizes = sizes
+        self.workers = workers  # thumbnail processes
+        self.known = known or {}  # URL -> record, from earlier runs
+        self.downloaded = 0  # images downloaded
+        self.stored = 0  # new files (images not already stored under another URL)
+        self.failed = 0  # downloads or thumbnails that failed
+
+    # Mirror images; returns records (URL, Hash, File, Thumbnail <size>...) for every URL mirrored, old and new
+    def run(self, urls):
+        records = {}
+        todo = []
+        for url in dict.fromkeys(url for url in urls if isinstance(url, str)):
+            record = self.known.get(url)
+            if record and os.path.exists(os.path.join(self.directory, record['File'])):
+                records[url] = record
+            else:
+                todo.append(url)
+
+        # Download (concurrently) and store by content hash; thumbnails queued as each new file is stored
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context('fork' if 'fork' in methods else None)  # (spawn re-imports __main__)
+        jobs = {}  # file name -> Future
+        with ProcessPoolExecutor(max_workers=self.workers, mp_context=context) as pool:
+            for url, response in self.fetcher.map(todo):
+                if response is None or response.status_code != 200:
+                    self.failed += 1
+                    print("Image skipped. URL: "+url)
+                    continue
+                self.downloaded += 1
+                digest = hashlib.sha256(response.content).hexdigest()
+                name = f'{digest[:2]}/{digest}.{extension(url, response)}'
+                path = os.path.join(self.directory, name)
+                if not os.path.exists(path):
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    write_atomic(path, response.content)
+                    self.stored += 1
+                thumbnails = thumbnail_names(name, self.sizes)
+                missing = any(not os.path.exists(os.path.join(self.directory, thumbnail))
+                              for thumbnail in thumbnails.values())
+                if missing and name not in jobs:
+                    jobs[name] = pool.submit(make_thumbnails, self.directory, name, self.sizes)
+                records[url] = {'URL': url, 'Hash': digest, 'File': name,
+                                **{f'Thumbnail {size}': thumbnail for size, thumbnail in thumbnails.items()}}
+
+            # Images without thumbnails are mapped to the full size file
+            for name, job in jobs.items():
+                try:
+                    job.result()
+                except Exception as error:
+                    self.failed += 1
+                    print("Thumbnails failed: "+name+" ("+str(error)+")")
+                    for record in records.values():
+                        if record['File'] == name:
+                            record.update({f'Thumbnail {size}': name for size in self.sizes})
+        return list(records.values())
+
+
+# File extension for a downloaded image (from its Content-Type, else its URL)
+def extension(url, response):
+    content_type = response.headers.get('Content-Type', '').split(';')[0].strip()
+    if content_type in EXTENSIONS:
+        return EXTENSIONS[content_type]
+    ext = os.path.splitext(url.split('?')[0])[1].lower().lstrip('.')
+    return {'jpeg': 'jpg', 'svg': 'svg', 'png': 'png', 'gif': 'gif', 'webp': 'webp'}.get(ext, 'bin')
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Mirror scraped logos and artist images locally.')
+    parser.add_argument('--data', default='data', help='dataset folder (data_scrape.py --output)')
+    parser.add_argument('--images', default='images', help='image folder')
+    parser.add_argument('--workers', type=int, default=8, help='concurrent downloads')
+    parser.add_argument('--rate', type=float, default=2.0, help='requests per second per site')
+    parser.add_argument('--processes', type=int, default=max(1, (os.cpu_count() or 1) // 2), help='thumbnail processes')
+    parser.add_argument('--base-url', help='server to fetch images from (for testing)')
+    args = parser.parse_args()
+
+    time_start = time.time()  # start time
+    tables = (read_manifest(args.data) or {}).get('tables', {})
+    urls = []
+    for table, column in IMAGE_COLUMNS.items():
+        if table in tables:
+            urls.extend(read(args.data, table)[column])
+    known = {}
+    if 'images' in tables:
+        known = {record['URL']: record for record in read(args.data, 'images').to_dict('records')}
+
+    rewrite = None
+    if args.base_url:
+        rewrite = {'https://static.eurovision.tv': args.base_url.rstrip('/')}
+    fetcher = Fetcher(workers=args.workers, rate=args.rate, rewrite=rewrite)  # (images are stored, not page cached)
+    mirror = Mirror(fetcher, args.images, workers=args.processes, known=known)
+    records = mirror.run(urls)
+    fetcher.close()
+
+    columns = ['URL', 'Hash', 'File'] + [f'Thumbnail {size}' for size in THUMBNAIL_SIZES]
+    dataset = Dataset(args.data, compression=(read_manifest(args.data) or {}).get('compression', 'snappy'))
+    dataset.write_table('images', pd.DataFrame(records, columns=columns))
+
+    time_taken = (time.time()-time_start)/60  # convert to minutes
+    print("Mirror complete. Time elapsed: %.0f mins (%d images, %d downloaded, %d new files, %d failed)."
+          % (time_taken, len(records), mirror.downloaded, mirror.stored, mirror.failed))
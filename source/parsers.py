@@ -0,0 +1,93 @@
+import re
+from collections import namedtuple
+import lxml.html
+
+# Page parsers
+# One function per eurovision.tv page type. Each builds an lxml tree (much faster than BeautifulSoup's html.parser),
+# then walks only the tags it needs once, in page order, sorting each tag into the field it belongs to. Fields are
+# paired up in page order (as separate findAll calls did before), so a page that is missing an item gives the same
+# records as before.
+
+Event = namedtuple('Event', ['name', 'link', 'logo'])
+Country = namedtuple('Country', ['name', 'link', 'logo'])
+Participant = namedtuple('Participant', ['country', 'artist', 'artist_link', 'song'])  # artist_link None if no page
+ArtistPage = namedtuple('ArtistPage', ['song_link', 'image'])  # None if not on page
+
+EVENT_LINK = re.compile("^https://eurovision.tv/event/")
+EVENT_LOGO = re.compile("h-full m-auto")
+COUNTRY_LINK = re.compile(r"https://eurovision.tv/country/")
+COUNTRY_NAME = re.compile("^font-bold")
+COUNTRY_LOGO = re.compile(r"^https://static.eurovision.tv/hb-cgi/images/.*\.svg$")
+PARTICIPANT_COUNTRY = re.compile("^https://eurovision.tv/country/")
+PARTICIPANT_CARD = re.compile("w-full md:w-1/3 lg:w-1/4 flex")
+PARTICIPANT_NAME = re.compile("^text-xl")
+SONG_LINK = re.compile(r"https://youtube.com/watch")
+ARTIST_IMAGE = re.compile(r"^https://static.eurovision.tv/hb-cgi/.*\.hero.jpeg$")
+
+
+# Events (/events)
+def parse_events(html):
+    links, names, logos = [], [], []
+    for tag in parse(html, ['a', 'img']):
+        if tag.tag == 'a' and matches(tag.get('href'), EVENT_LINK):
+            links.append(tag.get('href'))
+        elif tag.tag == 'img' and has_class(tag, EVENT_LOGO):
+            names.append(tag.get('alt'))
+            logos.append(tag.get('src'))
+    return [Event(*fields) for fields in zip(names, links, logos)]
+
+
+# Countries (/countries)
+def parse_countries(html):
+    links, names, logos = [], [], []
+    for tag in parse(html, ['a', 'h4', 'img']):
+        if tag.tag == 'a' and matches(tag.get('href'), COUNTRY_LINK):
+            links.append(tag.get('href'))
+        elif tag.tag == 'h4' and has_class(tag, COUNTRY_NAME):
+            names.append(tag.text_content().strip())
+        elif tag.tag == 'img' and matches(tag.get('src'), COUNTRY_LOGO):
+            logos.append(tag.get('src'))
+    return [Country(*fields) for fields in zip(names, links, logos)]
+
+
+# Participants of an event (/event/<event>/participants/)
+def parse_participants(html):
+    countries, names, links, songs = [], [], [], []
+    for tag in parse(html, ['a', 'div', 'h4']):
+        if tag.tag == 'a' and matches(tag.get('href'), PARTICIPANT_COUNTRY):
+            countries.append(tag.text_content().strip())
+        elif tag.tag == 'div' and has_class(tag, PARTICIPANT_CARD):
+            link = next(tag.iter('a'), tag).get('href')  # (first link in card)
+            links.append(link if link and 'participant' in link else None)
+            songs.append(tag.text_content().strip().split("\n")[-1])
+        elif tag.tag == 'h4' and has_class(tag, PARTICIPANT_NAME):
+            names.append(tag.text_content().strip())
+    return [Participant(*fields) for fields in zip(countries, names, links, songs)]
+
+
+# Artist page (/participant/<artist>; last match wins, as before)
+def parse_artist(html):
+    song_link = image = None
+    for tag in parse(html, ['a', 'img']):
+        if tag.tag == 'a' and matches(tag.get('href'), SONG_LINK):
+            song_link = tag.get('href')
+        elif tag.tag == 'img' and matches(tag.get('src'), ARTIST_IMAGE):
+            image = tag.get('src')
+    return ArtistPage(song_link, image)
+
+
+# Tags named 'names' in page order
+def parse(html, names):
+    if not html or not html.strip():
+        return []
+    return lxml.html.document_fromstring(html).iter(*names)
+
+
+def matches(value, pattern):
+    return value is not None and pattern.search(value) is not None
+
+
+# Whether any of a tag's classes (or the whole class attribute) matches 'pattern', as findAll(attrs={'class': ...})
+def has_class(tag, pattern):
+    classes = tag.get('class', '').split()
+    return any(pattern.search(name) for name in classes) or matches(' '.join(classes), pattern)
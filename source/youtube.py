@@ -0,0 +1,107 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+# YouTube search backend (first result's link, or None if the search finds nothing)
+def youtube_search(query):
+    import youtubesearchpython as ysp  # inserted here so the rest of the scrape runs without it
+    try:
+        return ysp.VideosSearch(query, limit=1).result()['result'][0]['link']  # extract link from nested dictionary
+    except IndexError:
+        return None
+
+
+# Offline search backend (made up, but stable, link per query; for runs against tools/eurovision_fixture.py)
+class FakeSearch:
+
+    def __init__(self):
+        self.calls = 0  # searches made
+        self._lock = threading.Lock()
+
+    def __call__(self, query):
+        with self._lock:
+            self.calls += 1
+        return 'https://youtube.com/watch?v=' + hashlib.sha1(query.encode()).hexdigest()[:11]
+
+
+# Search result cache
+# Query -> link (or None: nothing found) in a SQLite file, so later scrapes only search for songs they have not seen
+# within 'ttl' seconds. Only used from the thread that created it.
+class SearchCache:
+
+    def __init__(self, path, ttl=30 * 24 * 3600):
+        self.ttl = ttl  # seconds a result is used for
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        self.connection.execute('CREATE TABLE IF NOT EXISTS search '
+                                '(query TEXT PRIMARY KEY, link TEXT, stored REAL NOT NULL)')
+
+    # Cached results for 'queries' still within ttl ({query: link or None})
+    def get_many(self, queries):
+        found = {}
+        queries = list(queries)
+        for start in range(0, len(queries), 500):  # (SQLite limits the number of query parameters)
+            batch = queries[start:start + 500]
+            rows = self.connection.execute(
+                f"SELECT query, link FROM search WHERE stored > ? AND query IN ({','.join('?' * len(batch))})",
+                [time.time() - self.ttl, *batch])
+            found.update(rows)
+        return found
+
+    def put_many(self, results):
+        now = time.time()
+        with self.connection:
+            self.connection.executemany('INSERT OR REPLACE INTO search VALUES (?, ?, ?)',
+                                        [(query, link, now) for query, link in results.items()])
+
+    def close(self):
+        self.connection.close()
+
+
+# YouTube fallback lookup
+# Finds song links for a batch of search queries: repeated queries are searched once, cached results are used as
+# they are, and the rest are searched concurrently (at most 'workers' at a time). Failed searches (e.g. network
+# errors) count as not found for this run, but are not cached, so the next run tries them again.
+class YouTubeLookup:
+
+    def __init__(self, search=youtube_search, cache=None, workers=4):
+        self.search = search  # backend: query -> link or None
+        self.cache = cache  # SearchCache (None = no caching)
+        self.workers = workers  # concurrent searches
+        self.searches = 0  # searches made
+        self.cached = 0  # queries answered from the cache
+        self.failed = 0  # searches that raised an error
+
+    # Links for 'queries' ({query: link or None})
+    def resolve(self, queries):
+        queries = list(dict.fromkeys(queries))  # (unique, in order)
+        results = self.cache.get_many(queries) if self.cache else {}
+        self.cached += len(results)
+        missing = [query for query in queries if query not in results]
+        if not missing:
+            return results
+
+        found = {}
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(missing)), thread_name_prefix='youtube') as pool:
+            for query, (link, error) in zip(missing, pool.map(self._search, missing)):
+                results[query] = link
+                if error is None:
+                    found[query] = link
+                else:
+                    self.failed += 1
+                    print("Youtube search failed: "+query+" ("+str(error)+")")
+        self.searches += len(missing)
+        if self.cache:
+            self.cache.put_many(found)
+        return results
+
+    def _search(self, query):
+        try:
+            return self.search(query), None
+        except Exception as error:
+            return None, error
@@ -0,0 +1,117 @@
+import os
+import sys
+import pandas as pd
+import pytest
+
+# Test setup
+# One app for the whole run (the extensions in flaskapp/__init__.py are shared instances), created with TestConfig:
+# a SQLite file in a temporary folder, a small made-up Eurovision dataset, and a local SMTP sink (tools/smtp_sink.py)
+# as the mail server. Tables are emptied before each test that uses the database.
+# Usage (from the repository root): python -m pytest tests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)  # import flaskapp from repo root
+sys.path.insert(0, os.path.join(ROOT, 'tools'))  # import smtp_sink, eurovision_fixture
+sys.path.insert(0, os.path.join(ROOT, 'source'))  # import dataset, assemble
+os.environ.setdefault('FLASK_SECRET_KEY', 'test')  # (read when flaskapp.config is imported)
+
+ENTRIES = 150  # entries in the test dataset (more than the search API's 100 result cap)
+PASSWORD = 'secret'  # password of users made by add_user
+
+
+# Save a user (verified, registered now, unless given) and return it
+def add_user(username='alice', email='alice@example.com', **fields):
+    from datetime import datetime
+    from flaskapp import db, bcrypt
+    from flaskapp.models import User
+
+    fields.setdefault('password', bcrypt.generate_password_hash(PASSWORD, 4).decode('utf-8'))
+    fields.setdefault('confirm_account', True)
+    fields.setdefault('date_register', datetime.now())
+    user = User(username=username, email=email, **fields)
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+@pytest.fixture(scope='session')
+def smtp_sink():
+    from smtp_sink import SMTPSink
+    sink = SMTPSink(('127.0.0.1', 0)).start()
+    yield sink
+    sink.shutdown()
+
+
+# Local stand-in for eurovision.tv (tools/eurovision_fixture.py)
+@pytest.fixture
+def site():
+    from eurovision_fixture import EurovisionFixture
+    fixture = EurovisionFixture(('127.0.0.1', 0), events=3, participants=4).start()
+    yield fixture
+    fixture.shutdown()
+
+
+# Small dataset: ENTRIES entries over two events, written as data_scrape.py writes it
+@pytest.fixture(scope='session')
+def dataset_path(tmp_path_factory):
+    from assemble import COLUMNS
+    from dataset import Dataset
+
+    path = str(tmp_path_factory.mktemp('data'))
+    dataset = Dataset(path)
+    events = {'Turin 2022': 'https://eurovision.tv/event/turin-2022',
+              'Liverpool 2023': 'https://eurovision.tv/event/liverpool-2023'}
+    for number, (event, link) in enumerate(events.items()):
+        rows = [{'Country': f'Country {i}', 'Event': event, 'Event Link': link, 'Artist': f'Artist {number} {i}',
+                 'Song': f'Song {number} {i}', 'Flag': 0} for i in range(ENTRIES // len(events))]
+        dataset.write_partition('vision', event, pd.DataFrame(rows, columns=COLUMNS))
+    dataset.write_table('events', pd.DataFrame({'Event': list(events), 'Event Link': list(events.values()),
+                                                'Event Logo': [None, None]}))
+    dataset.write_table('countries', pd.DataFrame({'Country': [f'Country {i}' for i in range(ENTRIES // 2)]}))
+    return path
+
+
+@pytest.fixture(scope='session')
+def app(tmp_path_factory, smtp_sink, dataset_path):
+    from flaskapp import create_app, db
+    from flaskapp.config import Config
+
+    folder = tmp_path_factory.mktemp('app')
+
+    class TestConfig(Config):
+        TESTING = True  # (no background jobs)
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + str(folder / 'test.db')
+        WTF_CSRF_ENABLED = False
+        RATELIMIT_ENABLED = False
+        BCRYPT_LOG_ROUNDS = 4
+        OUTBOX_WORKERS = 0
+        MAIL_SERVER = '127.0.0.1'
+        MAIL_PORT = smtp_sink.server_address[1]
+        MAIL_USE_TLS = False
+        MAIL_SUPPRESS_SEND = False  # (Flask-Mail doesn't send when testing, by default)
+        CATALOG_PATH = dataset_path
+        PICTURE_UPLOAD_FOLDER = str(folder / 'uploads')
+
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+# App context with empty tables (and no cached users or remembered tokens, as ids are reused)
+@pytest.fixture
+def db(app):
+    from flaskapp import db, user_cache, tokens
+    with app.app_context():
+        for table in reversed(db.metadata.sorted_tables):
+            db.session.execute(table.delete())
+        db.session.commit()
+        user_cache.clear()
+        tokens.init_app(app)
+        yield db
+        db.session.remove()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
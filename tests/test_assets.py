@@ -0,0 +1,53 @@
+import gzip
+import os
+import pytest
+from flask import url_for
+
+
+def fingerprinted(app, filename):
+    with app.test_request_context():
+        return url_for('static', filename=filename)
+
+
+def test_urls_fingerprinted(app):
+    url = fingerprinted(app, 'main.css')
+    assert url.startswith('/static/main.') and url.endswith('.css') and url != '/static/main.css'
+    assert app.extensions['assets'].manifest['main.css'] == url[len('/static/'):]
+
+
+def test_fingerprinted_file_cached_forever(app, client):
+    response = client.get(fingerprinted(app, 'main.css'))
+    assert response.status_code == 200 and response.mimetype == 'text/css'
+    assert response.cache_control.immutable and response.cache_control.public
+    assert response.cache_control.max_age == app.config['ASSETS_MAX_AGE']
+    with open(os.path.join(app.static_folder, 'main.css'), 'rb') as f:
+        assert response.get_data() == f.read()
+
+
+def test_plain_url_not_cached_forever(client):
+    response = client.get('/static/main.css')
+    assert response.status_code == 200 and not response.cache_control.immutable
+
+
+def test_precompressed_copy_served(app, client):
+    response = client.get(fingerprinted(app, 'main.css'), headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip' and 'Accept-Encoding' in response.vary
+    with open(os.path.join(app.static_folder, 'main.css'), 'rb') as f:
+        assert gzip.decompress(response.get_data()) == f.read()
+
+
+def test_brotli_preferred(app, client):
+    brotli = pytest.importorskip('brotli')
+    response = client.get(fingerprinted(app, 'main.css'), headers={'Accept-Encoding': 'gzip, br'})
+    assert response.headers['Content-Encoding'] == 'br'
+    with open(os.path.join(app.static_folder, 'main.css'), 'rb') as f:
+        assert brotli.decompress(response.get_data()) == f.read()
+
+
+def test_missing_or_outside_files_not_found(client):
+    assert client.get('/static/missing.css').status_code == 404
+    assert client.get('/static/../config.py').status_code == 404
+
+
+def test_pages_link_fingerprinted_css(app, client):
+    assert fingerprinted(app, 'main.css') in client.get('/').get_data(as_text=True)
@@ -0,0 +1,62 @@
+import pytest
+from conftest import ENTRIES
+from flaskapp import catalog
+
+
+def get(client, url, etag=None, **kwargs):
+    headers = {'If-None-Match': etag} if etag else {}
+    return client.get(url, headers=headers, **kwargs)
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    calls = []
+    years = catalog.years
+    monkeypatch.setattr(catalog, 'years', lambda: calls.append(1) or years())
+    return calls
+
+
+def test_loaded_and_indexed(client):
+    years = get(client, '/api/eurovision/years').get_json()['years']
+    assert [year['year'] for year in years] == [2023, 2022]
+    entries = get(client, '/api/eurovision/years/2023').get_json()['entries']
+    assert len(entries) == ENTRIES // 2 and entries[0]['event'] == 'Liverpool 2023'
+    country = get(client, '/api/eurovision/countries/Country 3').get_json()
+    assert country['country']['entries'] == 2 and len(country['entries']) == 2
+    assert get(client, '/api/eurovision/years/1999').status_code == 404
+    assert get(client, '/eurovision/country/Nowhere').status_code == 404
+
+
+# A matching If-None-Match gets a 304 without running the view
+def test_not_modified_without_running_view(client, calls):
+    first = get(client, '/api/eurovision/years')
+    assert first.status_code == 200 and first.headers['ETag'] and first.cache_control.no_cache
+    second = get(client, '/api/eurovision/years', first.headers['ETag'])
+    assert second.status_code == 304 and second.get_data() == b'' and second.headers['ETag'] == first.headers['ETag']
+    assert len(calls) == 1
+
+
+def test_etag_changes_with_dataset_and_url(client, monkeypatch):
+    etag = get(client, '/api/eurovision/years').headers['ETag']
+    assert get(client, '/api/eurovision/countries', etag).status_code == 200
+    monkeypatch.setattr(catalog._state, 'version', 'rescraped')
+    assert get(client, '/api/eurovision/years', etag).status_code == 200
+
+
+def test_pages_cached_per_user(client):
+    anonymous = get(client, '/eurovision')
+    assert anonymous.status_code == 200 and anonymous.cache_control.private and 'Cookie' in anonymous.vary
+    with client.session_transaction() as session:
+        session['_user_id'] = '1'  # (a user id changes the page header, whether or not the user exists)
+    assert get(client, '/eurovision', anonymous.headers['ETag']).status_code == 200
+
+
+# Flashed messages are shown by the next page rendered, so they must not be skipped by a 304
+def test_pending_flash_not_lost_to_304(client):
+    etag = get(client, '/eurovision').headers['ETag']
+    with client.session_transaction() as session:
+        session['_flashes'] = [('success', 'Account updated!')]
+    response = get(client, '/eurovision', etag)
+    assert response.status_code == 200 and 'Account updated!' in response.get_data(as_text=True)
+    assert 'ETag' not in response.headers and response.cache_control.no_store
+    assert get(client, '/eurovision', etag).status_code == 304  # (message shown once)
@@ -0,0 +1,73 @@
+import time
+import pytest
+from flask import Flask
+from sqlalchemy import text
+from sqlalchemy.engine.url import make_url
+from sqlalchemy.pool import NullPool, QueuePool
+from flaskapp.database import Database
+
+
+@pytest.fixture
+def tuned(tmp_path):
+    app = Flask(__name__)
+    app.config.update(SQLALCHEMY_DATABASE_URI='sqlite:///' + str(tmp_path / 'tuned.db'),
+                      SQLALCHEMY_TRACK_MODIFICATIONS=False)
+    database = Database()
+    database.init_app(app)
+    return app, database
+
+
+def engine_options(app, database, url):
+    _, options = database.apply_driver_hacks(app, make_url(url), {})
+    return options
+
+
+def test_sqlite_file_pooled_with_pragmas(tuned):
+    app, database = tuned
+    with app.app_context():
+        engine = database.engine
+        assert isinstance(engine.pool, QueuePool) and engine.pool.size() == app.config['DATABASE_POOL_SIZE']
+        with engine.connect() as conn:
+            assert conn.execute(text('PRAGMA journal_mode')).scalar() == 'wal'
+            assert conn.execute(text('PRAGMA busy_timeout')).scalar() == 5000
+            assert conn.execute(text('PRAGMA synchronous')).scalar() == 1  # (normal)
+
+
+def test_server_database_pool(tuned):
+    app, database = tuned
+    options = engine_options(app, database, 'postgresql://user@localhost/flaskapp')
+    assert options == {'pool_size': 5, 'max_overflow': 10, 'pool_timeout': 10, 'pool_recycle': 1800,
+                       'pool_pre_ping': True}
+
+
+def test_tuning_off_keeps_defaults(tuned):
+    app, database = tuned
+    app.config['DATABASE_TUNING'] = False
+    assert engine_options(app, database, app.config['SQLALCHEMY_DATABASE_URI']) == {'poolclass': NullPool}
+
+
+def test_engine_options_override(tuned):
+    app, database = tuned
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {'pool_size': 2}
+    with app.app_context():
+        assert database.engine.pool.size() == 2
+
+
+# WAL: reading while another connection holds an uncommitted write does not wait
+def test_readers_not_blocked_by_writer(tuned):
+    app, database = tuned
+    with app.app_context():
+        engine = database.engine
+        with engine.begin() as conn:
+            conn.execute(text('CREATE TABLE item (id INTEGER PRIMARY KEY)'))
+        writer = engine.connect()
+        transaction = writer.begin()
+        writer.execute(text('INSERT INTO item (id) VALUES (1)'))
+        try:
+            start = time.perf_counter()
+            with engine.connect() as reader:
+                assert reader.execute(text('SELECT count(*) FROM item')).scalar() == 0
+            assert time.perf_counter() - start < 1
+        finally:
+            transaction.rollback()
+            writer.close()
@@ -0,0 +1,93 @@
+import threading
+import time
+import pytest
+from flask import Flask
+from flask_bcrypt import Bcrypt
+from werkzeug.exceptions import ServiceUnavailable
+from conftest import PASSWORD, add_user
+from flaskapp import bcrypt, hasher
+from flaskapp.hashing import PasswordHasher
+from flaskapp.models import User
+
+
+@pytest.fixture
+def small_hasher():
+    app = Flask(__name__)
+    app.config.update(BCRYPT_LOG_ROUNDS=4, PASSWORD_HASH_WORKERS=1, PASSWORD_HASH_QUEUE=1)
+    return PasswordHasher(app, bcrypt=Bcrypt(app))
+
+
+def login(client):
+    return client.post('/login', data={'email': 'alice@example.com', 'password': PASSWORD})
+
+
+def test_hash_and_check(small_hasher):
+    pw_hash = small_hasher.hash('hunter2')
+    assert pw_hash.startswith('$2b$04$')
+    assert small_hasher.check(pw_hash, 'hunter2') and not small_hasher.check(pw_hash, 'hunter3')
+    assert not small_hasher.needs_rehash(pw_hash)
+    assert small_hasher.needs_rehash(bcrypt.generate_password_hash('hunter2', 5).decode())
+    assert small_hasher.needs_rehash('not a bcrypt hash')
+
+
+# With the worker busy and the queue full, the next operation is rejected straight away
+def test_rejects_when_saturated(small_hasher, monkeypatch):
+    release = threading.Event()
+    started = threading.Event()
+
+    def slow_check(pw_hash, password):
+        started.set()
+        release.wait(10)
+        return True
+    monkeypatch.setattr(small_hasher.bcrypt, 'check_password_hash', slow_check)
+
+    threads = [threading.Thread(target=small_hasher.check, args=('x', 'y')) for _ in range(2)]  # (worker + queue)
+    threads[0].start()
+    started.wait(10)
+    threads[1].start()
+    try:
+        for _ in range(100):  # (wait for the second call to take its slot)
+            if small_hasher._slots._value == 0:
+                break
+            time.sleep(0.01)
+        with pytest.raises(ServiceUnavailable) as error:
+            small_hasher.check('x', 'y')
+        assert error.value.code == 503
+    finally:
+        release.set()
+        for thread in threads:
+            thread.join()
+    assert small_hasher.check('x', 'y')  # (slots released once done)
+
+
+def test_login_gets_503_when_saturated(db, client):
+    add_user()
+    held = 0
+    while hasher._slots.acquire(blocking=False):
+        held += 1
+    try:
+        response = login(client)
+        assert response.status_code == 503 and response.headers['Retry-After'] == '1'
+    finally:
+        for _ in range(held):
+            hasher._slots.release()
+
+
+def test_login_updates_hash_cost(db, client):
+    user_id = add_user(password=bcrypt.generate_password_hash(PASSWORD, 5).decode()).id
+    assert login(client).status_code == 302
+    db.session.expunge_all()
+    assert User.query.get(user_id).password.startswith('$2b$04$')
+
+
+# Rehash skipped (left for a later login) when the pool is full by the time the password has been checked
+def test_login_skips_rehash_when_saturated(db, client, monkeypatch):
+    old_hash = bcrypt.generate_password_hash(PASSWORD, 5).decode()
+    user_id = add_user(password=old_hash).id
+
+    def busy(password):
+        raise ServiceUnavailable()
+    monkeypatch.setattr(hasher, 'hash', busy)
+    assert login(client).status_code == 302
+    db.session.expunge_all()
+    assert User.query.get(user_id).password == old_hash
@@ -0,0 +1,40 @@
+from fetch import Fetcher
+from httpcache import HTTPCache
+
+
+def fetcher(tmp_path):
+    return Fetcher(workers=2, rate=1000, cache=HTTPCache(str(tmp_path / 'cache')))
+
+
+def test_stores_page(site, tmp_path):
+    url = site.base_url + '/events'
+    response = fetcher(tmp_path).get(url)
+    assert response.status_code == 200
+    cached = HTTPCache(str(tmp_path / 'cache')).load(url)
+    assert cached.content == response.content and cached.headers['ETag'] == response.headers['ETag']
+
+
+# A page fetched again is revalidated: the site answers 304 and the cached body is used
+def test_revalidates_with_conditional_get(site, tmp_path):
+    url = site.base_url + '/events'
+    first = fetcher(tmp_path).get(url)
+    again = fetcher(tmp_path)
+    second = again.get(url)
+    assert second.status_code == 200 and second.content == first.content
+    assert again.requests == 1 and again.not_modified == 1 and site.not_modified == 1
+
+
+# revalidate=False uses the cached copy without asking the site
+def test_cached_copy_used_without_request(site, tmp_path):
+    url = site.base_url + '/countries'
+    first = fetcher(tmp_path).get(url)
+    seen = len(site.requests)
+    again = fetcher(tmp_path)
+    assert again.get(url, revalidate=False).content == first.content
+    assert again.requests == 0 and again.from_cache == 1 and len(site.requests) == seen
+
+
+def test_uncached_page_fetched(site, tmp_path):
+    url = site.base_url + '/countries'
+    response = fetcher(tmp_path).get(url, revalidate=False)
+    assert response.status_code == 200 and len(site.requests) == 1
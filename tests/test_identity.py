@@ -0,0 +1,90 @@
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import text
+from conftest import add_user
+from flaskapp.models import User
+from flaskapp.users import identity
+from flaskapp.users.identity import claim_identity, IdentityTaken
+
+
+def expired():
+    return datetime.now() - timedelta(days=1)
+
+
+def login_as(client, user):
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user.id)
+
+
+def test_claims_free_identity(db):
+    user = claim_identity('alice', 'alice@example.com', password='x')
+    assert User.query.one() == user and user.date_register is not None
+
+
+def test_verified_holder_keeps_identity(db):
+    add_user('alice', 'alice@example.com')
+    with pytest.raises(IdentityTaken) as taken:
+        claim_identity('Alice', 'bob@example.com', password='x')
+    assert taken.value.fields == {'username'}
+
+
+def test_unverified_holder_keeps_identity_while_link_valid(db):
+    add_user('alice', 'alice@example.com', confirm_account=False)
+    with pytest.raises(IdentityTaken) as taken:
+        claim_identity('bob', 'ALICE@example.com', password='x')
+    assert taken.value.fields == {'email'}
+
+
+# Expired unverified holders are deleted in the same transaction as the new account is saved
+def test_expired_holders_released(db):
+    add_user('alice', 'old@example.com', confirm_account=False, date_register=expired())
+    add_user('carol', 'alice@example.com', confirm_account=False, date_register=expired())
+    user = claim_identity('alice', 'alice@example.com', password='x')
+    assert User.query.all() == [user]
+
+
+# Another request claims the name between the check and the commit: the unique index rejects the commit
+def test_lost_race_reports_taken_field(db, monkeypatch):
+    find_holders = identity.find_holders
+
+    def racing_find_holders(*args, **kwargs):
+        result = find_holders(*args, **kwargs)
+        monkeypatch.setattr(identity, 'find_holders', find_holders)
+        with db.engine.begin() as conn:  # (the other request, committed on its own connection)
+            conn.execute(text("INSERT INTO user (username, email, username_key, email_key, image_file, password, "
+                              "confirm_account, date_register) VALUES ('Alice', 'other@example.com', 'alice', "
+                              "'other@example.com', 'default.jpg', 'x', 1, :now)"), now=datetime.now())
+        return result
+    monkeypatch.setattr(identity, 'find_holders', racing_find_holders)
+
+    with pytest.raises(IdentityTaken) as taken:
+        claim_identity('alice', 'alice@example.com', password='x')
+    assert taken.value.fields == {'username'}
+    assert [user.username for user in User.query] == ['Alice']
+
+
+# Two accounts asking to change to the same new email (User.temp_email is unique): reported on the email only
+def test_pending_email_change_reported_on_email(db):
+    add_user('bob', 'bob@example.com', temp_email='new@example.com')
+    carol = add_user('carol', 'carol@example.com')
+    with pytest.raises(IdentityTaken) as taken:
+        claim_identity('carol', 'new@example.com', user=carol, temp_email='new@example.com')
+    assert taken.value.fields == {'email'}
+
+
+def test_account_page_reports_pending_email_change(db, client):
+    add_user('bob', 'bob@example.com', temp_email='new@example.com')
+    carol = add_user('carol', 'carol@example.com')
+    login_as(client, carol)
+    page = client.post('/account', data={'username': 'carol', 'email': 'new@example.com'}).get_data(as_text=True)
+    assert 'Email already taken.' in page and 'Username already taken.' not in page
+    assert User.query.filter_by(username='carol').one().temp_email is None
+
+
+def test_account_page_requests_email_change(db, client):
+    carol = add_user('carol', 'carol@example.com')
+    login_as(client, carol)
+    response = client.post('/account', data={'username': 'carol', 'email': 'new@example.com'})
+    assert response.status_code == 302
+    user = User.query.filter_by(username='carol').one()
+    assert (user.email, user.temp_email) == ('carol@example.com', 'new@example.com')
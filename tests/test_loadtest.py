@@ -0,0 +1,33 @@
+import json
+import os
+import subprocess
+import sys
+
+LOADTEST = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks', 'loadtest.py')
+ROUTES = ['register', 'email delivery', 'verify', 'login', 'account', 'account update', 'reset request',
+          'reset password']
+
+
+def loadtest(tmp_path, *args):
+    return subprocess.run([sys.executable, '-W', 'ignore', LOADTEST, '--users', '2', '--iterations', '1', '--seed',
+                           '50', '--bcrypt-rounds', '4', '--db-path', str(tmp_path / 'loadtest.db'), *args],
+                          capture_output=True, text=True, timeout=120)
+
+
+# Every step of the user flow runs without errors, and results are written for later comparison
+def test_runs_user_flows(tmp_path):
+    run = loadtest(tmp_path, '--output', str(tmp_path / 'results.json'))
+    assert run.returncode == 0, run.stderr[-2000:]
+    with open(tmp_path / 'results.json') as f:
+        routes = json.load(f)['routes']
+    assert list(routes) == ROUTES
+    assert all(result['count'] >= 2 and result['errors'] == 0 for result in routes.values())
+    assert routes['login']['statuses'] == {'302': 4}
+
+
+def test_fails_on_regression_against_baseline(tmp_path):
+    baseline = {'routes': {route: {'count': 1, 'p95': 1e-6} for route in ROUTES}}
+    with open(tmp_path / 'baseline.json', 'w') as f:
+        json.dump(baseline, f)
+    run = loadtest(tmp_path, '--baseline', str(tmp_path / 'baseline.json'))
+    assert run.returncode == 1 and 'REGRESSION login' in run.stdout
@@ -0,0 +1,36 @@
+import pytest
+from conftest import PASSWORD, add_user
+from flaskapp.models import User
+
+
+def register(client, username, email):
+    return client.post('/register', data={'username': username, 'email': email, 'password': PASSWORD,
+                                          'confirmpassword': PASSWORD})
+
+
+def test_lookup_keys_follow_username_and_email(db):
+    user = add_user('Alice', ' Alice@Example.COM')
+    assert (user.username_key, user.email_key) == ('alice', 'alice@example.com')
+    user.email = 'New@Example.com'
+    db.session.commit()
+    assert User.query.filter_by(email_key='new@example.com').one() == user
+
+
+@pytest.mark.parametrize('email', ['alice@example.com', 'ALICE@example.com', 'Alice@Example.Com'])
+def test_login_ignores_email_case(db, client, email):
+    add_user('Alice', 'Alice@Example.com')
+    response = client.post('/login', data={'email': email, 'password': PASSWORD})
+    assert response.status_code == 302
+
+
+def test_registration_rejects_names_differing_by_case(db, client):
+    add_user('Alice', 'alice@example.com')
+    page = register(client, 'ALICE', 'ALICE@example.com').get_data(as_text=True)
+    assert 'Username already taken.' in page and 'Email already taken.' in page
+    assert User.query.count() == 1
+
+
+def test_password_reset_finds_email_in_any_case(db, client):
+    add_user('Alice', 'alice@example.com')
+    response = client.post('/resetpassword', data={'email': 'ALICE@EXAMPLE.COM'})
+    assert response.status_code == 302
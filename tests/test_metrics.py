@@ -0,0 +1,74 @@
+import logging
+import time
+import pytest
+from flask import g
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from conftest import PASSWORD, add_user
+from flaskapp.metrics import metrics
+
+
+# Value of one sample in the /metrics output (0 if missing)
+def sample(client, line):
+    for row in client.get('/metrics').get_data(as_text=True).splitlines():
+        if row.startswith(line + ' '):
+            return float(row.rsplit(' ', 1)[1])
+    return 0
+
+
+def test_counts_requests_by_status(client):
+    line = 'flaskapp_requests_total{endpoint="main.home",method="GET",status="200"}'
+    before = sample(client, line)
+    client.get('/')
+    client.get('/')
+    assert sample(client, line) == before + 2
+    missing = 'flaskapp_requests_total{endpoint="unmatched",method="GET",status="404"}'
+    before = sample(client, missing)
+    client.get('/no-such-page')
+    assert sample(client, missing) == before + 1
+
+
+def test_latency_histogram(client):
+    line = 'flaskapp_request_duration_seconds_count{endpoint="main.home",method="GET"}'
+    before = sample(client, line)
+    client.get('/')
+    assert sample(client, line) == before + 1
+    assert sample(client, 'flaskapp_request_duration_seconds_bucket{endpoint="main.home",method="GET",le="+Inf"}') \
+        == before + 1
+
+
+def test_counts_queries_and_components(db, client):
+    add_user()
+    queries = 'flaskapp_request_sql_queries_sum{endpoint="users.login"}'
+    bcrypt = 'flaskapp_component_calls_total{component="bcrypt",endpoint="users.login"}'
+    before = sample(client, queries), sample(client, bcrypt)
+    client.post('/login', data={'email': 'alice@example.com', 'password': PASSWORD})
+    assert sample(client, queries) > before[0] and sample(client, bcrypt) == before[1] + 1
+
+
+# A failing query is counted, and later queries on the same connection are timed on their own
+def test_failed_query_counted(app, db):
+    with app.test_request_context():
+        metrics._start()
+        with db.engine.connect() as conn:
+            with pytest.raises(OperationalError):
+                conn.execute(text('SELECT * FROM no_such_table'))
+            time.sleep(0.2)
+            conn.execute(text('SELECT 1'))
+        assert g.metrics_queries == 2 and g.metrics_sql_seconds < 0.2
+
+
+def test_slow_requests_logged(app, client, caplog, monkeypatch):
+    monkeypatch.setitem(app.config, 'METRICS_SLOW_REQUEST_MS', 0)
+    line = 'flaskapp_slow_requests_total{endpoint="main.home"}'
+    before = sample(client, line)
+    with caplog.at_level(logging.WARNING):
+        client.get('/')
+    assert any('Slow request: GET / (main.home)' in record.getMessage() for record in caplog.records)
+    assert sample(client, line) == before + 1
+
+
+def test_user_cache_counters(client):
+    output = client.get('/metrics').get_data(as_text=True)
+    assert 'flaskapp_user_cache_lookups_total{result="hit"}' in output
+    assert client.get('/metrics').mimetype == 'text/plain'
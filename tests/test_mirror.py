@@ -0,0 +1,56 @@
+import os
+import re
+import subprocess
+import sys
+
+from PIL import Image
+
+from dataset import read
+from mirror import make_thumbnails, thumbnail_names
+from test_scrape import scrape
+
+MIRROR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'source', 'mirror.py')
+
+
+def mirror(site, folder):
+    start = len(site.requests)
+    output = subprocess.run([sys.executable, '-W', 'ignore', MIRROR, '--base-url', site.base_url, '--rate', '1000',
+                             '--processes', '1'], cwd=folder, check=True, capture_output=True, text=True).stdout
+    images = [path for _, path in site.requests[start:] if path.startswith('/hb-cgi/images/')]
+    return images, output
+
+
+def test_thumbnail_names():
+    assert thumbnail_names('ab/ab12.jpg', (64, 256)) == {64: 'ab/ab12_64.webp', 256: 'ab/ab12_256.webp'}
+    assert thumbnail_names('cd/cd34.svg', (64, 256)) == {64: 'cd/cd34.svg', 256: 'cd/cd34.svg'}
+
+
+# Thumbnails fit their size, keep the aspect ratio and keep transparency
+def test_make_thumbnails(tmp_path):
+    Image.new('RGBA', (400, 200), (255, 0, 0, 0)).save(tmp_path / 'logo.png')
+    make_thumbnails(str(tmp_path), 'logo.png', (64, 256))
+    with Image.open(tmp_path / 'logo_256.webp') as img:
+        assert img.size == (256, 128)
+        assert img.mode == 'RGBA'
+    with Image.open(tmp_path / 'logo_64.webp') as img:
+        assert img.size == (64, 32)
+
+
+# Identical images are stored once, and a second run downloads nothing
+def test_mirror_stores_by_content_and_skips_known(site, tmp_path):
+    scrape(site, tmp_path)
+    first, _ = mirror(site, tmp_path)
+    assert first
+
+    records = read(str(tmp_path / 'data'), 'images').to_dict('records')
+    assert len(records) == len(set(first))
+    files = {record['File'] for record in records}
+    assert len(files) < len(records)  # (the fixture repeats colours)
+    for record in records:
+        assert os.path.exists(tmp_path / 'images' / record['File'])
+        assert os.path.exists(tmp_path / 'images' / record['Thumbnail 64'])
+        assert record['File'].startswith(record['Hash'][:2] + '/' + record['Hash'])
+
+    second, output = mirror(site, tmp_path)
+    assert second == []
+    assert re.search(r'\b0 downloaded', output)
@@ -0,0 +1,76 @@
+from datetime import datetime, timedelta
+import pytest
+from flask_mail import Message
+from flaskapp import outbox
+from flaskapp.models import OutboxMessage
+
+
+def queue(*recipients):
+    return [outbox.put(Message('Hello', sender='noreply@example.com', recipients=[to], body='Hi')).id
+            for to in recipients]
+
+
+def rows():
+    return {row.recipients: row for row in OutboxMessage.query.order_by(OutboxMessage.id)}
+
+
+@pytest.fixture
+def sink(smtp_sink):
+    smtp_sink.messages.clear()
+    smtp_sink.fail_rate = 0.0
+    yield smtp_sink
+    smtp_sink.fail_rate = 0.0
+
+
+def test_sends_queued_emails(db, sink):
+    queue('a@example.com', 'b@example.com')
+    assert outbox.drain() == (2, 0)
+    assert [row.status for row in rows().values()] == ['sent', 'sent']
+    assert sorted(msg['To'] for msg in sink.messages) == ['a@example.com', 'b@example.com']
+
+
+# An email that can't be sent (smtplib can't encode the address) is rescheduled; the rest of its batch is still sent
+def test_unsendable_email_does_not_block_batch(db, sink):
+    queue('josé@example.com', 'a@example.com', 'b@example.com')
+    assert outbox.drain() == (2, 1)
+    bad = rows()['josé@example.com']
+    assert bad.status == 'pending' and bad.attempts == 1 and bad.last_error
+    assert bad.next_attempt > datetime.now() and bad.claimed_by is None
+    assert sorted(msg['To'] for msg in sink.messages) == ['a@example.com', 'b@example.com']
+
+
+# Rejected emails are retried with backoff, and marked failed after OUTBOX_MAX_ATTEMPTS
+def test_rejected_email_retried_then_failed(app, db, sink):
+    sink.fail_rate = 1.0  # (every email rejected with a temporary error)
+    queue('a@example.com')
+    delays = []
+    for attempt in range(1, app.config['OUTBOX_MAX_ATTEMPTS'] + 1):
+        start = datetime.now()
+        assert outbox.drain() == (0, 1)
+        row = rows()['a@example.com']
+        assert row.attempts == attempt
+        if attempt < app.config['OUTBOX_MAX_ATTEMPTS']:
+            assert row.status == 'pending'
+            delays.append((row.next_attempt - start).total_seconds())
+            row.next_attempt = datetime.now()  # (due again now, rather than waiting)
+            db.session.commit()
+    assert row.status == 'failed'
+    assert outbox.drain() == (0, 0)  # (failed emails are not claimed again)
+    assert delays == sorted(delays) and delays[0] >= app.config['OUTBOX_BACKOFF_SECONDS'] - 1
+
+
+# Mail server unreachable: the whole batch is rescheduled
+def test_connection_failure_retries_batch(app, db, sink):
+    queue('a@example.com', 'b@example.com')
+    state = app.extensions['mail']
+    port, state.port = state.port, 1  # (nothing listening)
+    try:
+        assert outbox.drain() == (0, 2)
+    finally:
+        state.port = port
+    assert all(row.status == 'pending' and row.attempts == 1 for row in rows().values())
+
+    for row in rows().values():
+        row.next_attempt = datetime.now() - timedelta(seconds=1)
+    db.session.commit()
+    assert outbox.drain() == (2, 0)
@@ -0,0 +1,96 @@
+import io
+import os
+import time
+import pytest
+from PIL import Image
+from conftest import add_user
+from flaskapp.models import User
+from flaskapp.users import pictures, storage
+
+
+@pytest.fixture
+def pics(tmp_path, monkeypatch):
+    folder = tmp_path / 'profile_pics'
+    folder.mkdir()
+    monkeypatch.setattr(storage, 'root', lambda: str(folder))  # (not the app's static folder)
+    return folder
+
+
+@pytest.fixture
+def user(db, client):
+    user = add_user()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user.id)
+    return user
+
+
+def image_bytes(mode='RGB', fmt='PNG', size=(300, 200)):
+    buffer = io.BytesIO()
+    Image.new(mode, size, (200, 16, 46, 128) if mode == 'RGBA' else (200, 16, 46)).save(buffer, fmt)
+    return buffer.getvalue()
+
+
+def upload(client, data, filename):
+    return client.post('/account', data={'username': 'alice', 'email': 'alice@example.com',
+                                         'picture': (io.BytesIO(data), filename)},
+                       content_type='multipart/form-data')
+
+
+def wait_for(paths, seconds=20):
+    deadline = time.monotonic() + seconds
+    while not all(os.path.exists(path) for path in paths):
+        assert time.monotonic() < deadline, 'picture variants not written'
+        time.sleep(0.05)
+
+
+def test_upload_resized_in_background(app, client, user, pics):
+    response = upload(client, image_bytes(), 'me.png')
+    assert response.status_code == 302
+    digest = User.query.get(user.id).image_file
+    assert len(digest) == 64
+    wait_for([storage.path(name) for name in storage.files(digest)])
+    with Image.open(storage.path(pictures.variant_name(digest, 256, 'jpg'))) as img:
+        assert img.size == (256, 171)
+    assert os.listdir(app.config['PICTURE_UPLOAD_FOLDER']) == []  # (temporary upload removed)
+
+
+@pytest.mark.parametrize('data, filename', [(b'not an image', 'me.jpg'), (image_bytes()[:40], 'me.png')],
+                         ids=['text', 'truncated'])
+def test_non_image_rejected_with_form_error(app, client, user, pics, data, filename):
+    page = upload(client, data, filename).get_data(as_text=True)
+    assert 'File is not a valid image.' in page and 'Profile picture updated!' not in page
+    assert User.query.get(user.id).image_file == storage.DEFAULT
+    assert list(pics.iterdir()) == []
+    assert os.listdir(app.config['PICTURE_UPLOAD_FOLDER']) == []
+
+
+def test_webp_keeps_transparency(tmp_path):
+    src = tmp_path / 'upload.png'
+    src.write_bytes(image_bytes('RGBA'))
+    pictures.render_variants(str(src), str(tmp_path), 'abc', (64,))
+    with Image.open(tmp_path / 'abc_64.webp') as img:
+        assert img.mode == 'RGBA' and img.getpixel((0, 0))[3] == 128
+    with Image.open(tmp_path / 'abc_64.jpg') as img:
+        assert img.mode == 'RGB'
+    assert not src.exists()
+
+
+def test_opaque_upload_has_no_alpha(tmp_path):
+    src = tmp_path / 'upload.jpg'
+    src.write_bytes(image_bytes(fmt='JPEG'))
+    pictures.render_variants(str(src), str(tmp_path), 'abc', (64, 32))
+    for size in (64, 32):
+        for ext in pictures.FORMATS:
+            with Image.open(tmp_path / pictures.variant_name('abc', size, ext)) as img:
+                assert img.mode == 'RGB' and max(img.size) == size
+
+
+# An upload identical to a stored picture is not resized again
+def test_identical_upload_reuses_stored_picture(app, client, user, pics, monkeypatch):
+    upload(client, image_bytes(), 'me.png')
+    digest = User.query.get(user.id).image_file
+    wait_for([storage.path(name) for name in storage.files(digest)])
+    submitted = []
+    monkeypatch.setattr(pictures, 'submit', lambda *args: submitted.append(args))
+    assert upload(client, image_bytes(), 'again.png').status_code == 302
+    assert submitted == [] and User.query.get(user.id).image_file == digest
@@ -0,0 +1,93 @@
+import json
+import os
+import subprocess
+import sys
+import pytest
+from flaskapp import limiter
+from flaskapp.ratelimit import MemoryStorage, retry_after
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def limits(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'RATELIMIT_ENABLED', True)
+    monkeypatch.setitem(app.config, 'RATELIMIT_LIMITS', {'login': {'ip': (3, 60), 'account': (2, 300)}})
+    monkeypatch.setattr(limiter, 'storage', MemoryStorage())
+
+
+def login(client, email='alice@example.com', ip='198.51.100.1'):
+    return client.post('/login', data={'email': email, 'password': 'wrong'}, environ_base={'REMOTE_ADDR': ip})
+
+
+def test_limits_attempts_per_ip(db, client, limits):
+    statuses = [login(client, f'user{i}@example.com').status_code for i in range(4)]
+    assert statuses == [200, 200, 200, 429]
+    assert login(client, 'other@example.com', ip='198.51.100.2').status_code == 200  # (other addresses unaffected)
+
+
+def test_limits_attempts_per_account(db, client, limits):
+    statuses = [login(client, 'Alice@example.com', ip=f'198.51.100.{i}').status_code for i in range(3)]
+    assert statuses == [200, 200, 429]  # (email matched whatever its case)
+
+
+def test_429_says_how_long_to_wait(db, client, limits):
+    for _ in range(2):
+        login(client)
+    response = login(client)
+    assert response.status_code == 429 and 1 <= int(response.headers['Retry-After']) <= 300
+
+
+def test_rejected_attempts_not_counted(db, client, limits):
+    for _ in range(2):
+        login(client)
+    assert login(client).status_code == 429
+    assert login(client, 'bob@example.com').status_code == 200  # (third hit for the address: the 429 was refunded)
+
+
+def test_page_views_not_limited(client, limits):
+    assert all(client.get('/login').status_code == 200 for _ in range(5))
+
+
+# 3 per 60s, at the start of a window: the wait until one more hit fits in the sliding window
+@pytest.mark.parametrize('previous, current, expected', [(0, 3, 80), (3, 0, 20), (6, 0, 40), (3, 1, 40)])
+def test_retry_after(previous, current, expected):
+    assert retry_after(3, 60, 0, previous, current) == pytest.approx(expected, abs=1)
+
+
+def test_memory_storage_drops_least_recently_used():
+    storage = MemoryStorage(size=2)
+    storage.incr('a', 1)
+    storage.incr('b', 1)
+    storage.incr('a', 1)
+    storage.incr('c', 1)
+    assert storage.incr('a', 1) == (0, 3) and storage.incr('b', 1) == (0, 1)
+    assert storage.incr('a', 2) == (3, 1)  # (next window)
+
+
+# Behind a reverse proxy (PROXY_COUNT), clients are told apart by X-Forwarded-For rather than the proxy's address
+PROXIED_APP = '''
+import json
+from flaskapp import create_app
+from flaskapp.config import Config
+
+class ProxiedConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    CATALOG_ENABLED = False
+    WTF_CSRF_ENABLED = False
+    PROXY_COUNT = 1
+    RATELIMIT_LIMITS = {'login': {'ip': (1, 60)}}
+
+client = create_app(ProxiedConfig).test_client()
+statuses = [client.post('/login', headers={'X-Forwarded-For': ip}).status_code
+            for ip in ('203.0.113.1', '203.0.113.1', '203.0.113.2')]
+print(json.dumps(statuses))
+'''
+
+
+def test_client_address_from_proxy_headers():
+    run = subprocess.run([sys.executable, '-W', 'ignore', '-c', PROXIED_APP], cwd=ROOT, capture_output=True,
+                         text=True, env=dict(os.environ, FLASK_SECRET_KEY='test', FLASK_RATELIMIT='1'), timeout=60)
+    assert run.returncode == 0, run.stderr[-2000:]
+    assert json.loads(run.stdout.splitlines()[-1]) == [200, 429, 200]
@@ -0,0 +1,46 @@
+import time
+from datetime import datetime, timedelta
+from conftest import add_user
+from flaskapp.models import User
+from flaskapp.users.reaper import reap_unverified, start_reaper
+
+
+def add_users(count, prefix, **fields):
+    for i in range(count):
+        add_user(f'{prefix}{i}', f'{prefix}{i}@example.com', **fields)
+
+
+def remaining():
+    return sorted(user.username for user in User.query)
+
+
+def test_deletes_expired_unverified_accounts_in_batches(db):
+    expired = datetime.now() - timedelta(days=1)
+    add_users(7, 'old', confirm_account=False, date_register=expired)
+    add_users(2, 'new', confirm_account=False)  # (verification link still valid)
+    add_users(2, 'ok', date_register=expired)  # (verified)
+    assert reap_unverified(batch_size=3) == 7
+    assert remaining() == ['new0', 'new1', 'ok0', 'ok1']
+    assert reap_unverified(batch_size=3) == 0
+
+
+def test_command(app, db):
+    add_users(2, 'old', confirm_account=False, date_register=datetime.now() - timedelta(days=1))
+    result = app.test_cli_runner().invoke(args=['users', 'reap', '--batch-size', '1'])
+    assert result.exit_code == 0 and 'Deleted 2 expired unverified accounts.' in result.output
+    assert remaining() == []
+
+
+def test_background_reaper(app, db, monkeypatch):
+    add_users(2, 'old', confirm_account=False, date_register=datetime.now() - timedelta(days=1))
+    monkeypatch.setitem(app.config, 'REAPER_INTERVAL_SECONDS', 0.05)
+    stop = start_reaper(app)
+    try:
+        for _ in range(100):
+            db.session.rollback()  # (new read transaction)
+            if not remaining():
+                break
+            time.sleep(0.05)
+    finally:
+        stop.set()
+    assert remaining() == []
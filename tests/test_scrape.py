@@ -0,0 +1,38 @@
+import os
+import re
+import subprocess
+import sys
+from datetime import datetime
+
+SCRAPER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'source', 'data_scrape.py')
+
+
+def scrape(site, folder, *args):
+    start = len(site.requests)
+    subprocess.run([sys.executable, '-W', 'ignore', SCRAPER, '--base-url', site.base_url, '--fake-youtube',
+                    '--rate', '1000', *args], cwd=folder, check=True, stdout=subprocess.DEVNULL)
+    return [path for _, path in site.requests[start:]]
+
+
+# Year of the event a participants/artist page belongs to (None for other pages)
+def page_year(path):
+    match = re.match(r'/(?:event/city\d+|participant/artist)-(\d{4})', path)
+    return int(match.group(1)) if match else None
+
+
+def test_scrape_writes_dataset(site, tmp_path):
+    scrape(site, tmp_path)
+    assert os.path.exists(tmp_path / 'data' / 'manifest.json')
+    assert os.path.exists(tmp_path / 'data' / 'vision.csv')
+    assert not os.path.exists(tmp_path / 'data' / 'checkpoint.sqlite')  # (removed once finished)
+
+
+# With --skip-past, a second run uses its cached pages of past events without asking the site
+def test_skip_past_does_not_refetch_past_events(site, tmp_path):
+    this_year = datetime.now().year
+    first = scrape(site, tmp_path, '--skip-past')
+    assert any(page_year(path) and page_year(path) < this_year for path in first)
+
+    second = scrape(site, tmp_path, '--skip-past')
+    assert not [path for path in second if page_year(path) and page_year(path) < this_year]
+    assert any(page_year(path) == this_year for path in second)  # (this year's pages are still checked)
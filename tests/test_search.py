@@ -0,0 +1,27 @@
+import pytest
+from conftest import ENTRIES
+
+
+def search(client, **params):
+    response = client.get('/api/search', query_string=params)
+    assert response.status_code == 200
+    return response.get_json()['results']
+
+
+def test_finds_typos(client):
+    results = search(client, q='artsit 1 7')
+    assert results[0]['artist'] == 'Artist 1 7'
+
+
+@pytest.mark.parametrize('limit, expected', [(5, 5), (1, 1), (0, 1), (-1, 1), (-500, 1), (1000, 100)])
+def test_limit_bounds(client, limit, expected):
+    assert ENTRIES > 100
+    assert len(search(client, q='artist', limit=limit)) == expected
+
+
+def test_default_limit(client):
+    assert len(search(client, q='artist')) == 20
+
+
+def test_empty_query(client):
+    assert search(client, q='  ') == []
@@ -0,0 +1,59 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BACKGROUND_JOBS = '''
+import threading
+from flaskapp import create_app
+from flaskapp.users import pictures
+create_app()
+print(len(threading.enumerate()), pictures._pool is None)
+'''
+
+
+def environment(tmp_path):
+    return dict(os.environ, FLASK_APP='run.py', FLASK_SQL_DATABASE='sqlite:///' + str(tmp_path / 'startup.db'),
+                FLASK_REAPER_INTERVAL='60')
+
+
+# create_app starts no threads or processes (only run.py and gunicorn's workers start background jobs)
+def test_create_app_starts_no_background_jobs(tmp_path):
+    child = subprocess.run([sys.executable, '-c', BACKGROUND_JOBS], cwd=ROOT, env=environment(tmp_path),
+                           capture_output=True, text=True, check=True)
+    assert child.stdout.split() == ['1', 'True']
+
+
+# 'flask db upgrade' on a new database doesn't start the email senders (which would query tables not yet created)
+def test_db_upgrade_runs_without_background_jobs(tmp_path):
+    child = subprocess.run([sys.executable, '-m', 'flask', 'db', 'upgrade'], cwd=ROOT, env=environment(tmp_path),
+                           capture_output=True, text=True, check=True)
+    assert 'Database up to date (0 users)' in child.stdout
+    assert 'no such table' not in child.stderr
+
+
+# The startup profile times the import of each package the extensions need, apart from flaskapp's own modules
+def test_profile_times_each_import(app):
+    steps = [name for name, _ in app.extensions['startup'].steps]
+    for package in ('flask', 'sqlalchemy', 'flask_sqlalchemy', 'flask_bcrypt', 'flask_login', 'flask_mail', 'flaskapp'):
+        assert f'import {package}' in steps
+    assert all(seconds >= 0 for _, seconds in app.extensions['startup'].steps)
+
+
+# Warmup requests are not counted in /metrics (which forked workers would otherwise inherit)
+def test_warmup_clears_metrics(app, db, client):
+    from flaskapp.startup import warmup  # inserted here so the app fixture imports flaskapp first
+
+    warmup(app)
+    assert 'endpoint="main.home"' not in client.get(app.config['METRICS_PATH']).get_data(as_text=True)
+    client.get('/')
+    assert 'endpoint="main.home"' in client.get(app.config['METRICS_PATH']).get_data(as_text=True)
+
+
+# The production app doesn't start on a database without tables
+def test_warmup_fails_without_tables(tmp_path):
+    child = subprocess.run([sys.executable, '-c', 'import wsgi'], cwd=ROOT, env=environment(tmp_path),
+                           capture_output=True, text=True)
+    assert child.returncode != 0
+    assert 'Database tables missing' in child.stderr
@@ -0,0 +1,74 @@
+import os
+import time
+import pytest
+from conftest import add_user
+from flaskapp.users import storage
+
+OLD = time.time() - 2 * 3600  # (older than the default grace period)
+
+
+@pytest.fixture
+def pics(tmp_path, monkeypatch):
+    folder = tmp_path / 'profile_pics'
+    folder.mkdir()
+    monkeypatch.setattr(storage, 'root', lambda: str(folder))  # (not the app's static folder)
+    return folder
+
+
+def store(name, mtime=OLD):
+    path = os.path.join(storage.directory(name), name)
+    open(path, 'wb').close()
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def stored():
+    return [name for name, _ in storage.walk()]
+
+
+def test_sharded_by_name_prefix(app, pics):
+    with app.test_request_context():
+        assert storage.path('ab12ef_125.jpg') == str(pics / 'ab' / '12' / 'ab12ef_125.jpg')
+        assert storage.url('ab12ef_125.jpg') == '/static/profile_pics/ab/12/ab12ef_125.jpg'
+        assert storage.path(storage.DEFAULT) == str(pics / storage.DEFAULT)
+
+
+def test_files_of_picture(app):
+    with app.app_context():
+        assert len(storage.files('ab12')) == len(app.config['PICTURE_SIZES']) * 2
+        assert storage.files('0123abcd.jpg') == ['0123abcd.jpg']
+
+
+def test_migrate_flat(db, pics):
+    for name in ('0123abcd.jpg', '4567ef01.png', storage.DEFAULT, '.upload-x'):
+        (pics / name).write_bytes(b'')
+    assert storage.migrate_flat() == 2
+    assert stored() == ['0123abcd.jpg', '4567ef01.png']
+    assert sorted(os.listdir(pics)) == ['.upload-x', '01', '45', storage.DEFAULT]
+
+
+# Unreferenced files (and unfinished uploads) older than the grace period are deleted, the rest kept
+def test_collect_garbage(app, db, pics):
+    add_user('alice', 'alice@example.com', image_file='aa11')
+    add_user('bob', 'bob@example.com', image_file='0123abcd.jpg')
+    kept = [store('aa11_32.jpg'), store('aa11_32.webp'), store('0123abcd.jpg'), store('ff00_32.jpg', time.time())]
+    deleted = [store('bb22_32.jpg'), store('bb22_32.webp'), store('9999aaaa.png')]
+    upload = os.path.join(storage.uploads(), '.upload-old')
+    open(upload, 'wb').close()
+    os.utime(upload, (OLD, OLD))
+    young_upload = os.path.join(storage.uploads(), '.upload-new')
+    open(young_upload, 'wb').close()
+
+    assert storage.collect_garbage(dry_run=True) == (4, 4)
+    assert all(os.path.exists(path) for path in deleted)
+    assert storage.collect_garbage(batch_size=2) == (4, 4)
+    assert all(os.path.exists(path) for path in kept) and not any(os.path.exists(path) for path in deleted)
+    assert not os.path.exists(upload) and os.path.exists(young_upload)
+    os.remove(young_upload)
+
+
+def test_gc_command(app, db, pics):
+    store('bb22_32.jpg')
+    result = app.test_cli_runner().invoke(args=['pictures', 'gc'])
+    assert result.exit_code == 0 and '1 unreferenced files deleted, 0 kept.' in result.output
+    assert stored() == []
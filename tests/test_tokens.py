@@ -0,0 +1,118 @@
+from contextlib import contextmanager
+import pytest
+from sqlalchemy import event, text
+from conftest import PASSWORD, add_user
+from flaskapp import bcrypt, tokens, user_cache
+from flaskapp.models import User
+
+
+# Count SQL statements run inside the block
+@contextmanager
+def counting_queries(engine):
+    statements = []
+    listener = lambda *args: statements.append(args[2])  # noqa: E731
+    event.listen(engine, 'before_cursor_execute', listener)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', listener)
+
+
+@pytest.fixture
+def user(db):
+    user_id = add_user(confirm_account=False).id
+    db.session.expunge_all()
+    return User.query.get(user_id)
+
+
+def test_verifies_own_purpose_only(user):
+    token = tokens.create('email', user, 60)
+    assert tokens.verify('email', token) == user
+    assert tokens.verify('reset', token) is None
+
+
+@pytest.mark.parametrize('make_token', [lambda user: tokens.create('email', user, 60)[:-2] + 'xx',
+                                        lambda user: tokens.create('email', user, -1),
+                                        lambda user: 'not a token'], ids=['tampered', 'expired', 'garbage'])
+def test_rejected_token_remembered(db, user, make_token):
+    token = make_token(user)
+    assert tokens.verify('email', token) is None
+    with counting_queries(db.engine) as statements:
+        assert tokens.verify('email', token, fresh=True) is None
+    assert statements == []
+
+
+def test_stops_working_once_account_changes(db, user):
+    email_token = tokens.create('email', user, 60)
+    reset_token = tokens.create('reset', user, 60)
+    user.confirm_account = True
+    user.password = bcrypt.generate_password_hash('new', 4).decode()
+    db.session.commit()
+    assert tokens.verify('email', email_token) is None
+    assert tokens.verify('reset', reset_token, fresh=True) is None
+
+
+def test_spent_token_rejected_without_query(db, user):
+    token = tokens.create('reset', user, 60)
+    tokens.spend('reset', token)
+    with counting_queries(db.engine) as statements:
+        assert tokens.verify('reset', token) is None
+    assert statements == []
+
+
+# The user cache still holds the account as it was before the change the token was made for (e.g. made in another
+# process): the token is checked against the database, not rejected and remembered
+def test_token_newer_than_cached_user(db, user):
+    user_cache.get(User, user.id)  # (cached without temp_email)
+    with db.engine.begin() as conn:  # (another process starts an email change)
+        conn.execute(text("UPDATE user SET temp_email = 'new@example.com' WHERE id = :id"), id=user.id)
+    db.session.expunge_all()
+    token = tokens.create('email', User.query.get(user.id), 60)
+    db.session.expunge_all()
+
+    assert tokens.verify('email', token) == user
+    assert tokens.verify('email', token, fresh=True).temp_email == 'new@example.com'
+
+
+def test_fresh_verify_reads_database(db, user):
+    token = tokens.create('email', user, 60)
+    user_cache.get(User, user.id)
+    with db.engine.begin() as conn:  # (another process verifies the account)
+        conn.execute(text('UPDATE user SET confirm_account = 1 WHERE id = :id'), id=user.id)
+    assert tokens.verify('email', token) is not None  # (cached copy, within its TTL)
+    assert tokens.verify('email', token, fresh=True) is None
+
+
+# Links sent by email work once
+def test_verification_link(db, client, user):
+    link = f'/register/{user.get_auth_token_email()}'
+    assert client.get(link).headers['Location'].endswith('/login')
+    assert User.query.get(user.id).confirm_account
+    client.get(link)
+    with client.session_transaction() as session:
+        assert ('warning', 'Token invalid or expired.') in session['_flashes']
+
+
+def test_password_reset_link(db, client, user):
+    link = f'/resetpassword/{user.get_reset_token_pw()}'
+    assert client.get(link).status_code == 200
+    assert client.post(link, data={'password': 'new', 'confirmpassword': 'new'}).status_code == 302
+    db.session.expunge_all()
+    assert bcrypt.check_password_hash(User.query.get(user.id).password, 'new')
+    assert client.get(link).headers['Location'].endswith('/resetpassword')
+
+
+def test_email_change_link(db, client):
+    user = add_user(temp_email='new@example.com')
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user.id)
+    link = f'/resetemail/{user.get_auth_token_email()}'
+    assert client.get(link).status_code == 200
+    assert client.post(link).headers['Location'].endswith('/login')
+    user_id = user.id
+    db.session.expunge_all()
+    changed = User.query.get(user_id)
+    assert (changed.email, changed.temp_email) == ('new@example.com', None)
+    assert client.post(link).headers['Location'].endswith('/login')
+    with client.session_transaction() as session:
+        assert ('warning', 'Token invalid or expired.') in session['_flashes']
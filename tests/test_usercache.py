@@ -0,0 +1,95 @@
+from contextlib import contextmanager
+import pytest
+from sqlalchemy import event
+from conftest import add_user
+from flaskapp import user_cache
+from flaskapp.models import User
+
+
+# Count SQL statements run inside the block
+@contextmanager
+def counting_queries(engine):
+    statements = []
+    listener = lambda *args: statements.append(args[2])  # noqa: E731
+    event.listen(engine, 'before_cursor_execute', listener)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', listener)
+
+
+@pytest.fixture
+def cached(db):
+    user = add_user()
+    user_id = user.id
+    db.session.expunge_all()
+    user_cache.get(User, user_id)  # (miss, now cached)
+    db.session.expunge_all()
+    return user_id
+
+
+def stats_delta(before):
+    after = user_cache.stats()
+    return after['hits'] - before['hits'], after['misses'] - before['misses']
+
+
+def test_hit_builds_user_without_query(db, cached):
+    before = user_cache.stats()
+    with counting_queries(db.engine) as statements:
+        user = user_cache.get(User, cached)
+        assert user.username == 'alice' and user in db.session
+    assert stats_delta(before) == (1, 0) and statements == []
+
+
+def test_committed_change_drops_entry(db, cached):
+    user = user_cache.get(User, cached)
+    user.username = 'bob'
+    db.session.commit()
+    db.session.expunge_all()
+    before = user_cache.stats()
+    assert user_cache.get(User, cached).username == 'bob'
+    assert stats_delta(before) == (0, 1)
+
+
+def test_rolled_back_change_keeps_entry(db, cached):
+    user = user_cache.get(User, cached)
+    user.username = 'bob'
+    db.session.flush()
+    db.session.rollback()
+    db.session.expunge_all()
+    before = user_cache.stats()
+    assert user_cache.get(User, cached).username == 'alice'
+    assert stats_delta(before) == (1, 0)
+
+
+@pytest.mark.parametrize('bulk', ['update', 'delete'])
+def test_bulk_change_clears_cache(db, cached, bulk):
+    query = User.query.filter(User.id == cached)
+    if bulk == 'update':
+        query.update({'username': 'bob'}, synchronize_session=False)
+    else:
+        query.delete(synchronize_session=False)
+    db.session.commit()
+    db.session.expunge_all()
+    before = user_cache.stats()
+    user = user_cache.get(User, cached)
+    assert stats_delta(before) == (0, 1)
+    assert (user.username if user else None) == ('bob' if bulk == 'update' else None)
+
+
+def test_entries_expire(db, cached, monkeypatch):
+    monkeypatch.setattr(user_cache, 'ttl', 0)
+    user_cache.clear()
+    user_cache.get(User, cached)
+    db.session.expunge_all()
+    before = user_cache.stats()
+    user_cache.get(User, cached)
+    assert stats_delta(before) == (0, 1)
+
+
+def test_logged_in_page_views_use_cache(db, client, cached):
+    with client.session_transaction() as session:
+        session['_user_id'] = str(cached)
+    before = user_cache.stats()
+    assert client.get('/account').status_code == 200
+    assert stats_delta(before) == (1, 0)
@@ -0,0 +1,209 @@
+import argparse
+import hashlib
+import io
+import random
+import re
+import threading
+import time
+import zlib
+from collections import defaultdict
+from datetime import datetime
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# Local stand-in for eurovision.tv
+# Serves small synthetic pages with the same structure as the real /events, /countries, /event/<event>/participants/
+# and /participant/<artist> pages (and the static.eurovision.tv logos and images they link to, at /hb-cgi/images/),
+# so the scraper can be run (and timed) offline with:
+#   python tools/eurovision_fixture.py --port 8000
+#   python source/data_scrape.py --base-url http://localhost:8000
+#   python source/mirror.py --base-url http://localhost:8000
+# Pages are generated from 'seed', so every run sees the same site. Responses carry ETag/Last-Modified headers and
+# conditional requests for unchanged pages get '304 Not Modified'. Records each request (path and time) so tests can
+# check request counts and rates.
+class EurovisionFixture(ThreadingHTTPServer):
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address=('localhost', 8000), events=10, countries=40, participants=25, latency=0.0,
+                 missing_links=0.2, fail_rate=0.0, seed=0):
+        super().__init__(address, FixtureHandler)
+        self.latency = latency  # seconds added to every response (simulates a remote site)
+        self.fail_rate = fail_rate  # share of requests answered with 503 (to exercise retries)
+        self.requests = []  # (time, path) of every request received
+        self.not_modified = 0  # requests answered with 304
+        self.last_modified = formatdate(usegmt=True)  # (all pages date from server start)
+        self.lock = threading.Lock()
+        self.images = {}  # path -> (body, content type), made on first request
+        self._build(events, countries, participants, missing_links, random.Random(seed))
+
+    # Run server in a background thread (for use from scripts/benchmarks)
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever, name='eurovision-fixture', daemon=True)
+        thread.start()
+        return self
+
+    @property
+    def base_url(self):
+        return f'http://{self.server_address[0]}:{self.server_address[1]}'
+
+    # Highest number of requests received within any 'window' seconds
+    def peak_rate(self, window=1.0):
+        with self.lock:
+            times = sorted(t for t, _ in self.requests)
+        peak = start = 0
+        for end in range(len(times)):
+            while times[end] - times[start] >= window:
+                start += 1
+            peak = max(peak, end - start + 1)
+        return peak
+
+    # Site content
+    def _build(self, events, countries, participants, missing_links, rand):
+
+        self.countries = [f'Country {i}' for i in range(countries)]
+        self.events = []  # (slug, name, year)
+        self.participants = defaultdict(list)  # event slug -> [(country, artist, slug or None, song)]
+        self.artists = {}  # artist slug -> (youtube link or None, event year)
+        for i in range(events):
+            year = datetime.now().year - i  # (newest event is this year's)
+            slug = f'city{i}-{year}'
+            self.events.append((slug, f'City{i} {year}', year))
+            for j, country in enumerate(rand.sample(self.countries, min(participants, countries))):
+                artist = f'artist-{year}-{j}'
+                has_page = rand.random() > 0.05  # a few participants have no artist page
+                self.participants[slug].append((country, f'Artist {year} {j}', artist if has_page else None,
+                                                f'Song {year} {j}'))
+                if has_page:
+                    youtube = None if rand.random() < missing_links else f'https://youtube.com/watch?v={year}x{j}'
+                    self.artists[artist] = (youtube, year)
+
+    def page(self, path):
+
+        if path == '/events':
+            items = ''.join(f'<li><a href="https://eurovision.tv/event/{slug}">'
+                            f'<img class="h-full m-auto" alt="{name}" '
+                            f'src="https://static.eurovision.tv/hb-cgi/images/logo-{slug}.png"></a></li>'
+                            for slug, name, _ in self.events)
+            return layout('Events', f'<ul>{items}</ul>')
+
+        if path == '/countries':
+            items = ''.join(f'<div><a href="https://eurovision.tv/country/{slugify(name)}">'
+                            f'<img src="https://static.eurovision.tv/hb-cgi/images/flag-{slugify(name)}.svg">'
+                            f'<h4 class="font-bold text-lg">{name}</h4></a></div>'
+                            for name in self.countries)
+            return layout('Countries', items)
+
+        match = re.fullmatch(r'/event/([\w-]+)/participants/?', path)
+        if match and match.group(1) in self.participants:
+            items = ''.join(f'<div class="w-full md:w-1/3 lg:w-1/4 flex">'
+                            f'<a href="https://eurovision.tv/{"participant/" + artist if artist else "event"}">'
+                            f'<h4 class="text-xl font-bold">{name}</h4></a>'
+                            f'<a href="https://eurovision.tv/country/{slugify(country)}">{country}</a>\n'
+                            f'<span>{song}</span></div>'
+                            for country, name, artist, song in self.participants[match.group(1)])
+            return layout('Participants', items)
+
+        match = re.fullmatch(r'/participant/([\w-]+)', path)
+        if match and match.group(1) in self.artists:
+            youtube, _ = self.artists[match.group(1)]
+            video = f'<a href="{youtube}">Watch video</a>' if youtube else ''
+            return layout('Participant', f'<img src="https://static.eurovision.tv/hb-cgi/images/'
+                                         f'{match.group(1)}.hero.jpeg">{video}')
+
+        return None
+
+    # Logo/image for 'path' as (body, content type), or None; colours repeat, so some images are identical
+    def image(self, path):
+        match = re.fullmatch(r'/hb-cgi/images/([\w.-]+)\.(png|svg|jpeg)', path)
+        if not match:
+            return None
+        with self.lock:
+            if path not in self.images:
+                colour = ('#c8102e', '#003da5', '#ffcd00', '#009a44', '#7a3e9d', '#ff6f00')[
+                    zlib.crc32(match.group(1).encode()) % 6]
+                if match.group(2) == 'svg':
+                    body = (f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 3 2">'
+                            f'<rect width="3" height="2" fill="{colour}"/></svg>').encode()
+                    self.images[path] = (body, 'image/svg+xml')
+                else:
+                    from PIL import Image  # inserted here so pages can be served without Pillow
+                    png = match.group(2) == 'png'
+                    size = (400, 200) if png else (1200, 630)
+                    img = Image.new('RGBA' if png else 'RGB', size, colour)
+                    buffer = io.BytesIO()
+                    img.save(buffer, 'PNG' if png else 'JPEG')
+                    self.images[path] = (buffer.getvalue(), 'image/png' if png else 'image/jpeg')
+            return self.images[path]
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'  # keep-alive, like the real site
+
+    def do_GET(self):
+
+        server = self.server
+        with server.lock:
+            server.requests.append((time.monotonic(), self.path))
+        if server.latency:
+            time.sleep(server.latency)
+
+        if random.random() < server.fail_rate:
+            return self.respond(503, b'Service unavailable', {'Retry-After': '1'})
+        content_type = 'text/html; charset=utf-8'
+        body = server.page(self.path.split('?')[0])
+        if body is None:
+            image = server.image(self.path.split('?')[0])
+            if image is None:
+                return self.respond(404, b'Not found')
+            body, content_type = image
+        else:
+            body = body.encode()
+
+        # Conditional request for an unchanged page
+        etag = '"' + hashlib.md5(body).hexdigest() + '"'
+        validators = {'ETag': etag, 'Last-Modified': server.last_modified}
+        if self.headers.get('If-None-Match') == etag:
+            with server.lock:
+                server.not_modified += 1
+            return self.respond(304, b'', validators)
+        self.respond(200, body, validators, content_type)
+
+    def respond(self, status, body, headers=None, content_type='text/html; charset=utf-8'):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # no per-request log lines
+
+
+def layout(title, content):
+    return f'<!DOCTYPE html><html><head><title>{title}</title></head><body><main>{content}</main></body></html>'
+
+
+def slugify(name):
+    return name.lower().replace(' ', '-')
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Local stand-in for eurovision.tv.')
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--events', type=int, default=10)
+    parser.add_argument('--participants', type=int, default=25, help='participants per event')
+    parser.add_argument('--latency', type=float, default=0.2, help='seconds added to each response')
+    parser.add_argument('--fail-rate', type=float, default=0.0, help='share of requests answered with 503 (0-1)')
+    args = parser.parse_args()
+
+    server = EurovisionFixture((args.host, args.port), events=args.events, participants=args.participants,
+                               latency=args.latency, fail_rate=args.fail_rate)
+    print(f'Eurovision fixture listening on {server.base_url}')
+    server.serve_forever()
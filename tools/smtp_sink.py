@@ -0,0 +1,113 @@
+import argparse
+import random
+import re
+import socketserver
+import threading
+import time
+from email import message_from_bytes
+
+
+# Local stand-in SMTP server
+# Accepts (and optionally randomly rejects) emails without delivering them, so the outbox can be run and load tested
+# without a real mail server. Point the app at it with:
+#   FLASK_EMAIL_SERVER=localhost FLASK_EMAIL_PORT=1025 FLASK_EMAIL_TLS=0
+class SMTPSink(socketserver.ThreadingTCPServer):
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address=('localhost', 1025), fail_rate=0.0, verbose=False):
+        super().__init__(address, SMTPHandler)
+        self.fail_rate = fail_rate  # share of emails rejected with a temporary error (to exercise retries)
+        self.verbose = verbose  # print each email received
+        self.messages = []  # all emails received (email.message.Message objects)
+        self.connections = 0  # number of SMTP connections opened
+        self.lock = threading.Lock()
+        self.received = threading.Condition(self.lock)  # notified when an email arrives
+
+    # Run server in a background thread (for use from scripts/benchmarks)
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever, name='smtp-sink', daemon=True)
+        thread.start()
+        return self
+
+    # Wait for an email to 'recipient' with 'subject'; returns its first link (or None on timeout)
+    def wait_for_link(self, recipient, subject, timeout=30):
+        deadline = time.monotonic() + timeout
+        with self.received:
+            while True:
+                for msg in reversed(self.messages):
+                    if msg['To'] == recipient and msg['Subject'] == subject:
+                        for part in msg.walk():
+                            if part.get_content_type() == 'text/plain':
+                                match = re.search(r'https?://\S+', part.get_payload(decode=True).decode())
+                                return match.group(0) if match else None
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self.received.wait(remaining)
+
+
+# Minimal SMTP conversation (HELO/EHLO, MAIL, RCPT, DATA, RSET, NOOP, QUIT)
+class SMTPHandler(socketserver.StreamRequestHandler):
+
+    def reply(self, line):
+        self.wfile.write(line.encode('ascii') + b'\r\n')
+
+    def handle(self):
+
+        with self.server.lock:
+            self.server.connections += 1
+
+        self.reply('220 localhost SMTP sink ready')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode('ascii', 'replace').strip().upper()
+
+            if command.startswith('EHLO'):
+                self.reply('250 localhost')
+            elif command.startswith(('HELO', 'MAIL', 'RCPT', 'RSET', 'NOOP')):
+                self.reply('250 OK')
+            elif command == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                self.receive()
+            elif command == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('502 Command not implemented')
+
+    def receive(self):
+
+        lines = []
+        while True:
+            line = self.rfile.readline()
+            if not line or line in (b'.\r\n', b'.\n'):
+                break
+            lines.append(line[1:] if line.startswith(b'..') else line)  # undo dot-stuffing
+
+        if random.random() < self.server.fail_rate:
+            self.reply('451 Temporary failure, try again later')
+            return
+
+        msg = message_from_bytes(b''.join(lines))
+        with self.server.received:
+            self.server.messages.append(msg)
+            self.server.received.notify_all()
+        if self.server.verbose:
+            print(f"To: {msg['To']} | Subject: {msg['Subject']}")
+        self.reply('250 OK: queued')
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Local stand-in SMTP server.')
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=1025)
+    parser.add_argument('--fail-rate', type=float, default=0.0, help='share of emails to reject (0-1)')
+    args = parser.parse_args()
+
+    server = SMTPSink((args.host, args.port), fail_rate=args.fail_rate, verbose=True)
+    print(f'SMTP sink listening on {args.host}:{args.port}')
+    server.serve_forever()
@@ -0,0 +1,10 @@
+from flaskapp import create_app
+from flaskapp.config import ProductionConfig
+from flaskapp.startup import warmup
+
+# Production entry point (e.g. gunicorn -c gunicorn.conf.py wsgi:app)
+# Creates the app with the production configuration and warms it up (templates, database, catalog, first requests)
+# before serving. With gunicorn's preload (gunicorn.conf.py) this runs once, before workers are forked, so every worker
+# starts warm and shares the loaded data.
+app = create_app(ProductionConfig)  # create app instance
+warmup(app)